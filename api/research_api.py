@@ -6,14 +6,116 @@ Handles research requests and file downloads through RESTful endpoints
 
 # Core web framework imports
 from flask_restful import Resource  # Base class for REST resources
-from flask import request, jsonify, send_from_directory  # Request handling utilities
-import markdown  # Markdown to HTML conversion
-import time  # Processing time measurement
+from flask import request, jsonify  # Request handling utilities
+from flask import Response, stream_with_context  # Streaming responses
+import json  # JSON-lines encoding for batch results
 import os  # File system operations
 
 # Authentication and AI components
-from auth.auth import token_auth  # JWT authentication decorator
-from utils.agent_setup import agent_executor, parser  # AI research components
+from auth.auth import token_auth, user_from_header  # JWT authentication
+from utils.pipeline import run_research  # Shared research execution path
+from utils.job_queue import create_job_queue, QueueFullError  # Background workers
+from utils.streaming import stream_research  # Server-Sent Events bridge
+from utils.batch import run_batch, MAX_BATCH_QUERIES, MAX_BATCH_CONCURRENCY  # Deduplicated batch runs
+from utils.metrics import registry  # Scrape-time queue depth
+from utils.report_store import get_report_store  # Stored report lookups
+from utils.rendering import render_summary  # Pre-rendered summary HTML
+from utils.downloads import resolve_report, plan_download, iter_file, iter_zip  # File delivery
+from utils.memory import session_key  # Conversation memory keys
+from utils import quotas  # Per-user request rates, run slots and fair shares
+
+# Background job queue (workers start lazily on first submission)
+job_queue = create_job_queue(
+    lambda payload: run_research(
+        payload["query"],
+        use_cache=payload.get("cache", True),
+        include_timings=payload.get("timings", False),
+        session_id=payload.get("session"),
+    )
+)  # Jobs carry their quota subject; workers take its run slot on claim
+
+
+def _collect_queue_metrics():
+    yield ("research_queue_depth", "gauge", "Research jobs waiting for a worker", {}, job_queue.depth())
+
+
+registry.register_collector(_collect_queue_metrics)
+
+
+def wants_async(data):
+    """
+    Decide whether a research request should run as a background job
+
+    Clients opt in with {"async": true} in the JSON body or the
+    standard "Prefer: respond-async" header.
+    """
+    if data.get("async"):
+        return True
+    return "respond-async" in request.headers.get("Prefer", "")
+
+
+def request_session(session_id=None):
+    """
+    Conversation key for this request
+
+    Clients continue a conversation by sending the same session_id (JSON
+    body, ?session_id= or X-Session-Id); authenticated users' sessions
+    are namespaced by their token subject. No session_id: stateless.
+    """
+    session_id = session_id or request.headers.get("X-Session-Id")
+    return session_key(session_id, user_from_header(request.headers.get("Authorization")))
+
+
+def request_subject():
+    """Quota subject: the JWT subject, or the client address when anonymous"""
+    return quotas.quota_subject(
+        user_from_header(request.headers.get("Authorization")), request.remote_addr
+    )
+
+
+def quota_rejected(e):
+    """HTTP 429 for a QuotaExceeded, with Retry-After"""
+    return (
+        {"error": str(e), "retry_after": e.retry_after},
+        429,
+        {"Retry-After": str(e.retry_after)},
+    )
+
+
+class SlotHoldingStream:
+    """
+    Streamed body that releases a run slot when the response is closed
+
+    A class rather than a generator: close() must release the slot even
+    when the client leaves before the first frame was produced. lease is
+    a run slot lease or a batch's quotas.BatchSlots (whose running
+    queries release their own slots as they finish).
+    """
+
+    def __init__(self, lease, frames):
+        self.lease = lease
+        self.frames = frames
+
+    def __iter__(self):
+        return iter(self.frames)
+
+    def close(self):
+        try:
+            if hasattr(self.frames, "close"):
+                self.frames.close()
+        finally:
+            lease, self.lease = self.lease, None
+            if isinstance(lease, quotas.BatchSlots):
+                lease.close()
+            else:
+                quotas.release(lease)
+
+
+def wants_timings(data):
+    """Per-stage timing breakdown via {"timings": true} or ?timings=1"""
+    if data.get("timings") is True:
+        return True
+    return request.args.get("timings", "").lower() in ("1", "true")
 
 
 class Research(Resource):
@@ -25,9 +127,8 @@ class Research(Resource):
 
         Flow:
         1. Validate input query
-        2. Execute research agent pipeline
-        3. Format and persist results
-        4. Return structured response
+        2. Async mode: enqueue job and return its id (HTTP 202)
+        3. Sync mode: execute research agent pipeline and return result
 
         Security: Requires JWT authentication (currently disabled)
         """
@@ -38,55 +139,49 @@ class Research(Resource):
         if not query:
             return {"error": "No query provided"}, 400  # HTTP 400 Bad Request
 
-        try:
-            start_time = time.time()  # Begin performance tracking
-
-            # Execute AI research pipeline
-            result = agent_executor.invoke(
-                {
-                    "query": query,
-                    "chat_history": [],  # Context storage (empty for new sessions)
-                    "agent_scratchpad": [],  # Agent's working memory
-                }
-            )
-
-            # Parse structured output from LLM response
-            structured_response = parser.parse(result.get("output"))
-
-            # Convert markdown content to HTML for web display
-            html_summary = markdown.markdown(
-                structured_response.summary,
-                extensions=["fenced_code", "tables"],  # Support code blocks and tables
-            )
-
-            # Generate filename with sanitized topic name
-            filename = f"research_{structured_response.topic.replace(' ', '_')}.md"
-            # Ensure outputs directory exists (add this before file operations)
-            os.makedirs("outputs", exist_ok=True)  # <-- Add this line
-
-            # Persist full report to filesystem
-            with open(f"outputs/{filename}", "w") as f:
-                f.write(
-                    f"# {structured_response.topic}\n\n{structured_response.summary}"
-                )
+        use_cache = data.get("cache", True) is not False  # {"cache": false} forces a fresh run
+        include_timings = wants_timings(data)
+        session = request_session(data.get("session_id"))
+        subject = request_subject()
 
-            # Construct API response
+        if wants_async(data):
+            try:
+                quotas.check_rate(subject)  # Run slot is taken when a worker claims it
+                job_id = job_queue.submit(
+                    {
+                        "query": query,
+                        "cache": use_cache,
+                        "timings": include_timings,
+                        "session": session,
+                        "subject": subject,
+                    }
+                )
+            except quotas.QuotaExceeded as e:
+                return quota_rejected(e)
+            except QueueFullError as e:
+                # Backpressure: tell the client when to try again
+                return (
+                    {"error": str(e)},
+                    429,
+                    {"Retry-After": str(e.retry_after)},
+                )
             return {
-                "topic": structured_response.topic, 
-                # Research topic title
-                "summary": html_summary,  
-                # HTML-formatted content
-                "sources": structured_response.sources, 
-                # Reference URLs
-                "tools": structured_response.tools_used,  
-                # AI tools utilized
-                "download_link": f"/download/{filename}",  
-                # File access endpoint
-                "processing_time": round(
-                    time.time() - start_time, 2
-                ),  # Duration in seconds
-            }
+                "job_id": job_id,
+                "status": "queued",
+                "status_url": f"/research/{job_id}",  # Polling endpoint
+            }, 202  # HTTP 202 Accepted
+
+        try:
+            with quotas.admitted(subject):
+                return run_research(
+                    query,
+                    use_cache=use_cache,
+                    include_timings=include_timings,
+                    session_id=session,
+                )
 
+        except quotas.QuotaExceeded as e:
+            return quota_rejected(e)
         except Exception as e:
             # Error handling and logging
             print("Error in /research:", e)  # Server-side logging
@@ -97,6 +192,252 @@ class Research(Resource):
             }, 500  # HTTP 500 Internal Server Error
 
 
+class ResearchJob(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self, job_id):
+        """
+        Poll the status of a background research job
+
+        Returns:
+        - Job record with status queued/running/succeeded/failed, the
+          research result once succeeded, or the error once failed
+        - HTTP 404 for unknown or expired job ids
+        """
+        job = job_queue.get(job_id)
+        if job is None:
+            return {"error": "Unknown job id"}, 404
+        return job
+
+    def delete(self, job_id):
+        """
+        Cancel a background research job
+
+        Returns:
+        - Job record: "cancelled" when it had not started yet; running jobs
+          stop at their next agent step (HTTP 202 until they do)
+        - HTTP 404 for unknown or expired job ids
+        """
+        job = job_queue.cancel(job_id)
+        if job is None:
+            return {"error": "Unknown job id"}, 404
+        if job["status"] in ("running", "cancelling"):
+            return job, 202
+        return job
+
+
+class ResearchBatch(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def post(self):
+        """
+        Run many research queries in one request
+
+        JSON Payload:
+        - queries: List of research questions
+        - concurrency: Optional parallel agent runs (1..BATCH_MAX_CONCURRENCY,
+          default 4)
+        - cache: Optional false to bypass the result cache
+
+        Returns:
+        - application/x-ndjson stream: one line per query as it finishes,
+          then a summary line with throughput, p50/p95 latency and failures
+        """
+        data = request.json or {}
+        queries = data.get("queries")
+
+        # Input validation
+        if (
+            not isinstance(queries, list)
+            or not queries
+            or not all(isinstance(q, str) and q.strip() for q in queries)
+        ):
+            return {"error": "queries must be a non-empty list of strings"}, 400
+        if len(queries) > MAX_BATCH_QUERIES:
+            return {"error": f"Batch limited to {MAX_BATCH_QUERIES} queries"}, 413
+
+        concurrency = data.get("concurrency", 4)
+        if (
+            not isinstance(concurrency, int)
+            or isinstance(concurrency, bool)
+            or not 1 <= concurrency <= MAX_BATCH_CONCURRENCY
+        ):
+            return {
+                "error": f"concurrency must be an integer from 1 to {MAX_BATCH_CONCURRENCY}"
+            }, 400
+        use_cache = data.get("cache", True) is not False
+
+        # One request; every query in flight holds its own run slot, so
+        # parallelism never exceeds the user's quota
+        subject = request_subject()
+        try:
+            slots = quotas.BatchSlots(subject, quotas.reserve(subject))
+        except quotas.QuotaExceeded as e:
+            return quota_rejected(e)
+        manager = quotas.get_quota_manager()
+        if manager is not None:
+            concurrency = min(concurrency, manager.max_concurrent)
+
+        def run(query, budget):
+            with slots.slot(budget.cancelled):
+                return run_research(query, use_cache=use_cache, budget=budget)
+
+        def generate():
+            for item in run_batch(queries, run, concurrency=concurrency):
+                yield json.dumps(item) + "\n"
+
+        return Response(
+            stream_with_context(SlotHoldingStream(slots, generate())),
+            mimetype="application/x-ndjson",
+            headers={"X-Accel-Buffering": "no"},  # Deliver lines as they finish
+        )
+
+
+MAX_PAGE_SIZE = 100  # Upper bound for search/history page sizes
+MAX_BUNDLE_REPORTS = int(os.environ.get("BUNDLE_MAX_REPORTS", "50"))  # Zip bundle size limit
+
+
+def page_size():
+    """?limit= clamped to 1..MAX_PAGE_SIZE (default 20)"""
+    try:
+        limit = int(request.args.get("limit", 20))
+    except ValueError:
+        limit = 20
+    return max(1, min(limit, MAX_PAGE_SIZE))
+
+
+def with_links(listings):
+    for item in listings:
+        item["download_link"] = f"/download/{item['filename']}"
+    return listings
+
+
+class ResearchSearch(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self):
+        """
+        Full-text search over stored reports
+
+        Query Parameters:
+        - q: Search terms (matched against topic, summary and sources)
+        - limit / offset: Pagination (limit <= 100)
+
+        Returns:
+        - Best matches first with a summary snippet and download link;
+          next_offset is null on the last page, and truncated is true when
+          older matches fell outside the ranked window (refine the query)
+        """
+        text = request.args.get("q", "").strip()
+        if not text:
+            return {"error": "No search query provided"}, 400
+        try:
+            offset = max(0, int(request.args.get("offset", 0)))
+        except ValueError:
+            return {"error": "offset must be an integer"}, 400
+        limit = page_size()
+
+        results, next_offset, truncated = get_report_store().search_page(
+            text, limit=limit, offset=offset
+        )
+        return {
+            "query": text,
+            "results": with_links(results),
+            "next_offset": next_offset,
+            "truncated": truncated,  # Older matches beyond the ranked window
+        }
+
+
+class ResearchHistory(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self):
+        """
+        Stored reports, newest first
+
+        Query Parameters:
+        - limit: Page size (<= 100)
+        - cursor: next_cursor from the previous page
+
+        Returns:
+        - Report listings plus next_cursor (null on the last page)
+        """
+        cursor = request.args.get("cursor")
+        if cursor is not None and not cursor.isdigit():
+            return {"error": "Invalid cursor"}, 400
+
+        results, next_cursor = get_report_store().history(
+            limit=page_size(), cursor=int(cursor) if cursor else None
+        )
+        return {"results": with_links(results), "next_cursor": next_cursor}
+
+
+class ResearchReport(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self, report_id):
+        """
+        View a stored report
+
+        Returns:
+        - The report in the /research response shape (summary as HTML,
+          served pre-rendered), plus query and created_at
+        - HTTP 404 for unknown report ids
+        """
+        store = get_report_store()
+        record = store.get(report_id)
+        if record is None:
+            return {"error": "Unknown report id"}, 404
+        return {
+            "report_id": record["id"],
+            "query": record["query"],
+            "topic": record["topic"],
+            "summary": render_summary(record["summary"], store),
+            "sources": record["sources"],
+            "tools": record["tools_used"],
+            "download_link": f"/download/{record['filename']}",
+            "created_at": record["created_at"],
+        }
+
+
+class ResearchStream(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self):
+        """
+        Stream research progress as Server-Sent Events
+
+        Query Parameters:
+        - query: User research question
+        - session_id: Optional conversation to continue
+
+        Emits tool_start/tool_end, token and a final result (or error)
+        event. Disconnecting cancels the underlying agent run.
+        """
+        query = request.args.get("query")
+        if not query:
+            return {"error": "No query provided"}, 400  # HTTP 400 Bad Request
+
+        try:
+            lease = quotas.reserve(request_subject())
+        except quotas.QuotaExceeded as e:
+            return quota_rejected(e)
+
+        return Response(
+            stream_with_context(
+                SlotHoldingStream(
+                    lease,
+                    stream_research(query, request_session(request.args.get("session_id"))),
+                )
+            ),
+            mimetype="text/event-stream",
+            headers={
+                "Cache-Control": "no-cache",  # Never cache live progress
+                "X-Accel-Buffering": "no",  # Disable reverse proxy buffering
+            },
+        )
+
+
 class Download(Resource):
     # Security Note: Authentication disabled for demo purposes
     # Production systems should re-enable auth:
@@ -118,11 +459,50 @@ class Download(Resource):
         downloads_folder = os.path.join(os.getcwd(), "outputs") 
         # Isolate files
 
-        # Safe file serving with Flask's send_from_directory
-        return send_from_directory(
-            directory=downloads_folder,  # Restricted base path
-            path=filename,  # Sanitized filename
-            as_attachment=True,  # Force download dialog
+        # Exported from the report store (and precompressed) on first download
+        file_path = resolve_report(downloads_folder, filename)
+        if file_path is None:
+            return {"error": "File not found"}, 404
+
+        # ETag/Last-Modified validation, byte ranges and br/gzip variants
+        plan = plan_download(file_path, request.headers.get)
+        body = iter_file(plan.path, plan.start, plan.length) if plan.path else []
+        return Response(body, status=plan.status, headers=plan.headers, direct_passthrough=True)
+
+
+class DownloadBundle(Resource):
+    # method_decorators = [token_auth.login_required]  # Auth control (currently disabled)
+
+    def get(self):
+        """
+        Download several stored reports as one zip archive
+
+        Query Parameters:
+        - ids: Comma-separated report ids (at most MAX_BUNDLE_REPORTS)
+
+        The archive is streamed member by member, so memory use does not
+        grow with the number or size of the reports.
+        """
+        ids = [i for i in request.args.get("ids", "").split(",") if i]
+        if not ids:
+            return {"error": "No report ids provided"}, 400
+        if len(ids) > MAX_BUNDLE_REPORTS:
+            return {"error": f"Bundles are limited to {MAX_BUNDLE_REPORTS} reports"}, 413
+
+        store = get_report_store()
+        downloads_folder = os.path.join(os.getcwd(), "outputs")
+        members = []
+        for report_id in dict.fromkeys(ids):  # Drop duplicates, keep order
+            record = store.get(report_id)
+            file_path = record and resolve_report(downloads_folder, record["filename"])
+            if not file_path:
+                return {"error": f"Unknown report id: {report_id}"}, 404
+            members.append((record["filename"], file_path))
+
+        return Response(
+            stream_with_context(iter_zip(members)),
+            mimetype="application/zip",
+            headers={"Content-Disposition": 'attachment; filename="research_reports.zip"'},
         )
 
 
@@ -133,14 +513,32 @@ API Security Notes:
    - Research endpoint validates query exists
    - Download endpoint needs filename sanitization
 3. File Security:
-   - Downloads restricted to 'outputs' directory
+   - Downloads restricted to 'outputs' directory, and only to files of
+     reports in the report store (databases live in 'data', never served)
+   - Report files are exported from the report store on demand
+   - Downloads support ETag/Last-Modified revalidation (304), byte ranges
+     and precompressed br/gzip variants
    - Never accept user-provided paths
 4. Error Handling:
    - Generic error messages to clients
    - Detailed logging server-side
-5. Rate Limiting: Should be added in production
+5. Rate Limiting: Per-user request rates, concurrent run slots and fair
+   queue shares (utils/quotas.py); exceeded limits answer 429 with
+   Retry-After
+6. Backpressure: Async submissions return 429 + Retry-After when the
+   job queue is full
+7. Observability: {"timings": true} (or ?timings=1) adds a per-stage
+   latency/token breakdown to the result; GET /metrics exposes totals
 
 Usage Patterns:
 - POST /research : Initiate research (JSON payload with "query")
+- POST /research {"query": ..., "async": true} : Queue research job (202)
+- GET /research/<job_id> : Poll background job status and result
+- GET /research/stream?query=... : Stream progress as Server-Sent Events
+- GET /research/search?q=... : Full-text search over stored reports
+- GET /research/history?cursor=... : Paginated report history
+- GET /research/reports/<report_id> : View a stored report (pre-rendered HTML)
+- POST /research/batch {"queries": [...]} : JSON-lines batch results + summary
 - GET /download/<filename> : Retrieve generated reports
+- GET /download?ids=<id>,<id> : Zip bundle of stored reports (streamed)
 """
@@ -0,0 +1,292 @@
+"""
+Research Portal - ASGI Entry Point
+
+Serves the research and download endpoints natively on asyncio so one
+process can hold hundreds of in-flight research requests, while every
+other route (login, templates, jobs, streaming) is delegated to the
+existing Flask application.
+
+Run with:
+    uvicorn asgi:app --host 0.0.0.0 --port 5000
+"""
+
+# Async server components
+import asyncio  # Non-blocking file I/O via worker threads
+import json  # Request/response bodies
+import os  # File system paths
+import time  # Native route latency
+from urllib.parse import parse_qs  # Query strings
+
+from asgiref.sync import sync_to_async  # Thread pool adapter
+from asgiref.wsgi import WsgiToAsgi, WsgiToAsgiInstance  # Flask bridge
+
+# Flask application and async research pipeline
+from main import app as flask_app
+from auth.auth import user_from_header
+from utils.agent_setup import warm_up
+from utils.memory import session_key
+from utils.pipeline import arun_research
+from utils.budget import RunBudget  # Cancelled when the client disconnects
+from utils.downloads import resolve_report, plan_download, iter_file  # Download delivery
+from utils.metrics import HTTP_REQUESTS, HTTP_SECONDS  # Native route metrics
+from utils import quotas  # Per-user request rates and run slots
+
+
+class _PooledWsgiInstance(WsgiToAsgiInstance):
+    # asgiref runs WSGI apps on a single shared thread by default; use the
+    # thread pool so slow Flask routes (e.g. SSE streams) run side by side
+    # (__dict__ lookup: the undecorated function, not the bound descriptor)
+    run_wsgi_app = sync_to_async(
+        WsgiToAsgiInstance.__dict__["run_wsgi_app"].func, thread_sensitive=False
+    )
+
+
+class PooledWsgiToAsgi(WsgiToAsgi):
+    """WsgiToAsgi adapter whose requests run concurrently on a thread pool"""
+
+    async def __call__(self, scope, receive, send):
+        await _PooledWsgiInstance(self.wsgi_application, self.duplicate_header_limit)(
+            scope, receive, send
+        )
+
+
+wsgi_app = PooledWsgiToAsgi(flask_app)  # Fallback for all non-native routes
+DOWNLOAD_PREFIX = "/download/"
+
+
+async def app(scope, receive, send):
+    """
+    ASGI application entry point
+
+    Native routes:
+    - POST /research (synchronous mode) -> agent_executor.ainvoke
+    - GET/HEAD /download/<filename> -> non-blocking, conditional file delivery
+
+    Everything else, including async job submissions, is handled by Flask.
+    """
+    if scope["type"] == "lifespan":
+        await lifespan(receive, send)
+        return
+    if scope["type"] != "http":
+        return  # WebSockets are not supported
+
+    path, method = scope["path"], scope["method"]
+
+    if path == "/research" and method == "POST":
+        body = await read_body(receive)
+        data = parse_json(body)
+        if data is None or data.get("async") or wants_async(scope):
+            # Invalid payloads and job submissions keep Flask's behaviour
+            await wsgi_app(scope, replay_body(body, receive), send)
+            return
+        started = time.perf_counter()
+        headers = header_lookup(scope)
+        user = user_from_header(headers("Authorization"))
+        session = session_key(data.get("session_id") or headers("X-Session-Id"), user)
+        subject = quotas.quota_subject(user, (scope.get("client") or ("unknown",))[0])
+        status = await research(data, send, wants_timings(scope), session, subject, receive)
+        # Same series as Flask's after_request hook
+        HTTP_REQUESTS.inc(endpoint="/research", method="POST", status=str(status))
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint="/research")
+        return
+
+    if path.startswith(DOWNLOAD_PREFIX) and method in ("GET", "HEAD"):
+        # scope["path"] is already percent-decoded: decoding again would
+        # turn a "%" in a filename into a different name
+        await download(path[len(DOWNLOAD_PREFIX):], scope, send, method == "HEAD")
+        return
+
+    await wsgi_app(scope, receive, send)
+
+
+# -----------------------------------------------------------------------------
+# Native Endpoints
+# -----------------------------------------------------------------------------
+async def research(data, send, include_timings=False, session=None, subject=None, receive=None):
+    """
+    Async equivalent of Research.post (sync mode); returns the HTTP status
+
+    A client that disconnects while the agent runs cancels the run
+    (status 499 in the request metrics, nothing is sent).
+    """
+    query = data.get("query")
+
+    # Input validation
+    if not query:
+        await send_json(send, 400, {"error": "No query provided"})
+        return 400
+
+    try:
+        lease = await asyncio.to_thread(quotas.reserve, subject or quotas.quota_subject())
+    except quotas.QuotaExceeded as e:
+        await send_json(
+            send,
+            429,
+            {"error": str(e), "retry_after": e.retry_after},
+            headers=[(b"retry-after", str(e.retry_after).encode())],
+        )
+        return 429
+
+    budget = RunBudget.from_env(cancel_reason="client_disconnected")
+    run = asyncio.create_task(
+        arun_research(
+            query,
+            use_cache=data.get("cache", True) is not False,
+            include_timings=include_timings or data.get("timings") is True,
+            session_id=session,
+            budget=budget,
+        )
+    )
+    try:
+        if receive is not None and not await finished_before_disconnect(run, receive):
+            budget.cancel("client_disconnected")
+            run.cancel()  # Interrupts the in-flight model/tool call
+            await asyncio.gather(run, return_exceptions=True)
+            return 499
+        result = await run
+    except Exception as e:
+        print("Error in /research:", e)  # Server-side logging
+        await send_json(
+            send,
+            500,
+            {
+                "error": str(e),  # Developer-facing message
+                "details": "Check server logs for more information",
+            },
+        )
+        return 500
+    finally:
+        await asyncio.to_thread(quotas.release, lease)
+    await send_json(send, 200, result)
+    return 200
+
+
+async def download(filename, scope, send, head_only=False):
+    """Async equivalent of Download.get restricted to the outputs directory"""
+    downloads_folder = os.path.join(os.getcwd(), "outputs")
+    # Exported from the report store (and precompressed) on first download
+    file_path = await asyncio.to_thread(resolve_report, downloads_folder, filename)
+    if file_path is None:
+        await send_json(send, 404, {"error": "File not found"})
+        return
+
+    plan = await asyncio.to_thread(plan_download, file_path, header_lookup(scope))
+    headers = [(name.lower().encode(), value.encode("latin-1")) for name, value in plan.headers]
+    await send({"type": "http.response.start", "status": plan.status, "headers": headers})
+    if plan.path is None or head_only:
+        await send({"type": "http.response.body", "body": b""})
+        return
+
+    # Stream in chunks read off the event loop
+    chunks = iter_file(plan.path, plan.start, plan.length)
+    while True:
+        chunk = await asyncio.to_thread(next, chunks, None)
+        if chunk is None:
+            break
+        await send({"type": "http.response.body", "body": chunk, "more_body": True})
+    await send({"type": "http.response.body", "body": b""})
+
+
+# -----------------------------------------------------------------------------
+# ASGI Helpers
+# -----------------------------------------------------------------------------
+async def lifespan(receive, send):
+    """Acknowledge server startup/shutdown events (optionally warming the agent)"""
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            if os.environ.get("AGENT_WARMUP") == "1":
+                await asyncio.to_thread(warm_up)
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def read_body(receive):
+    """Collect the full request body"""
+    chunks = []
+    while True:
+        message = await receive()
+        chunks.append(message.get("body", b""))
+        if not message.get("more_body"):
+            return b"".join(chunks)
+
+
+async def finished_before_disconnect(task, receive):
+    """Wait for task; False as soon as the client disconnects instead"""
+    async def disconnected():
+        while (await receive())["type"] != "http.disconnect":
+            pass
+
+    watcher = asyncio.create_task(disconnected())
+    try:
+        await asyncio.wait({task, watcher}, return_when=asyncio.FIRST_COMPLETED)
+    finally:
+        watcher.cancel()
+    return task.done()
+
+
+def replay_body(body, receive):
+    """receive() callable that yields an already-consumed body once more"""
+    sent = False
+
+    async def replay():
+        nonlocal sent
+        if sent:
+            return await receive()
+        sent = True
+        return {"type": "http.request", "body": body, "more_body": False}
+
+    return replay
+
+
+def parse_json(body):
+    try:
+        data = json.loads(body)
+    except ValueError:
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def wants_async(scope):
+    """Mirror of api.research_api.wants_async for the Prefer header"""
+    for name, value in scope.get("headers", []):
+        if name == b"prefer" and b"respond-async" in value:
+            return True
+    return False
+
+
+def wants_timings(scope):
+    """Mirror of api.research_api.wants_timings for ?timings=1"""
+    query = parse_qs(scope.get("query_string", b"").decode("latin-1"))
+    return query.get("timings", [""])[0].lower() in ("1", "true")
+
+
+def header_lookup(scope):
+    """Case-insensitive request header getter (name -> value or None)"""
+    headers = {name.decode("latin-1").lower(): value.decode("latin-1")
+               for name, value in scope.get("headers", [])}
+    return lambda name: headers.get(name.lower())
+
+
+async def send_json(send, status, payload, headers=()):
+    body = json.dumps(payload).encode("utf-8")
+    await send(
+        {
+            "type": "http.response.start",
+            "status": status,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                *headers,
+            ],
+        }
+    )
+    await send({"type": "http.response.body", "body": body})
+
+
+if __name__ == "__main__":
+    import uvicorn  # ASGI server
+
+    uvicorn.run(app, host="0.0.0.0", port=5000)  # Accessible from any network interface
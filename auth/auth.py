@@ -3,7 +3,9 @@ Authentication System for Research Portal
 
 Implements dual authentication layers:
 1. Basic Authentication - For initial login
-2. JWT Token Authentication - For API endpoints
+2. JWT Token Authentication - For API endpoints (verified tokens are
+   cached by digest until they expire, so polling and streaming clients
+   do not pay a full decode on every request)
 """
 
 # Security components
@@ -11,7 +13,12 @@ from flask_httpauth import HTTPBasicAuth, HTTPTokenAuth
 from werkzeug.security import check_password_hash
 import jwt  # JSON Web Token implementation
 from datetime import datetime, timedelta
+import hashlib  # Token cache keys (raw tokens are never stored)
 import os
+import time  # Cached token expiry
+
+from utils.cache import TTLCache  # Verified token cache
+from utils.rate_limit import TokenBucket  # Failure log throttling
 
 # Initialize authentication handlers
 basic_auth = HTTPBasicAuth()  # For username/password login
@@ -22,6 +29,19 @@ SECRET_KEY = os.environ.get(
     "SECRET_KEY", "super-secret"
 )  # Always override in production!
 
+# Verified tokens: SHA-256(token) -> (subject, exp). Bounded LRU; entries
+# are only served while their own "exp" is in the future.
+_verified = TTLCache(
+    max_entries=int(os.environ.get("AUTH_TOKEN_CACHE_SIZE", "4096")),
+    ttl=None,
+)
+
+# At most a burst of 5 failure lines, then one every 10 seconds
+_failure_log = TokenBucket(
+    rate=float(os.environ.get("AUTH_FAILURE_LOG_RATE", "0.1")), capacity=5
+)
+_suppressed = {"count": 0}
+
 # User Credentials Storage (Single user setup)
 users = {
     # Stores username: password_hash pairs
@@ -105,16 +125,60 @@ def verify_token(token):
     - Automatic expiration checking
     - Signature verification
     - Algorithm enforcement
+
+    Caching:
+    - Valid tokens are remembered by SHA-256 digest until their "exp",
+      so repeat calls skip the decode; tokens without "exp" are not cached
     """
+    key = hashlib.sha256(token.encode("utf-8")).digest()
+    cached = _verified.get(key)
+    if cached is not None:
+        subject, expires = cached
+        if time.time() < expires:
+            return subject
+        _verified.pop(key)  # Expired: decode again, which reports the expiry
+
     try:
         data = jwt.decode(
             token, SECRET_KEY, algorithms=["HS256"]  # Algorithm allowlist
         )
-        return data["sub"]  # Return username
     except jwt.PyJWTError as e:
         # Handle all JWT exceptions (expired, invalid, etc.)
-        print(f"Token verification failed: {str(e)}")
+        log_failure(e)
+        return None
+    if isinstance(data.get("exp"), (int, float)):
+        _verified.set(key, (data["sub"], data["exp"]))
+    return data["sub"]  # Return username
+
+
+def log_failure(error):
+    """Print a verification failure, rate-limited (bad clients can spam)"""
+    if not _failure_log.try_acquire():
+        _suppressed["count"] += 1
+        return
+    suppressed, _suppressed["count"] = _suppressed["count"], 0
+    note = f" ({suppressed} similar messages suppressed)" if suppressed else ""
+    print(f"Token verification failed: {str(error)}{note}")
+
+
+def clear_token_cache():
+    """Forget verified tokens (e.g. after rotating SECRET_KEY)"""
+    _verified.clear()
+
+
+def user_from_header(authorization):
+    """
+    Identify the caller from an optional Authorization header
+
+    Parameters:
+    - authorization: Raw header value ("Bearer <jwt>") or None
+
+    Returns:
+    - username for a valid bearer token, None otherwise (anonymous)
+    """
+    if not authorization or not authorization.startswith("Bearer "):
         return None
+    return verify_token(authorization[len("Bearer "):].strip())
 
 
 """
@@ -134,6 +198,8 @@ Security Best Practices:
    - Keep tokens short-lived
    - Use HTTPS in production
    - Store tokens securely on client-side
+   - The verified-token cache honours "exp" but not revocation; call
+     clear_token_cache() after rotating SECRET_KEY
 
 4. User Management:
    - Implement lockouts after failed attempts
@@ -0,0 +1,130 @@
+"""
+Benchmark Fakes - Offline LLM and Search Backends
+
+Deterministic stand-ins for OpenAI and DuckDuckGo so the full research
+path (prompt, agent loop, tool calls, parsing, report writing) can be
+exercised without network access or API keys:
+
+1. FakeResearchModel - tool-calling chat model with configurable latency,
+   number of searches per turn and answer size
+2. build_fake_executor - the production agent wired to both fakes
+"""
+
+import json  # ResearchResponse payloads
+import time  # Simulated model latency
+
+from langchain.tools import Tool  # Agent tool interface
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+
+from utils.agent_setup import build_agent_executor, get_parser
+from utils.search import CachedSearch, StubSearchBackend
+
+
+class FakeResearchModel(BaseChatModel):
+    """
+    Scripted tool-calling chat model
+
+    First turn: request `searches` web searches in one step.
+    Second turn: answer with a ResearchResponse whose summary is roughly
+    `output_size` characters - as a ResearchResponse tool call when that
+    tool is bound, as a JSON document otherwise.
+
+    Fields:
+    - latency: Seconds slept per model call
+    - output_size: Approximate summary length in characters
+    - searches: Tool calls requested in the first turn
+    """
+
+    latency: float = 0.0
+    output_size: int = 2000
+    searches: int = 2
+    final_tool: bool = False
+
+    @property
+    def _llm_type(self):
+        return "fake-research"
+
+    def bind_tools(self, tools, **kwargs):
+        # Tool calls are scripted; only the final answer tool changes behaviour
+        names = {t["function"]["name"] for t in tools if isinstance(t, dict)}
+        return self.model_copy(update={"final_tool": "ResearchResponse" in names})
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if self.latency:
+            time.sleep(self.latency)
+
+        query = next((m.content for m in messages if m.type == "human"), "")
+        observations = [m.content for m in messages if m.type == "tool"]
+
+        if (observations or not self.searches) and self.final_tool:
+            message = AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "ResearchResponse",
+                    "args": json.loads(self._answer(query, observations)),
+                    "id": "call_final",
+                }],
+            )
+        elif observations or not self.searches:
+            message = AIMessage(content=self._answer(query, observations))
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "search", "args": {"__arg1": f"{query} {i}"}, "id": f"call_{i}"}
+                    for i in range(self.searches)
+                ],
+            )
+
+        # Token counts approximated as characters / 4 (feeds llm_tokens_total)
+        prompt_chars = sum(len(str(m.content)) for m in messages)
+        output_chars = len(str(message.content)) + len(str(message.tool_calls))
+        message.usage_metadata = {
+            "input_tokens": prompt_chars // 4,
+            "output_tokens": output_chars // 4,
+            "total_tokens": (prompt_chars + output_chars) // 4,
+        }
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+    def _answer(self, query, observations):
+        paragraph = f"Findings about {query}. " + " ".join(o[:200] for o in observations)
+        summary = (paragraph * (self.output_size // max(len(paragraph), 1) + 1))[: self.output_size]
+        return json.dumps(
+            {
+                "topic": query,
+                "summary": summary,
+                "sources": ["https://example.com/source"],
+                "tools_used": ["search"] if observations else [],
+            }
+        )
+
+
+def build_fake_executor(llm_latency=0.0, llm_output_size=2000, searches=2,
+                        search_latency=0.0, search_size=500):
+    """
+    Production agent executor wired to the offline fakes
+
+    The stub search goes through CachedSearch (coalescing, retry path)
+    with the rate limiter opened up so it never throttles a benchmark.
+
+    Returns:
+    - (executor, backend): Executor and the StubSearchBackend (call count)
+    """
+    backend = StubSearchBackend(latency=search_latency, size=search_size)
+    search = CachedSearch(backend, rate=1e9, burst=10**9, max_retries=0)
+    tools = [
+        Tool(
+            name="search",
+            func=search.run,
+            coroutine=search.arun,
+            description="Search the web for up-to-date information",
+        )
+    ]
+    model = FakeResearchModel(
+        latency=llm_latency, output_size=llm_output_size, searches=searches
+    )
+    executor = build_agent_executor(llm=model, tools=tools, parser=get_parser())
+    executor.verbose = False  # Console logging would dominate the measurements
+    return executor, backend
@@ -0,0 +1,79 @@
+"""
+Markdown Rendering Micro-Benchmark
+
+Compares, per call, on a large research summary:
+1. markdown.markdown(...) - new converter and extensions every call
+2. render_markdown_html - reused per-thread converter
+3. render_summary - content-hash cache hit (already rendered)
+
+Usage:
+    python benchmarks/markdown_render.py [--size 50000] [--runs 200]
+"""
+
+import argparse  # Command line options
+import json  # Result output
+import os  # Import path
+import sys  # Import path
+import timeit  # Call timing
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+import markdown  # noqa: E402
+
+from utils.rendering import EXTENSIONS, render_markdown_html, render_summary  # noqa: E402
+
+SECTION = """## Findings
+
+Research **highlights** with [a source](https://example.com) and `inline code`.
+
+| Metric | Value |
+|--------|-------|
+| Latency | 120 ms |
+| Throughput | 45 rps |
+
+```python
+def example():
+    return 42
+```
+
+- First point
+- Second point
+
+"""
+
+
+def per_call_ms(fn, runs):
+    return round(min(timeit.repeat(fn, number=runs, repeat=3)) * 1000 / runs, 4)
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arguments.add_argument("--size", type=int, default=50000, help="Summary characters")
+    arguments.add_argument("--runs", type=int, default=200)
+    options = arguments.parse_args()
+
+    summary = (SECTION * (options.size // len(SECTION) + 1))[: options.size]
+    assert markdown.markdown(summary, extensions=EXTENSIONS) == render_markdown_html(summary)
+    render_summary(summary)  # Prime the content-hash cache
+
+    small = SECTION
+    report = {
+        "summary_chars": len(summary),
+        "fresh_converter_ms": per_call_ms(
+            lambda: markdown.markdown(summary, extensions=EXTENSIONS), options.runs // 10 or 1
+        ),
+        "reused_converter_ms": per_call_ms(
+            lambda: render_markdown_html(summary), options.runs // 10 or 1
+        ),
+        "cached_ms": per_call_ms(lambda: render_summary(summary), options.runs),
+        "small_fresh_converter_ms": per_call_ms(
+            lambda: markdown.markdown(small, extensions=EXTENSIONS), options.runs
+        ),
+        "small_reused_converter_ms": per_call_ms(lambda: render_markdown_html(small), options.runs),
+    }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,101 @@
+"""
+Report Search Benchmark - Full-Text Search and History Latency
+
+Fills a scratch report store with synthetic reports and times:
+1. GET /research/search style queries (FTS5 MATCH + BM25 + snippet)
+2. History pages (keyset pagination), first page and deep pages
+
+The vocabulary is deliberately tiny, so every search term matches
+nearly every report: the worst case for relevance ranking.
+
+Usage:
+    python benchmarks/report_search.py [--reports 50000] [--queries 200]
+"""
+
+import argparse  # Command line options
+import json  # Result output
+import os  # Scratch paths
+import random  # Synthetic vocabulary
+import sys  # Import path
+import tempfile  # Scratch database
+import time  # Query timing
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+
+from utils.agent_setup import ResearchResponse  # noqa: E402
+from utils.report_store import ReportStore  # noqa: E402
+from utils.stats import percentile  # noqa: E402
+
+WORDS = (
+    "climate ocean volcano economy history roman empire quantum computing protein "
+    "folding renewable energy solar battery lithium neural network language model "
+    "agriculture soil water river glacier migration bird insect vaccine immune "
+    "trade tariff currency inflation galaxy star planet orbit telescope"
+).split()
+
+
+def populate(store, count, seed=7):
+    rng = random.Random(seed)
+    for i in range(count):
+        topic = " ".join(rng.sample(WORDS, 3)).title()
+        summary = " ".join(rng.choice(WORDS) for _ in range(300))
+        store.add(
+            f"question {i}",
+            ResearchResponse(
+                topic=topic,
+                summary=summary,
+                sources=[f"https://example.com/{i}"],
+                tools_used=["search"],
+            ),
+        )
+
+
+def timed(fn, runs):
+    samples = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        fn()
+        samples.append((time.perf_counter() - started) * 1000)
+    return {
+        "p50_ms": round(percentile(samples, 50), 3),
+        "p95_ms": round(percentile(samples, 95), 3),
+        "max_ms": round(max(samples), 3),
+    }
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arguments.add_argument("--reports", type=int, default=50000)
+    arguments.add_argument("--queries", type=int, default=200)
+    options = arguments.parse_args()
+
+    with tempfile.TemporaryDirectory() as scratch:
+        store = ReportStore(os.path.join(scratch, "reports.sqlite3"))
+        started = time.perf_counter()
+        populate(store, options.reports)
+        load_s = time.perf_counter() - started
+
+        rng = random.Random(11)
+        cursor = store.history(limit=20)[1]
+        for _ in range(50):  # Walk 50 pages deep for the deep-page case
+            cursor = store.history(limit=20, cursor=cursor)[1] or cursor
+
+        report = {
+            "reports": options.reports,
+            "insert_per_report_ms": round(load_s * 1000 / options.reports, 3),
+            "search_one_term": timed(lambda: store.search(rng.choice(WORDS)), options.queries),
+            "search_two_terms": timed(
+                lambda: store.search(" ".join(rng.sample(WORDS, 2))), options.queries
+            ),
+            "search_prefix": timed(lambda: store.search(rng.choice(WORDS)[:3]), options.queries),
+            "history_first_page": timed(lambda: store.history(limit=20), options.queries),
+            "history_deep_page": timed(
+                lambda: store.history(limit=20, cursor=cursor), options.queries
+            ),
+        }
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,273 @@
+"""
+Research Throughput Benchmark - Offline
+
+Drives the research path with a fake chat model and stub search backend
+(no OpenAI or DuckDuckGo calls) and reports:
+1. Requests per second at a fixed concurrency
+2. p50/p95/p99 latency
+3. CPU time per request
+4. Traced memory allocated per in-flight request
+
+Targets:
+- endpoint: POST /research through the Flask test client
+- executor: AgentExecutor.invoke directly (agent overhead only)
+
+Usage:
+    python benchmarks/research.py [--requests 200] [--concurrency 8]
+        [--llm-latency 0.05] [--search-latency 0.02] [--output results.json]
+        [--compare baseline.json]
+
+Results are written to benchmarks/results/<commit>.json by default so
+runs on different commits can be compared with --compare.
+"""
+
+import argparse  # Command line options
+import datetime  # Result timestamps
+import json  # Result output
+import os  # Paths and working directory
+import subprocess  # Current git commit
+import sys  # Import path and exit status
+import tempfile  # Scratch outputs/ directory
+import threading  # Per-thread test clients
+import time  # Wall clock and CPU timing
+import tracemalloc  # Allocation tracking
+from concurrent.futures import ThreadPoolExecutor  # Fixed concurrency
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+os.environ.setdefault("OPENAI_API_KEY", "benchmark-key")  # Never used for network calls
+
+from benchmarks.fakes import build_fake_executor  # noqa: E402
+from utils import agent_setup, quotas  # noqa: E402
+from utils.stats import percentile  # noqa: E402
+
+RESULTS_DIR = os.path.join(ROOT, "benchmarks", "results")
+
+# Metrics where a larger value is a regression (everything else: smaller is worse)
+HIGHER_IS_WORSE = ("latency_p50", "latency_p95", "latency_p99", "cpu_ms_per_request",
+                   "memory_kb_per_request")
+
+
+# -----------------------------------------------------------------------------
+# Request Drivers
+# -----------------------------------------------------------------------------
+def endpoint_driver():
+    """POST /research via the Flask test client (one client per thread)"""
+    from main import app
+
+    local = threading.local()
+
+    def send(query):
+        client = getattr(local, "client", None)
+        if client is None:
+            client = local.client = app.test_client()
+        response = client.post("/research", json={"query": query, "cache": False})
+        if response.status_code != 200:
+            raise RuntimeError(f"HTTP {response.status_code}: {response.get_data(as_text=True)[:200]}")
+
+    return send
+
+
+def executor_driver(executor):
+    """AgentExecutor.invoke without the HTTP layer, cache or report writing"""
+    from utils.pipeline import agent_inputs
+
+    def send(query):
+        executor.invoke(agent_inputs(query))
+
+    return send
+
+
+# -----------------------------------------------------------------------------
+# Measurement
+# -----------------------------------------------------------------------------
+def run_load(send, requests, concurrency, label):
+    """
+    Issue `requests` unique queries with `concurrency` in flight
+
+    Returns:
+    - dict: rps, latency percentiles (seconds), CPU ms per request, errors
+    """
+    latencies = []
+    errors = []
+
+    def one(index):
+        started = time.perf_counter()
+        try:
+            send(f"{label} benchmark query {index}")  # Unique: no cache hits
+        except Exception as e:
+            errors.append(str(e))
+            return
+        latencies.append(time.perf_counter() - started)
+
+    cpu_start, wall_start = time.process_time(), time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(one, range(requests)))
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    return {
+        "requests": requests,
+        "concurrency": concurrency,
+        "errors": len(errors),
+        "first_error": errors[0] if errors else None,
+        "elapsed_s": round(wall, 4),
+        "rps": round(len(latencies) / wall, 2) if wall else 0.0,
+        "latency_p50": round(percentile(latencies, 50), 4),
+        "latency_p95": round(percentile(latencies, 95), 4),
+        "latency_p99": round(percentile(latencies, 99), 4),
+        "cpu_ms_per_request": round(cpu * 1000 / requests, 3),
+    }
+
+
+def measure_memory(send, concurrency, label):
+    """
+    Peak traced allocations per in-flight request
+
+    Run separately from the throughput pass because tracemalloc slows
+    every allocation down.
+    """
+    send(f"{label} memory warm-up")  # Exclude one-time imports and caches
+    tracemalloc.start()
+    baseline, _ = tracemalloc.get_traced_memory()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(lambda i: send(f"{label} memory query {i}"), range(concurrency)))
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return round((peak - baseline) / 1024 / concurrency, 1)
+
+
+def run_benchmark(targets=("endpoint", "executor"), requests=200, concurrency=8,
+                  llm_latency=0.0, llm_output_size=2000, searches=2,
+                  search_latency=0.0, search_size=500):
+    """
+    Benchmark each target with the same fake backends
+
+    Returns:
+    - dict: {"config": ..., "results": {target: metrics}}
+    """
+    executor, backend = build_fake_executor(
+        llm_latency=llm_latency,
+        llm_output_size=llm_output_size,
+        searches=searches,
+        search_latency=search_latency,
+        search_size=search_size,
+    )
+    agent_setup.set_agent_executor(executor)  # /research now uses the fakes
+    quotas.set_quota_manager(None)  # One synthetic client: per-user quotas would throttle it
+
+    results = {}
+    for target in targets:
+        send = endpoint_driver() if target == "endpoint" else executor_driver(executor)
+        send(f"{target} warm-up")
+        metrics = run_load(send, requests, concurrency, target)
+        metrics["memory_kb_per_request"] = measure_memory(send, concurrency, target)
+        results[target] = metrics
+
+    return {
+        "config": {
+            "requests": requests,
+            "concurrency": concurrency,
+            "llm_latency": llm_latency,
+            "llm_output_size": llm_output_size,
+            "searches": searches,
+            "search_latency": search_latency,
+            "search_size": search_size,
+        },
+        "search_calls": backend.calls,
+        "results": results,
+    }
+
+
+# -----------------------------------------------------------------------------
+# Storage and Comparison
+# -----------------------------------------------------------------------------
+def current_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def compare(report, baseline, threshold):
+    """
+    Print per-metric changes against a baseline report
+
+    Returns:
+    - list: Regressions larger than `threshold` (fraction, e.g. 0.1)
+    """
+    regressions = []
+    for target, metrics in report["results"].items():
+        previous = baseline.get("results", {}).get(target)
+        if not previous:
+            continue
+        print(f"\n{target} vs {baseline.get('commit', 'baseline')}:")
+        for name in ("rps",) + HIGHER_IS_WORSE:
+            old, new = previous.get(name), metrics.get(name)
+            if not old or new is None:
+                continue
+            change = (new - old) / old
+            worse = change > threshold if name in HIGHER_IS_WORSE else change < -threshold
+            print(f"  {name:24} {old:>12} -> {new:>12}  {change:+.1%}{'  REGRESSION' if worse else ''}")
+            if worse:
+                regressions.append(f"{target}.{name}")
+    return regressions
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arguments.add_argument("--target", choices=["endpoint", "executor", "both"], default="both")
+    arguments.add_argument("--requests", type=int, default=200)
+    arguments.add_argument("--concurrency", type=int, default=8)
+    arguments.add_argument("--llm-latency", type=float, default=0.05, help="Seconds per model call")
+    arguments.add_argument("--llm-output-size", type=int, default=2000, help="Summary characters")
+    arguments.add_argument("--searches", type=int, default=2, help="Searches per agent run")
+    arguments.add_argument("--search-latency", type=float, default=0.02, help="Seconds per search")
+    arguments.add_argument("--search-size", type=int, default=500, help="Result characters")
+    arguments.add_argument("--output", help="Result path (default: benchmarks/results/<commit>.json)")
+    arguments.add_argument("--compare", help="Baseline result file to compare against")
+    arguments.add_argument("--threshold", type=float, default=0.10,
+                           help="Relative change counted as a regression (default 0.10)")
+    options = arguments.parse_args()
+
+    targets = ("endpoint", "executor") if options.target == "both" else (options.target,)
+    workdir = os.getcwd()
+    with tempfile.TemporaryDirectory() as scratch:
+        os.chdir(scratch)  # Reports land in a throwaway outputs/ directory
+        try:
+            report = run_benchmark(
+                targets=targets,
+                requests=options.requests,
+                concurrency=options.concurrency,
+                llm_latency=options.llm_latency,
+                llm_output_size=options.llm_output_size,
+                searches=options.searches,
+                search_latency=options.search_latency,
+                search_size=options.search_size,
+            )
+        finally:
+            os.chdir(workdir)
+
+    report["commit"] = current_commit()
+    report["timestamp"] = datetime.datetime.now().isoformat(timespec="seconds")
+    print(json.dumps(report, indent=2))
+
+    output = options.output or os.path.join(RESULTS_DIR, f"{report['commit']}.json")
+    os.makedirs(os.path.dirname(os.path.abspath(output)), exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(report, f, indent=2)
+    print(f"Saved {output}")
+
+    if options.compare:
+        with open(options.compare) as f:
+            regressions = compare(report, json.load(f), options.threshold)
+        if regressions:
+            print("Regressions:", ", ".join(regressions))
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
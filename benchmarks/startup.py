@@ -0,0 +1,85 @@
+"""
+Startup Benchmark - Import Time and Memory
+
+Measures cold-start cost of the web application in fresh interpreters:
+1. Import time and peak RSS of `main` (what a worker pays before serving)
+2. Time until the login page has been served once
+3. Time and RSS after an explicit agent warm-up
+
+Usage:
+    python benchmarks/startup.py [--runs 5] [--output startup.json]
+
+Run it on two commits to compare before/after numbers.
+"""
+
+import argparse  # Command line options
+import json  # Result output
+import os  # Environment for child interpreters
+import statistics  # Median across runs
+import subprocess  # Fresh interpreter per measurement
+import sys  # Current interpreter path
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Executed in a child interpreter; prints one JSON line
+PROBE = """
+import json, resource, sys, time
+start = time.perf_counter()
+import main
+imported = time.perf_counter()
+client = main.app.test_client()
+status = client.get("/login").status_code
+served = time.perf_counter()
+rss_import = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+warm = None
+if "--warm" in sys.argv:
+    from utils import agent_setup
+    if hasattr(agent_setup, "warm_up"):
+        agent_setup.warm_up()
+    else:
+        agent_setup.agent_executor
+    warm = time.perf_counter() - start
+print(json.dumps({
+    "import_s": imported - start,
+    "first_request_s": served - start,
+    "login_status": status,
+    "warm_s": warm,
+    "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    "rss_after_import_mb": rss_import / 1024,
+}))
+"""
+
+
+def measure(warm):
+    env = dict(os.environ)
+    env.setdefault("OPENAI_API_KEY", "benchmark-key")  # Never used for network calls
+    args = [sys.executable, "-c", PROBE] + (["--warm"] if warm else [])
+    output = subprocess.run(
+        args, cwd=ROOT, env=env, capture_output=True, text=True, check=True
+    ).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    arguments = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    arguments.add_argument("--runs", type=int, default=5, help="Interpreters per scenario")
+    arguments.add_argument("--output", help="Write results as JSON to this path")
+    options = arguments.parse_args()
+
+    report = {}
+    for scenario, warm in (("cold", False), ("warm", True)):
+        samples = [measure(warm) for _ in range(options.runs)]
+        report[scenario] = {
+            key: round(statistics.median(s[key] for s in samples), 4)
+            for key in samples[0]
+            if isinstance(samples[0][key], (int, float)) and samples[0][key] is not None
+        }
+
+    print(json.dumps(report, indent=2))
+    if options.output:
+        with open(options.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
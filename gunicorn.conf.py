@@ -0,0 +1,105 @@
+"""
+Gunicorn Configuration - Production Server Mode
+
+Pre-fork multi-worker server for the Flask application:
+
+1. The app (and, with AGENT_WARMUP=1, the agent) is loaded once in the
+   master before forking, so workers share it copy-on-write
+2. Threaded workers hold many slow, I/O-bound research requests each
+3. Workers are recycled after a bounded number of requests
+4. Graceful reloads: in-flight research finishes before old workers exit
+5. Shared SQLite backends for state that must be visible to every worker
+   (background jobs, conversations, quotas)
+
+Settings come from the environment, including the project's .env file.
+Run with (this file is picked up automatically from the working directory):
+    gunicorn main:app
+"""
+
+import multiprocessing  # Default worker count
+import os  # Environment configuration
+
+from dotenv import load_dotenv  # Same .env as the development server
+
+load_dotenv()
+
+# -----------------------------------------------------------------------------
+# Server
+# -----------------------------------------------------------------------------
+bind = os.environ.get("BIND", f"0.0.0.0:{os.environ.get('PORT', '5000')}")
+workers = int(os.environ.get("WEB_CONCURRENCY", multiprocessing.cpu_count() * 2 + 1))
+worker_class = os.environ.get("GUNICORN_WORKER_CLASS", "gthread")
+threads = int(os.environ.get("GUNICORN_THREADS", "8"))  # Concurrent requests per worker
+preload_app = os.environ.get("GUNICORN_PRELOAD", "1") == "1"  # Copy-on-write sharing
+
+# Worker recycling (bounded memory growth); jitter avoids all workers
+# restarting at the same moment
+max_requests = int(os.environ.get("GUNICORN_MAX_REQUESTS", "1000"))
+max_requests_jitter = int(os.environ.get("GUNICORN_MAX_REQUESTS_JITTER", "100"))
+
+# A research run may take the whole agent deadline; neither a busy worker
+# nor a graceful reload may cut it short
+_deadline = float(os.environ.get("AGENT_DEADLINE_SECONDS", "120")) or 600
+timeout = int(os.environ.get("GUNICORN_TIMEOUT", _deadline + 30))
+graceful_timeout = int(os.environ.get("GUNICORN_GRACEFUL_TIMEOUT", _deadline + 30))
+keepalive = int(os.environ.get("GUNICORN_KEEPALIVE", "5"))
+
+accesslog = os.environ.get("GUNICORN_ACCESS_LOG", "-")
+errorlog = "-"
+
+# -----------------------------------------------------------------------------
+# Shared State
+# -----------------------------------------------------------------------------
+# Per-process backends would lose jobs and conversations whenever the next
+# request lands on another worker; explicit settings always win
+os.environ.setdefault("AGENT_WARMUP", "1")
+if workers > 1:
+    os.environ.setdefault("RESEARCH_QUEUE_BACKEND", "sqlite")
+    os.environ.setdefault("MEMORY_BACKEND", "sqlite")
+    os.environ.setdefault("QUOTA_BACKEND", "sqlite")
+
+
+# -----------------------------------------------------------------------------
+# Server Hooks
+# -----------------------------------------------------------------------------
+def _warm_up(log):
+    from utils.agent_setup import is_ready, warm_up
+
+    if os.environ.get("AGENT_WARMUP") != "1" or is_ready():
+        return
+    try:
+        warm_up()
+    except Exception as e:
+        # Workers still start: /readyz reports 503 and the agent is built
+        # on the first research request instead
+        log.warning("Agent warm-up failed: %s", e)
+
+
+def when_ready(server):
+    """
+    Master, before the first fork: build the agent once for every worker
+
+    Its HTTP clients are fork-safe (utils/http_clients.py): each worker
+    opens its own connection pools and reports its own pool metrics.
+    """
+    if preload_app:
+        _warm_up(server.log)
+
+
+def post_worker_init(worker):
+    """Worker, before serving: warm up if the master could not (no preload)"""
+    _warm_up(worker.log)
+
+
+"""
+Reload Notes:
+- kill -HUP <master>: re-reads this file and .env, starts new workers and
+  lets the old ones finish their in-flight requests (graceful_timeout).
+  With preload_app the new workers fork from the already loaded app, so
+  HUP does not pick up code changes
+- Code deploys without downtime: kill -USR2 <master> starts a new master
+  with the new code next to the old one; once it is ready, kill -WINCH and
+  then kill -QUIT the old master
+- GUNICORN_PRELOAD=0 trades copy-on-write sharing for HUP code reloads
+- kill -TERM (docker stop) is a graceful shutdown; kill -INT is immediate
+"""
@@ -4,24 +4,90 @@ Research Portal - Main Application Entry Point
 Implements the web interface and REST API endpoints with authentication flow.
 """
 
+# Environment configuration (.env) before any module reads its settings
+from dotenv import load_dotenv
+
+load_dotenv()
+
 # Core framework imports
-from flask import Flask, render_template, request, redirect, url_for
+from flask import Flask, render_template, request, redirect, url_for, g, Response
 from flask_restful import Api  # For RESTful endpoint management
 
 # Security components
 from auth.auth import basic_auth, token_auth, generate_token, verify_token
 
+# Agent warm-up hook (the agent is otherwise built on the first research request)
+from utils.agent_setup import warm_up, is_ready
+
 # API endpoint handlers
-from api.research_api import Research, Download
+from api.research_api import (
+    Research,
+    ResearchJob,
+    ResearchStream,
+    ResearchBatch,
+    ResearchSearch,
+    ResearchHistory,
+    ResearchReport,
+    Download,
+    DownloadBundle,
+)
+
+# Request metrics (Prometheus text format)
+from utils.metrics import registry, HTTP_REQUESTS, HTTP_SECONDS
 
 # Environment configuration
 import os
+import time
 
 # Initialize Flask application
 app = Flask(__name__)
 api = Api(app)  # Initialize REST API
 
 
+@app.before_request
+def start_timer():
+    g.request_started = time.perf_counter()
+
+
+@app.after_request
+def record_request(response):
+    """Count and time every request by route template (not raw path)"""
+    endpoint = request.url_rule.rule if request.url_rule else "unmatched"
+    HTTP_REQUESTS.inc(endpoint=endpoint, method=request.method, status=str(response.status_code))
+    started = g.get("request_started")
+    if started is not None:
+        # Streaming responses: time to first byte, not stream duration
+        HTTP_SECONDS.observe(time.perf_counter() - started, endpoint=endpoint)
+    return response
+
+
+@app.route("/metrics")
+def metrics():
+    """Prometheus scrape endpoint (per-process counters and histograms)"""
+    return Response(registry.render(), mimetype="text/plain; version=0.0.4")
+
+
+@app.route("/healthz")
+def healthz():
+    """Liveness probe: this worker process is serving requests"""
+    return {"status": "ok", "pid": os.getpid()}
+
+
+@app.route("/readyz")
+def readyz():
+    """
+    Readiness probe: 503 until the agent is warmed up (AGENT_WARMUP=1)
+
+    Without AGENT_WARMUP the agent is built on the first research request,
+    so the worker is ready immediately.
+    """
+    warm = is_ready()
+    ready = warm or os.environ.get("AGENT_WARMUP") != "1"
+    body = {"status": "ready" if ready else "warming", "agent": "warm" if warm else "cold",
+            "pid": os.getpid()}
+    return body, 200 if ready else 503
+
+
 @app.route("/")
 def home():
     """
@@ -86,10 +152,21 @@ def login():
 
 # Register API endpoints
 api.add_resource(Research, "/research")  # Research processing endpoint
+api.add_resource(ResearchStream, "/research/stream")  # Server-Sent Events progress
+api.add_resource(ResearchBatch, "/research/batch")  # Deduplicated batch research
+api.add_resource(ResearchSearch, "/research/search")  # Full-text report search
+api.add_resource(ResearchHistory, "/research/history")  # Paginated report listing
+api.add_resource(ResearchReport, "/research/reports/<string:report_id>")  # Stored report view
+api.add_resource(ResearchJob, "/research/<string:job_id>")  # Background job status
 api.add_resource(Download, "/download/<filename>")  # File download endpoint
+api.add_resource(DownloadBundle, "/download")  # Zip bundle of several reports
 
 if __name__ == "__main__":
-    # Server configuration
+    if os.environ.get("AGENT_WARMUP") == "1":
+        warm_up()  # Pay agent construction before the first request
+
+    # Development server (single process); production: gunicorn main:app
+    # (multi-worker settings in gunicorn.conf.py)
     app.run(host="0.0.0.0", port=5000)  # Accessible from any network interface
 
 """
@@ -131,11 +208,13 @@ Critical Security Notes:
 
 Production Recommendations:
 
-1. Add rate limiting for API endpoints
-2. Implement password hashing with bcrypt
-3. Add CSRF protection for forms
-4. Enable CORS policies for API endpoints
-5. Add request validation middleware
-6. Implement proper logging
-7. Set up monitoring/alerting
+1. Serve with gunicorn (gunicorn.conf.py): preloaded workers, recycling,
+   graceful reloads, /healthz and /readyz probes
+2. Tune per-user quotas (utils/quotas.py); rate limit /login at the proxy
+3. Implement password hashing with bcrypt
+4. Add CSRF protection for forms
+5. Enable CORS policies for API endpoints
+6. Add request validation middleware
+7. Implement proper logging
+8. Set up monitoring/alerting
 """
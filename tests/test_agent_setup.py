@@ -0,0 +1,35 @@
+import sys
+import os
+import subprocess
+import threading
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import agent_setup
+
+
+def test_agent_executor_built_once_across_threads(monkeypatch):
+    builds = []
+    monkeypatch.setenv("OPENAI_API_KEY", "test-key")  # Never used for network calls
+    monkeypatch.setattr(agent_setup, "_components", {})
+    monkeypatch.setattr(agent_setup, "build_agent_executor", lambda **kwargs: builds.append(1) or object())
+
+    threads = [threading.Thread(target=agent_setup.get_agent_executor) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert len(builds) == 1
+    assert agent_setup.is_ready()
+    assert agent_setup.agent_executor is agent_setup.get_agent_executor()
+
+
+def test_importing_the_app_stays_lazy():
+    # Heavy LangChain packages load only when the agent is built
+    probe = (
+        "import sys, main; print(sorted(m for m in sys.modules if m.startswith("
+        "('langchain.agents', 'langchain_community', 'langchain_openai'))))"
+    )
+    root = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+    output = subprocess.run([sys.executable, "-c", probe], cwd=root, capture_output=True,
+                            text=True, check=True).stdout
+    assert output.strip().splitlines()[-1] == "[]"
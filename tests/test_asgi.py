@@ -0,0 +1,118 @@
+import sys
+import os
+import asyncio
+import json
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import asgi
+from utils import report_store
+from utils.agent_setup import ResearchResponse
+from utils.report_store import ReportStore
+
+
+def call(method, path, body=b"", headers=()):
+    """Drive the ASGI app once and return (status, headers, body)"""
+    scope = {
+        "type": "http", "method": method, "path": path, "raw_path": path.encode(),
+        "query_string": b"", "headers": list(headers), "scheme": "http",
+        "server": ("testserver", 80), "client": ("127.0.0.1", 1234),
+        "http_version": "1.1", "root_path": "",
+    }
+    messages = [{"type": "http.request", "body": body, "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(3600)
+
+    async def send(message):
+        sent.append(message)
+
+    asyncio.run(asgi.app(scope, receive, send))
+    start = sent[0]
+    return start["status"], dict(start["headers"]), b"".join(m.get("body", b"") for m in sent[1:])
+
+
+def test_research_runs_natively_async(monkeypatch):
+    async def fake(query, callbacks=None, use_cache=True, include_timings=False, session_id=None,
+                   budget=None):
+        return {"topic": query}
+
+    monkeypatch.setattr(asgi, "arun_research", fake)
+    status, _, body = call("POST", "/research", json.dumps({"query": "tides"}).encode())
+    assert status == 200
+    assert json.loads(body) == {"topic": "tides"}
+
+
+def test_client_disconnect_cancels_the_run(monkeypatch):
+    state = {}
+
+    async def slow(query, budget=None, **kwargs):
+        state["budget"] = budget
+        try:
+            await asyncio.sleep(30)
+        except asyncio.CancelledError:
+            state["cancelled"] = True
+            raise
+
+    monkeypatch.setattr(asgi, "arun_research", slow)
+    messages = [{"type": "http.request", "body": b'{"query": "tides"}', "more_body": False}]
+    sent = []
+
+    async def receive():
+        if messages:
+            return messages.pop(0)
+        await asyncio.sleep(0.05)
+        return {"type": "http.disconnect"}
+
+    async def send(message):
+        sent.append(message)
+
+    status = asyncio.run(asgi.research({"query": "tides"}, send, receive=receive))
+    assert status == 499 and sent == []
+    assert state["cancelled"] and state["budget"].cancelled.is_set()
+
+
+def test_research_requires_query():
+    status, _, body = call("POST", "/research", b"{}")
+    assert status == 400
+
+
+def test_download_rejects_traversal():
+    status, _, _ = call("GET", "/download/../main.py")
+    assert status == 404
+
+
+def test_other_routes_fall_back_to_flask():
+    status, _, body = call("GET", "/login")
+    assert status == 200
+    assert b"Research Portal Login" in body
+
+
+def test_download_is_conditional(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    monkeypatch.setattr(report_store, "_store", {"default": store})
+    record = store.add("x", ResearchResponse(topic="X", summary="body", sources=[], tools_used=[]))
+    url = f"/download/{record['filename']}"
+
+    status, headers, body = call("GET", url)
+    assert status == 200 and body.startswith(b"# X")
+    status, _, body = call("GET", url, headers=[(b"if-none-match", headers[b"etag"])])
+    assert status == 304 and body == b""
+    (tmp_path / "outputs" / "notes.md").write_text("not a report")
+    assert call("GET", "/download/notes.md")[0] == 404
+
+
+def test_download_names_are_decoded_once(monkeypatch):
+    requested = []
+
+    async def download(filename, scope, send, head):
+        requested.append(filename)
+        await send({"type": "http.response.start", "status": 404, "headers": []})
+        await send({"type": "http.response.body", "body": b""})
+
+    monkeypatch.setattr(asgi, "download", download)
+    call("GET", "/download/growth 50%25.md")  # Server decoded "50%2525" once already
+    assert requested == ["growth 50%25.md"]
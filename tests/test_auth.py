@@ -0,0 +1,37 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import jwt
+from auth import auth
+
+
+def make_token(exp):
+    return jwt.encode({"sub": "alice", "exp": exp}, auth.SECRET_KEY, algorithm="HS256")
+
+
+def test_verified_tokens_are_cached_until_exp(monkeypatch):
+    auth.clear_token_cache()
+    token = make_token(int(time.time()) + 60)
+    assert auth.verify_token(token) == "alice"
+
+    decodes = []
+    monkeypatch.setattr(auth.jwt, "decode", lambda *a, **k: decodes.append(1))
+    assert auth.verify_token(token) == "alice"
+    assert decodes == []  # Served from the cache
+
+    # Past "exp" the cache is bypassed and the decode decides
+    def expired(*args, **kwargs):
+        raise jwt.ExpiredSignatureError("Signature has expired")
+
+    now = time.time()
+    monkeypatch.setattr(auth.time, "time", lambda: now + 120)
+    monkeypatch.setattr(auth.jwt, "decode", expired)
+    assert auth.verify_token(token) is None
+
+
+def test_failure_logging_is_rate_limited(capsys, monkeypatch):
+    monkeypatch.setattr(auth, "_failure_log", auth.TokenBucket(rate=0.0, capacity=2))
+    for _ in range(5):
+        assert auth.verify_token("not-a-jwt") is None
+    assert capsys.readouterr().out.count("Token verification failed") == 2
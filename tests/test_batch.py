@@ -0,0 +1,58 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.batch import run_batch
+from utils.stats import percentile
+
+
+def test_percentile_interpolates():
+    assert percentile([1, 2, 3, 4], 50) == 2.5
+    assert percentile([], 95) == 0.0
+
+
+def test_run_batch_dedupes_and_summarises():
+    calls = []
+
+    def runner(query, budget):
+        calls.append(query)
+        if "fail" in query:
+            raise RuntimeError("boom")
+        return {"topic": query}
+
+    items = list(run_batch(["History of Rome", "history of rome?", "fail me"], runner, concurrency=2))
+    summary = items[-1]["summary"]
+    results = sorted(items[:-1], key=lambda item: item["index"])
+
+    assert len(calls) == 2
+    assert results[0]["result"] == results[1]["result"]
+    assert results[2]["status"] == "failed"
+    assert summary["total"] == 3 and summary["unique"] == 2 and summary["failed"] == 1
+
+
+def test_closing_a_batch_cancels_running_queries():
+    budgets = []
+
+    def runner(query, budget):
+        budgets.append(budget)
+        while len(budgets) < 3:
+            time.sleep(0.01)  # Every query is running
+        while query.startswith("slow") and budget.should_continue(0):
+            time.sleep(0.01)  # An agent run checking its budget at each step
+        return {"topic": query}
+
+    batch = run_batch(["quick", "slow one", "slow two"], runner, concurrency=3)
+    assert next(batch)["query"] == "quick"
+    batch.close()  # Client disconnected while the slow queries were running
+    assert len(budgets) == 3 and all(b.cancelled.is_set() for b in budgets)
+    assert budgets[0].cancel_reason == "client_disconnected"
+
+
+def test_batch_endpoint_rejects_invalid_concurrency():
+    from main import app
+
+    client = app.test_client()
+    for concurrency in ("abc", None, 0, -2, 10_000, 2.5, True):
+        response = client.post("/research/batch", json={"queries": ["bees"], "concurrency": concurrency})
+        assert response.status_code == 400, concurrency
+        assert "concurrency" in response.get_json()["error"]
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+from benchmarks import research
+from utils import agent_setup, quotas, report_store
+
+
+def test_benchmark_runs_offline_through_endpoint_and_executor(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Reports go to a scratch outputs/ directory
+    monkeypatch.setattr(agent_setup, "_components", {})
+    monkeypatch.setattr(report_store, "_store", {})
+    monkeypatch.setattr(quotas, "_manager", {})
+    report = research.run_benchmark(requests=6, concurrency=3, searches=2)
+
+    for target in ("endpoint", "executor"):
+        metrics = report["results"][target]
+        assert metrics["errors"] == 0, metrics["first_error"]
+        assert metrics["rps"] > 0
+        assert metrics["latency_p50"] <= metrics["latency_p99"]
+    assert report["search_calls"] > 0
+
+
+def test_compare_flags_regressions():
+    baseline = {"results": {"executor": {"rps": 100.0, "latency_p95": 0.1}}}
+    report = {"results": {"executor": {"rps": 80.0, "latency_p95": 0.1}}}
+    assert research.compare(report, baseline, 0.1) == ["executor.rps"]
@@ -0,0 +1,139 @@
+import sys
+import os
+import asyncio
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from langchain.agents import create_tool_calling_agent
+from langchain.tools import Tool
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from utils.agent_setup import ResearchResponse
+from utils.budget import (
+    TOOL_BUDGET_MESSAGE, RunBudget, RunCancelled, current_budget, partial_response,
+)
+from utils.job_queue import InProcessJobQueue
+from utils.parallel_executor import ParallelAgentExecutor
+
+
+class LoopingModel(BaseChatModel):
+    """Never answers: requests two searches on every turn"""
+
+    @property
+    def _llm_type(self):
+        return "looping"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        turn = sum(1 for message in messages if message.type == "ai")
+        message = AIMessage(content="", tool_calls=[
+            {"name": "search", "args": {"__arg1": f"q{turn}-{i}"}, "id": f"call_{turn}_{i}"}
+            for i in range(2)
+        ])
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def run_looping_agent(budget):
+    calls = []
+    tools = [Tool(name="search", func=lambda q: calls.append(q) or f"result {q}", description="search")]
+    prompt = ChatPromptTemplate.from_messages(
+        [("human", "{query}"), ("placeholder", "{agent_scratchpad}")]
+    )
+    agent = create_tool_calling_agent(LoopingModel(), tools, prompt)
+    executor = ParallelAgentExecutor(agent=agent, tools=tools, return_intermediate_steps=True)
+    token = current_budget.set(budget)
+    try:
+        return executor.invoke({"query": "loop"}), calls
+    finally:
+        current_budget.reset(token)
+
+
+def test_async_deadline_interrupts_in_flight_tool():
+    async def slow_search(q):
+        await asyncio.sleep(5)
+        return f"result {q}"
+
+    tools = [Tool(name="search", func=None, coroutine=slow_search, description="search")]
+    prompt = ChatPromptTemplate.from_messages(
+        [("human", "{query}"), ("placeholder", "{agent_scratchpad}")]
+    )
+    agent = create_tool_calling_agent(LoopingModel(), tools, prompt)
+    executor = ParallelAgentExecutor(agent=agent, tools=tools)
+    budget = RunBudget(deadline=0.2)
+
+    async def run():
+        token = current_budget.set(budget)
+        try:
+            return await executor.ainvoke({"query": "loop"})
+        finally:
+            current_budget.reset(token)
+
+    started = time.monotonic()
+    result = asyncio.run(run())
+    assert time.monotonic() - started < 2
+    assert budget.reason == "deadline"
+    assert result["output"] == ""
+
+
+def test_iteration_budget_truncates_looping_agent():
+    budget = RunBudget(max_iterations=3)
+    result, calls = run_looping_agent(budget)
+    assert budget.reason == "iterations"
+    assert len(calls) == 6
+
+
+def test_tool_budget_refuses_calls_then_stops():
+    budget = RunBudget(max_iterations=20, max_tool_calls=3)
+    result, calls = run_looping_agent(budget)
+    assert budget.reason == "tool_budget"
+    assert len(calls) == 3
+    observations = [step[1] for step in result["intermediate_steps"]]
+    assert TOOL_BUDGET_MESSAGE in observations
+
+
+def test_cancelled_run_is_killed():
+    budget = RunBudget()
+    budget.cancel("client_disconnected")
+    with pytest.raises(RunCancelled):
+        run_looping_agent(budget)
+
+
+def test_partial_response_keeps_relevant_evidence_and_sources():
+    results = [
+        {"tool": "research_evidence", "input": "tides",
+         "output": "Tides are caused by the gravity of the Moon. See https://example.com/tides for more."},
+        {"tool": "research_evidence", "input": "weather",
+         "output": "Unrelated weather report for the weekend ahead."},
+    ]
+    response = partial_response("what causes tides", results, "deadline", ResearchResponse)
+    assert "time limit" in response.summary
+    assert "gravity of the Moon" in response.summary
+    assert response.sources == ["https://example.com/tides"]
+    assert response.tools_used == ["research_evidence"]
+
+
+def test_job_cancellation_stops_queued_and_running_jobs():
+    def handler(payload):
+        budget = RunBudget()  # Picks up the job's cancellation event
+        while budget.should_continue(0):
+            time.sleep(0.01)
+
+    queue = InProcessJobQueue(handler, max_workers=1)
+    running = queue.submit({"query": "a"})
+    waiting = queue.submit({"query": "b"})
+    deadline = time.time() + 2
+    while queue.get(running)["status"] != "running" and time.time() < deadline:
+        time.sleep(0.01)
+
+    assert queue.cancel(waiting)["status"] == "cancelled"
+    assert queue.cancel(running)["status"] == "running"
+    while queue.get(running)["status"] == "running" and time.time() < deadline:
+        time.sleep(0.01)
+    assert queue.get(running)["status"] == "cancelled"
+    assert queue.get(waiting)["started_at"] is None
+    assert queue.cancel("unknown") is None
+    queue.shutdown()
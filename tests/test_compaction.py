@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from langchain_core.agents import AgentAction
+from utils.compaction import ToolOutputCompactor
+from utils.metrics import RequestTimings, current_timings
+from utils.ranking import BM25, split_passages
+from utils.tokens import estimate_tokens
+
+FILLER = " ".join(f"Unrelated sentence number {i} about nothing in particular." for i in range(60))
+
+
+def step(tool_input, output, tool="search"):
+    return (AgentAction(tool=tool, tool_input=tool_input, log=""), output)
+
+
+def test_bm25_prefers_matching_passages():
+    passages = split_passages((
+        "Cats purr loudly when they are content. Volcanoes erupt lava and ash. "
+        "Dogs bark at strangers during the night."
+    ))
+    scores = BM25(passages).scores("volcanoes and lava")
+    assert scores.index(max(scores)) == 1
+
+
+def test_compaction_dedupes_and_fits_budget():
+    compactor = ToolOutputCompactor(budget=300, per_output=150, mode="truncate")
+    steps = [step("a", FILLER), step("b", FILLER), step("c", "Short result.")]
+    compacted = [obs for _, obs in compactor.compact(steps)]
+
+    assert estimate_tokens(compacted[0]) <= 150
+    assert compacted[1].startswith("(Same result")
+    assert compacted[2] == "Short result."
+
+
+def test_rank_mode_keeps_relevant_passage():
+    text = FILLER + " The Colosseum was completed in 80 AD under Titus. " + FILLER[:500]
+    compactor = ToolOutputCompactor(budget=100, per_output=100, mode="rank")
+    (_, observation), = compactor.compact([step("colosseum completed", text)])
+    assert "Colosseum was completed in 80 AD" in observation
+    assert estimate_tokens(observation) <= 110
+
+
+def test_accounting_records_before_and_after():
+    timings = RequestTimings()
+    token = current_timings.set(timings)
+    try:
+        ToolOutputCompactor(budget=200, per_output=100, mode="truncate")([step("a", FILLER)])
+    finally:
+        current_timings.reset(token)
+    compacted = timings.as_dict()["prompt_tokens"]["compacted"]
+    assert compacted["before"] == estimate_tokens(FILLER)
+    assert compacted["after"] <= 100
@@ -0,0 +1,84 @@
+import sys
+import os
+import multiprocessing
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import disk_cache
+from utils.disk_cache import DiskCache
+from utils.search import CachedSearch, StubSearchBackend
+
+
+def test_disk_cache_survives_restart_and_shares_identical_content(tmp_path):
+    path = str(tmp_path / "fetch.sqlite3")
+    cache = DiskCache(path)
+    results = [{"title": "Python", "url": "https://example.com", "text": "Python " * 500}]
+    cache.set("wikipedia", "python", results)
+    cache.set("wikipedia", "python language", results)
+
+    reopened = DiskCache(path)  # New process after a restart
+    assert reopened.get("wikipedia", "python") == results
+    assert reopened.get("duckduckgo", "python") is None  # Sources never mix
+    stats = reopened.stats()
+    assert stats["entries"] == 2
+    assert stats["bytes"] < len("Python " * 500) // 10  # One compressed blob
+
+
+def test_disk_cache_expires_per_source_and_evicts_lru(tmp_path):
+    cache = DiskCache(str(tmp_path / "fetch.sqlite3"), ttls={"duckduckgo": -1})
+    cache.set("duckduckgo", "stale", "result")
+    assert cache.get("duckduckgo", "stale") is None
+
+    bounded = DiskCache(str(tmp_path / "bounded.sqlite3"), max_bytes=3000)
+    for i in range(10):
+        bounded.set("search", f"query {i}", os.urandom(400).hex())  # ~800 compressed bytes
+    assert bounded.stats()["bytes"] <= 3000
+    assert bounded.get("search", "query 9") is not None
+    assert bounded.get("search", "query 0") is None
+
+
+def test_disk_cache_only_sweeps_when_over_budget_or_due(tmp_path, monkeypatch):
+    monkeypatch.setattr(disk_cache, "SWEEP_INTERVAL", 5)
+    cache = DiskCache(str(tmp_path / "fetch.sqlite3"), ttls={"duckduckgo": -1})
+    sweeps = []
+    evict = cache._evict
+    monkeypatch.setattr(cache, "_evict", lambda conn, now: sweeps.append(now) or evict(conn, now))
+    for i in range(4):
+        cache.set("duckduckgo", f"stale {i}", f"result {i}")
+    assert sweeps == [] and cache.stats()["entries"] == 4  # Writes never scanned
+    cache.set("wikipedia", "fresh", "result")
+    assert len(sweeps) == 1 and cache.stats()["entries"] == 1  # Expired rows swept
+    conn = cache._connect()
+    assert cache.stats()["bytes"] == conn.execute("SELECT SUM(size) FROM blobs").fetchone()[0]
+    plan = conn.execute("EXPLAIN QUERY PLAN DELETE FROM entries WHERE expires_at <= 0").fetchall()
+    assert "entries_expires" in str(plan)
+
+
+def test_cached_search_uses_disk_cache_as_second_level(tmp_path):
+    cache = DiskCache(str(tmp_path / "fetch.sqlite3"))
+    backend = StubSearchBackend()
+    first = CachedSearch(backend, rate=100, burst=100, disk=lambda: cache).run("Python history")
+    restarted = CachedSearch(backend, rate=100, burst=100, disk=lambda: cache)
+    assert restarted.run("python history") == first
+    assert backend.calls == 1
+    assert restarted.stats()["disk_hits"] == 1
+
+
+def _write_many(path, worker):
+    cache = DiskCache(path, max_bytes=20000)
+    for i in range(25):
+        cache.set("search", f"w{worker} q{i}", f"result {worker} {i} " * 20)
+        cache.get("search", f"w{(worker + 1) % 4} q{i}")
+
+
+def test_disk_cache_is_safe_across_processes(tmp_path):
+    path = str(tmp_path / "fetch.sqlite3")
+    DiskCache(path)  # Create the schema once
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_write_many, args=(path, w)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join(30)
+    assert all(process.exitcode == 0 for process in processes)
+    stats = DiskCache(path).stats()
+    assert 0 < stats["entries"] <= 100
+    assert stats["bytes"] <= 20000
@@ -0,0 +1,70 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import gzip
+import io
+import zipfile
+import pytest
+from main import app
+from utils import report_store
+from utils.agent_setup import ResearchResponse
+from utils.report_store import ReportStore
+
+
+@pytest.fixture
+def reports(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)  # Downloads are served from ./outputs
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    monkeypatch.setattr(report_store, "_store", {"default": store})
+    return [
+        store.add("q", ResearchResponse(topic=topic, summary="Tidal forces. " * 100,
+                                        sources=[], tools_used=[]))
+        for topic in ("Tides", "Moons")
+    ]
+
+
+def test_download_revalidates_ranges_and_compresses(reports):
+    client = app.test_client()
+    url = f"/download/{reports[0]['filename']}"
+
+    full = client.get(url)
+    assert full.status_code == 200
+    assert full.data.startswith(b"# Tides")
+    etag = full.headers["ETag"]
+
+    assert client.get(url, headers={"If-None-Match": etag}).status_code == 304
+
+    partial = client.get(url, headers={"Range": "bytes=0-6"})
+    assert partial.status_code == 206
+    assert partial.data == b"# Tides"
+    assert partial.headers["Content-Range"] == f"bytes 0-6/{len(full.data)}"
+    assert client.get(url, headers={"Range": "bytes=99999-"}).status_code == 416
+
+    compressed = client.get(url, headers={"Accept-Encoding": "gzip"})
+    assert compressed.headers["Content-Encoding"] == "gzip"
+    assert compressed.headers["ETag"] != etag
+    assert gzip.decompress(compressed.data) == full.data
+    assert os.path.isfile(os.path.join("outputs", reports[0]["filename"] + ".gz"))
+
+
+def test_bundle_streams_zip_of_reports(reports):
+    client = app.test_client()
+    response = client.get(f"/download?ids={reports[0]['id']},{reports[1]['id']}")
+    assert response.status_code == 200
+    archive = zipfile.ZipFile(io.BytesIO(response.data))
+    assert archive.namelist() == [r["filename"] for r in reports]
+    assert archive.read(reports[1]["filename"]).startswith(b"# Moons")
+    assert client.get("/download?ids=missing").status_code == 404
+
+
+def test_only_stored_reports_are_downloadable(reports):
+    client = app.test_client()
+    os.makedirs("outputs", exist_ok=True)
+    with open(os.path.join("outputs", "reports.sqlite3"), "wb") as f:
+        f.write(b"SQLite format 3\0")  # Anything else living in outputs/
+    assert client.get("/download/reports.sqlite3").status_code == 404
+    assert client.get("/download/..%2Freports.sqlite3").status_code == 404
+
+    variant = client.get(f"/download/{reports[0]['filename']}.gz")
+    assert variant.status_code == 200
+    assert gzip.decompress(variant.data).startswith(b"# Tides")
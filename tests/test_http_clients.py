@@ -0,0 +1,92 @@
+import sys
+import os
+import asyncio
+import multiprocessing
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import http_clients
+from utils.metrics import registry
+
+
+class Ok(BaseHTTPRequestHandler):
+    def do_GET(self):
+        self.send_response(200)
+        self.send_header("Content-Length", "2")
+        self.end_headers()
+        self.wfile.write(b"ok")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_clients_are_shared_and_configured_per_backend(monkeypatch):
+    monkeypatch.setenv("SEARCH_READ_TIMEOUT", "3")
+    monkeypatch.setattr(http_clients, "_clients", {})
+    client = http_clients.get_http_client("search")
+    assert http_clients.get_http_client("search") is client
+    assert client.timeout.read == 3.0
+    assert http_clients.get_http_client("openai") is not client
+
+
+def test_pool_stats_report_saturation():
+    stats = http_clients.PoolStats("test", max_connections=4)
+    stats.started()
+    stats.started()
+    stats.finished(failed=True)
+    snapshot = stats.snapshot()
+    assert snapshot["in_flight"] == 1 and snapshot["peak_in_flight"] == 2
+    assert snapshot["errors"] == 1 and snapshot["saturation"] == 0.25
+
+
+def _request_in_child(client, url, inherited, results):
+    child_pool = client._transport._pool()
+    client.get(url)
+    stats = http_clients.pool_stats()["openai"]
+    results.put((child_pool is not inherited, stats["requests"], stats["in_flight"]))
+
+
+def test_inherited_client_gets_own_pool_and_metrics_after_fork():
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Ok)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    try:
+        client = http_clients.get_http_client("openai")  # Warmed in the "master"
+        client.get(url)
+        inherited = client._transport._pool()
+        context = multiprocessing.get_context("fork")
+        results = context.Queue()
+        worker = context.Process(target=_request_in_child, args=(client, url, inherited, results))
+        worker.start()
+        worker.join(10)
+        assert worker.exitcode == 0
+        assert results.get(timeout=1) == (True, 1, 0)  # Fresh pool, counted in the worker
+        assert "http_pool_requests_total" in registry.render()
+    finally:
+        server.shutdown()
+
+
+def test_streamed_responses_stay_in_flight_until_closed(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Ok)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    url = f"http://127.0.0.1:{server.server_port}/"
+    monkeypatch.setattr(http_clients, "_clients", {})
+    monkeypatch.setattr(http_clients, "_stats", {})
+    in_flight = lambda: http_clients.pool_stats()["search"]["in_flight"]
+    try:
+        with http_clients.get_http_client("search").stream("GET", url) as response:
+            assert in_flight() == 1  # Headers received, body not yet read
+            assert response.read() == b"ok"
+        assert in_flight() == 0
+
+        async def stream_async():
+            client = http_clients.get_async_http_client("search")
+            async with client.stream("GET", url) as response:
+                during = in_flight()
+                await response.aread()
+            return during
+
+        assert asyncio.run(stream_async()) == 1
+        assert in_flight() == 0
+    finally:
+        server.shutdown()
@@ -0,0 +1,132 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from utils.job_queue import InProcessJobQueue, SQLiteJobQueue, QueueFullError
+
+
+def wait_for(queue, job_id, timeout=5):
+    deadline = time.time() + timeout
+    while time.time() < deadline:
+        job = queue.get(job_id)
+        if job["status"] in ("succeeded", "failed"):
+            return job
+        time.sleep(0.01)
+    raise AssertionError("job did not finish")
+
+
+def test_in_process_queue_runs_jobs():
+    queue = InProcessJobQueue(lambda p: {"echo": p["query"]}, max_workers=2)
+    job_id = queue.submit({"query": "topic"})
+    job = wait_for(queue, job_id)
+    assert job["status"] == "succeeded"
+    assert job["result"] == {"echo": "topic"}
+    queue.shutdown()
+
+
+def test_in_process_queue_records_failures():
+    def boom(payload):
+        raise RuntimeError("agent exploded")
+
+    queue = InProcessJobQueue(boom, max_workers=1)
+    job = wait_for(queue, queue.submit({"query": "x"}))
+    assert job["status"] == "failed"
+    assert "agent exploded" in job["error"]
+    queue.shutdown()
+
+
+def test_sqlite_queue_rejects_when_full(tmp_path):
+    queue = SQLiteJobQueue(lambda p: p, str(tmp_path / "jobs.db"), max_workers=0, max_depth=1)
+    queue.submit({"query": "first"})
+    with pytest.raises(QueueFullError):
+        queue.submit({"query": "second"})
+    assert queue.depth() == 1
+
+
+def test_sqlite_queue_shared_between_instances(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    producer = SQLiteJobQueue(lambda p: p, path, max_workers=0)
+    job_id = producer.submit({"query": "shared"})
+    consumer = SQLiteJobQueue(lambda p: {"seen": p["query"]}, path, max_workers=1, poll_interval=0.01)
+    consumer._ensure_workers()
+    job = wait_for(producer, job_id)
+    assert job["result"] == {"seen": "shared"}
+    consumer.shutdown()
+
+
+def test_worker_survives_backend_errors(tmp_path, monkeypatch):
+    queue = SQLiteJobQueue(lambda p: {"seen": p["query"]}, str(tmp_path / "jobs.db"),
+                           max_workers=0, poll_interval=0.01)
+    job_id = queue.submit({"query": "locked"})
+    claim, failures = queue._claim, []
+
+    def flaky(timeout):
+        if len(failures) < 2:
+            failures.append(timeout)
+            raise RuntimeError("database is locked")
+        return claim(timeout)
+
+    monkeypatch.setattr(queue, "_claim", flaky)
+    queue.max_workers = 1
+    queue._ensure_workers()
+    job = wait_for(queue, job_id)
+    assert len(failures) == 2 and job["result"] == {"seen": "locked"}
+    queue.shutdown()
+
+
+def test_sqlite_queue_requeues_jobs_of_lost_workers(tmp_path):
+    path = str(tmp_path / "jobs.db")
+    crashed = SQLiteJobQueue(lambda p: p, path, max_workers=0)
+    job_id = crashed.submit({"query": "orphan"})
+    assert crashed._claim(timeout=0)[0] == job_id  # Claimed, then the process died
+    assert crashed.get(job_id)["status"] == "running"
+
+    survivor = SQLiteJobQueue(lambda p: {"rerun": p["query"]}, path, max_workers=1,
+                              poll_interval=0.01, lease=0.2)
+    survivor._ensure_workers()
+    job = wait_for(survivor, job_id)
+    assert job["result"] == {"rerun": "orphan"}
+    survivor.shutdown()
+
+
+def test_sqlite_queue_fails_jobs_that_keep_losing_workers(tmp_path):
+    queue = SQLiteJobQueue(lambda p: p, str(tmp_path / "jobs.db"), max_workers=0,
+                           lease=0, max_attempts=2)
+    job_id = queue.submit({"query": "poison"})
+    for _ in range(2):
+        assert queue._claim(timeout=0)[0] == job_id
+        time.sleep(0.01)
+    assert queue._claim(timeout=0) is None
+    job = queue.get(job_id)
+    assert job["status"] == "failed" and "Worker lost" in job["error"]
+
+
+def test_sqlite_queue_ignores_outcomes_of_superseded_runs(tmp_path):
+    queue = SQLiteJobQueue(lambda p: p, str(tmp_path / "jobs.db"), max_workers=0, lease=0)
+    job_id = queue.submit({"query": "twice"})
+    _, _, _, lost = queue._claim(timeout=0)
+    time.sleep(0.01)
+    _, _, _, current = queue._claim(timeout=0)  # Requeued and claimed again
+    queue._finish(job_id, "failed", error="late", claim=lost)
+    assert queue.get(job_id)["status"] == "running"
+    queue._finish(job_id, "succeeded", result={"ok": True}, claim=current)
+    assert queue.get(job_id)["result"] == {"ok": True}
+
+
+def test_sqlite_claim_failure_returns_the_run_slot(tmp_path, monkeypatch):
+    from utils.quotas import InMemoryQuotaStore, QuotaManager
+
+    store = InMemoryQuotaStore()
+    manager = QuotaManager(store, max_concurrent=1)
+    queue = SQLiteJobQueue(lambda p: p, str(tmp_path / "jobs.db"), max_workers=0,
+                           quotas=lambda: manager)
+    queue.submit({"query": "x", "subject": "user:a"})
+
+    def broken(subject):
+        raise RuntimeError("database is locked")
+
+    monkeypatch.setattr(queue, "_weight", broken)
+    with pytest.raises(RuntimeError):
+        queue._claim(timeout=0)
+    assert store.running("user:a") == 0
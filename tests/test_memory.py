@@ -0,0 +1,92 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import json
+from utils import memory, pipeline, report_store, routing
+from utils.agent_setup import ResearchResponse
+from utils.memory import (
+    ConversationMemory, InMemorySessionStore, SQLiteSessionStore, session_key,
+)
+from utils.report_store import ReportStore
+
+
+def response(topic, summary):
+    return ResearchResponse(topic=topic, summary=summary, sources=[], tools_used=["search"])
+
+
+def test_history_stays_within_budget_and_summarizes_old_turns():
+    mem = ConversationMemory(InMemorySessionStore(), token_budget=200)
+    for i in range(6):
+        mem.record("s", f"question {i}", response(f"Topic {i}", f"Answer {i}. " + "detail " * 40),
+                   [{"tool": "search", "input": f"q{i}", "output": "result " * 30},
+                    {"tool": "save_text_to_file", "input": "x", "output": "saved"}])
+
+    data = mem.store.get("s")
+    assert mem.tokens(data) <= 200
+    assert data["summary"].splitlines()[-1] == "- question 4 -> Topic 4: Answer 4."
+    assert data["turns"][-1]["query"] == "question 5"
+    assert all(t["tool"] == "search" for t in data["tools"])
+
+    messages = mem.history("s")
+    assert messages[0].type == "system"
+    assert [m.type for m in messages[1:3]] == ["human", "ai"]
+    assert mem.history("unknown") == []
+
+
+def test_sqlite_sessions_are_shared_and_evicted(tmp_path):
+    path = str(tmp_path / "sessions.sqlite3")
+    store = SQLiteSessionStore(path, max_sessions=2)
+    for name in ("a", "b", "c"):
+        store.put(name, {"summary": name, "turns": [], "tools": []})
+
+    other_process_view = SQLiteSessionStore(path)
+    assert other_process_view.get("a") is None  # Least recently updated evicted
+    assert other_process_view.get("c")["summary"] == "c"
+
+
+def test_sqlite_turns_from_concurrent_workers_are_all_kept(tmp_path):
+    import threading
+
+    path = str(tmp_path / "sessions.sqlite3")
+    workers = [ConversationMemory(SQLiteSessionStore(path), token_budget=10000) for _ in range(4)]
+
+    def record(mem, worker):
+        for i in range(5):
+            mem.record("s", f"w{worker} q{i}", response("Topic", "Answer."))
+
+    threads = [threading.Thread(target=record, args=(mem, w)) for w, mem in enumerate(workers)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(SQLiteSessionStore(path).get("s")["turns"]) == 20
+
+
+def test_session_keys_are_namespaced():
+    assert session_key(None, None) is None
+    assert session_key("abc") == "session:abc"
+    assert session_key("abc", "alice") == "user:alice:abc"
+    assert session_key(None, "alice") is None  # Identity alone is stateless
+
+
+def test_follow_up_receives_previous_turn(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(report_store, "_store", {"default": ReportStore(str(tmp_path / "r.db"))})
+    monkeypatch.setattr(memory, "_memory", {"default": ConversationMemory(InMemorySessionStore())})
+    seen = []
+
+    class Executor:
+        def invoke(self, inputs, config=None):
+            seen.append(inputs["chat_history"])
+            output = {"topic": inputs["query"], "summary": "Bees make honey.",
+                      "sources": [], "tools_used": []}
+            return {"output": json.dumps(output)}
+
+    monkeypatch.setattr(pipeline, "get_agent_executor", lambda tier=None: Executor())
+    monkeypatch.setattr(routing, "_router", {"default": routing.Router([routing.DEFAULT_TIER])})
+    pipeline.run_research("bees", use_cache=False, session_id="session:t")
+    pipeline.run_research("and wasps?", session_id="session:t")
+
+    assert seen[0] == []
+    assert [m.content for m in seen[1]] == ["bees", "bees\n\nBees make honey."]
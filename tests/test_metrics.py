@@ -0,0 +1,60 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, LLMResult
+from utils.metrics import Registry, MetricsCallbackHandler, RequestTimings, token_usage
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("demo_seconds", "Demo latency", buckets=(0.1, 1))
+    latency.observe(0.05, stage="agent")
+    latency.observe(0.5, stage="agent")
+    latency.observe(5, stage="agent")
+    registry.counter("demo_total", "Demo runs").inc(status="ok")
+
+    text = registry.render()
+    assert "# TYPE demo_seconds histogram" in text
+    assert 'demo_seconds_bucket{stage="agent",le="0.1"} 1' in text
+    assert 'demo_seconds_bucket{stage="agent",le="1.0"} 2' in text
+    assert 'demo_seconds_bucket{stage="agent",le="+Inf"} 3' in text
+    assert 'demo_seconds_count{stage="agent"} 3' in text
+    assert 'demo_total{status="ok"} 1' in text
+
+
+def test_callback_records_tokens_and_tool_calls():
+    timings = RequestTimings()
+    handler = MetricsCallbackHandler(timings)
+    message = AIMessage(
+        content="done",
+        usage_metadata={"input_tokens": 120, "output_tokens": 30, "total_tokens": 150},
+    )
+    result = LLMResult(generations=[[ChatGeneration(message=message)]])
+    assert token_usage(result) == (120, 30)
+
+    handler.on_chat_model_start({}, [], run_id="llm")
+    handler.on_llm_end(result, run_id="llm")
+    handler.on_tool_start({"name": "search"}, "bees", run_id="tool")
+    handler.on_tool_end("results", run_id="tool")
+    with timings.stage("parse"):
+        pass
+
+    breakdown = timings.as_dict()
+    assert breakdown["llm_calls"] == 1
+    assert breakdown["llm_tokens_in"] == 120
+    assert breakdown["llm_tokens_out"] == 30
+    assert breakdown["tool_calls"] == 1
+    assert "parse" in breakdown["stages"]
+
+
+def test_metrics_endpoint_serves_prometheus_text():
+    from main import app
+
+    client = app.test_client()
+    client.get("/login")
+    response = client.get("/metrics")
+    assert response.status_code == 200
+    assert response.mimetype == "text/plain"
+    assert 'http_requests_total{endpoint="/login",method="GET",status="200"}' in response.get_data(as_text=True)
@@ -0,0 +1,56 @@
+import sys
+import os
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from langchain.agents import create_tool_calling_agent
+from langchain.tools import Tool
+from langchain_core.language_models.chat_models import BaseChatModel
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration, ChatResult
+from langchain_core.prompts import ChatPromptTemplate
+from utils.parallel_executor import ParallelAgentExecutor
+
+
+class ThreeSearchesModel(BaseChatModel):
+    """Requests three searches in one turn, then answers"""
+
+    @property
+    def _llm_type(self):
+        return "three-searches"
+
+    def bind_tools(self, tools, **kwargs):
+        return self
+
+    def _generate(self, messages, stop=None, run_manager=None, **kwargs):
+        if any(message.type == "tool" for message in messages):
+            observations = [message.content for message in messages if message.type == "tool"]
+            message = AIMessage(content="|".join(observations))
+        else:
+            message = AIMessage(
+                content="",
+                tool_calls=[
+                    {"name": "slow", "args": {"__arg1": str(i)}, "id": f"call_{i}"}
+                    for i in range(3)
+                ],
+            )
+        return ChatResult(generations=[ChatGeneration(message=message)])
+
+
+def test_tool_calls_in_one_step_run_concurrently_in_order():
+    def slow(text):
+        time.sleep(0.3 - int(text) * 0.1)  # Later calls finish first
+        return f"result-{text}"
+
+    tools = [Tool(name="slow", func=slow, description="slow lookup")]
+    prompt = ChatPromptTemplate.from_messages(
+        [("human", "{query}"), ("placeholder", "{agent_scratchpad}")]
+    )
+    agent = create_tool_calling_agent(ThreeSearchesModel(), tools, prompt)
+    executor = ParallelAgentExecutor(agent=agent, tools=tools, max_parallel_tools=3)
+
+    start = time.time()
+    result = executor.invoke({"query": "go"})
+    elapsed = time.time() - start
+
+    assert result["output"] == "result-0|result-1|result-2"
+    assert elapsed < 0.5  # Sequential execution would take 0.6s
@@ -0,0 +1,93 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import pytest
+from utils import quotas
+from utils.job_queue import FairQueue, SQLiteJobQueue
+from utils.quotas import InMemoryQuotaStore, QuotaExceeded, QuotaManager, SQLiteQuotaStore
+
+
+def test_rate_and_concurrency_limits():
+    manager = QuotaManager(InMemoryQuotaStore(), rate=0.1, burst=2, max_concurrent=1)
+    lease = manager.reserve("user:a")
+    with pytest.raises(QuotaExceeded) as rejected:
+        manager.reserve("user:a")  # Second token available, but no run slot
+    assert rejected.value.reason == "concurrency"
+    manager.release(lease)
+
+    with pytest.raises(QuotaExceeded) as rejected:
+        manager.check_rate("user:a")  # Bucket of 2 is empty now
+    assert rejected.value.reason == "rate" and rejected.value.retry_after >= 1
+    manager.check_rate("user:b")  # Other users are unaffected
+
+
+def test_sqlite_store_is_shared_between_processes(tmp_path):
+    path = str(tmp_path / "quotas.db")
+    first, second = SQLiteQuotaStore(path), SQLiteQuotaStore(path)
+    assert first.acquire("user:a", limit=1) is not None
+    assert second.acquire("user:a", limit=1) is None
+    assert first.take("user:a", rate=0.01, burst=1) == 0
+    assert second.take("user:a", rate=0.01, burst=1) > 0
+
+
+def test_fair_queue_weighted_round_robin_skips_busy_subjects():
+    queue = FairQueue(max_depth=20, weight=lambda s: 2.0 if s == "heavy" else 1.0)
+    for i in range(6):
+        queue.put_nowait("hog", f"hog{i}")
+    for i in range(4):
+        queue.put_nowait("heavy", f"heavy{i}")
+    queue.put_nowait("busy", "busy0")
+
+    admit = lambda subject: (subject != "busy", None)
+    order = [queue.get(0, admit)[0] for _ in range(9)]
+    assert order.count("heavy") == 4 and order[:6].count("heavy") == 4
+    assert "busy" not in order and queue.qsize() == 2
+
+
+def test_sqlite_job_queue_claims_fairly(tmp_path):
+    queue = SQLiteJobQueue(lambda p: p, str(tmp_path / "jobs.db"), max_workers=0)
+    for i in range(3):
+        queue.submit({"query": f"hog {i}", "subject": "hog"})
+    queue.submit({"query": "small", "subject": "small"})
+    claimed = [queue._claim(0)[1]["subject"] for _ in range(3)]
+    assert claimed.index("small") <= 1
+
+
+def test_research_endpoint_returns_retry_after(monkeypatch):
+    from api import research_api
+    from main import app
+
+    monkeypatch.setattr(quotas, "_manager", {})
+    quotas.set_quota_manager(QuotaManager(InMemoryQuotaStore(), rate=0.01, burst=1))
+    monkeypatch.setattr(research_api, "run_research", lambda query, **kwargs: {"topic": query})
+    client = app.test_client()
+
+    assert client.post("/research", json={"query": "one"}).status_code == 200
+    response = client.post("/research", json={"query": "two"})
+    assert response.status_code == 429
+    assert int(response.headers["Retry-After"]) >= 1
+
+
+def test_batch_holds_one_slot_per_query_in_flight(monkeypatch):
+    import threading
+    import time
+    from utils.batch import run_batch
+
+    store = InMemoryQuotaStore()
+    monkeypatch.setattr(quotas, "_manager", {"default": QuotaManager(store, max_concurrent=2)})
+    slots = quotas.BatchSlots("user:a", quotas.reserve("user:a"))
+    peak, lock = [0], threading.Lock()
+
+    def run(query, budget):
+        with slots.slot(budget.cancelled):
+            with lock:
+                peak[0] = max(peak[0], store.running("user:a"))
+            time.sleep(0.05)
+        return {"topic": query}
+
+    items = list(run_batch([f"query {i}" for i in range(5)], run, concurrency=4))
+    slots.close()
+    assert items[-1]["summary"]["succeeded"] == 5
+    assert peak[0] == 2  # Never more runs than the user's concurrency quota
+    assert store.running("user:a") == 0  # Every slot released with its run
@@ -0,0 +1,27 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import markdown
+from utils import rendering
+from utils.rendering import EXTENSIONS, content_hash, render_markdown_html, render_summary
+from utils.report_store import ReportStore
+
+
+def test_reused_converter_matches_fresh_and_resets_between_documents():
+    text = "| a | b |\n|---|---|\n| 1 | 2 |\n\n```\ncode\n```\n\n[link][ref]\n\n[ref]: https://example.com"
+    assert render_markdown_html(text) == markdown.markdown(text, extensions=EXTENSIONS)
+    # Reference definitions from the previous document must not leak
+    assert "href" not in render_markdown_html("[link][ref]")
+
+
+def test_render_summary_persists_html_by_content_hash(tmp_path, monkeypatch):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    calls = []
+    monkeypatch.setattr(rendering, "render_markdown_html", lambda text: calls.append(text) or "<p>x</p>")
+
+    text = "Unique summary for the render cache test"
+    assert render_summary(text, store) == "<p>x</p>"
+    assert store.get_html(content_hash(text)) == "<p>x</p>"
+    rendering._html_cache.clear()  # Simulate another worker process
+    assert render_summary(text, store) == "<p>x</p>"
+    assert calls == [text]  # Rendered exactly once
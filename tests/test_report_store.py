@@ -0,0 +1,96 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from concurrent.futures import ThreadPoolExecutor
+from utils.agent_setup import ResearchResponse
+from utils.report_store import ReportStore, fts_query
+
+
+def make_response(topic, summary="Findings", sources=("https://example.com",)):
+    return ResearchResponse(topic=topic, summary=summary, sources=list(sources), tools_used=["search"])
+
+
+def test_concurrent_reports_on_same_topic_never_collide(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    with ThreadPoolExecutor(max_workers=8) as pool:
+        records = list(pool.map(
+            lambda i: store.add("bees?", make_response("Honey Bees", f"Summary {i}")), range(20)
+        ))
+
+    assert len({r["filename"] for r in records}) == 20
+    assert store.count() == 20
+    assert store.get(records[3]["id"])["summary"] == "Summary 3"
+
+
+def test_full_text_search_ranks_matches(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    store.add("q", make_response("Roman aqueducts", "Engineering of water supply in Rome"))
+    store.add("q", make_response("Coral reefs", "Bleaching and ocean warming"))
+
+    assert [r["topic"] for r in store.search("aqueduct")] == ["Roman aqueducts"]
+    assert [r["topic"] for r in store.search("ocean warm")] == ["Coral reefs"]
+    assert store.search('" OR *') == []
+    assert fts_query("Rome water") == '"rome" "water"*'
+
+
+def test_export_writes_markdown_on_demand(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    record = store.add("q", make_response("Tides", "Moon and sun"))
+    outputs = tmp_path / "outputs"
+
+    path = store.export(record["filename"], str(outputs))
+    assert open(path).read() == "# Tides\n\nMoon and sun"
+    assert store.export("research_unknown.md", str(outputs)) is None
+    assert os.listdir(outputs) == [record["filename"]]
+
+
+def test_history_pages_and_markdown_import(tmp_path):
+    outputs = tmp_path / "outputs"
+    outputs.mkdir()
+    (outputs / "research_Old_Topic.md").write_text("# Old Topic\n\nSee https://example.org/a for details")
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+
+    assert store.import_markdown(str(outputs)) == 1
+    assert store.import_markdown(str(outputs)) == 0  # Idempotent
+    for i in range(4):
+        store.add("q", make_response(f"Topic {i}"))
+
+    first, cursor = store.history(limit=3)
+    second, last = store.history(limit=3, cursor=cursor)
+    assert [r["topic"] for r in first] == ["Topic 3", "Topic 2", "Topic 1"]
+    assert [r["topic"] for r in second] == ["Topic 0", "Old Topic"]
+    assert last is None
+    assert store.search("details")[0]["sources"] == ["https://example.org/a"]
+
+
+def test_search_and_history_endpoints(tmp_path, monkeypatch):
+    from main import app
+    from utils import report_store
+
+    store = ReportStore(str(tmp_path / "reports.sqlite3"))
+    store.add("volcanoes?", make_response("Volcanoes", "Magma and plate tectonics"))
+    monkeypatch.setattr(report_store, "_store", {"default": store})
+    client = app.test_client()
+
+    found = client.get("/research/search?q=tecton").get_json()
+    assert found["results"][0]["topic"] == "Volcanoes"
+    assert found["results"][0]["download_link"].startswith("/download/research_Volcanoes_")
+    assert client.get("/research/search").status_code == 400
+    history = client.get("/research/history?limit=1").get_json()
+    assert history["results"][0]["query"] == "volcanoes?"
+    assert history["next_cursor"] is None
+
+
+def test_search_pages_stop_at_the_ranked_window(tmp_path):
+    store = ReportStore(str(tmp_path / "reports.sqlite3"), candidates=5)
+    for i in range(8):
+        store.add("q", make_response(f"Glacier {i}", "Ice sheets and glaciers"))
+
+    first, next_offset, truncated = store.search_page("glacier", limit=3)
+    assert len(first) == 3 and next_offset == 3 and not truncated
+    last, next_offset, truncated = store.search_page("glacier", limit=3, offset=3)
+    assert len(last) == 2  # Capped at the window, never an empty page
+    assert next_offset is None and truncated
+    assert store.search_page("glacier", limit=3, offset=9) == ([], None, True)
+    assert store.search_page("glacier", limit=10)[1:] == (None, True)
+    assert store.search_page("aqueduct", limit=3) == ([], None, False)
@@ -0,0 +1,50 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.cache import TTLCache
+from utils.result_cache import ResultCache, normalize_query
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_normalize_query_collapses_case_and_punctuation_only():
+    assert normalize_query("History of Rome?") == normalize_query("  history of   ROME ")
+    assert normalize_query("dog bites man") != normalize_query("man bites dog")
+    assert normalize_query("impact of China on US trade") != normalize_query("impact of US on China trade")
+
+
+def test_ttl_cache_expires_and_evicts_lru():
+    clock = FakeClock()
+    cache = TTLCache(max_entries=2, ttl=10, clock=clock)
+    cache.set("a", 1)
+    cache.set("b", 2)
+    cache.get("a")  # "b" is now least recently used
+    cache.set("c", 3)
+    assert cache.get("b") is None
+    assert cache.get("a") == 1
+    clock.now = 11
+    assert cache.get("a") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_ttl_cache_respects_byte_budget():
+    cache = TTLCache(max_entries=10, max_bytes=10, sizeof=len)
+    cache.set("a", "12345")
+    cache.set("b", "123456")
+    assert cache.get("a") is None
+    assert cache.stats()["bytes"] == 6
+
+
+def test_result_cache_semantic_match():
+    vectors = {"history of rome": [1.0, 0.0], "ancient rome": [0.99, 0.1]}
+    cache = ResultCache(embed=lambda q: vectors[normalize_query(q)], similarity=0.9)
+    cache.put("History of Rome", "cached report")
+    assert cache.get("ancient Rome") == "cached report"
+    stats = cache.stats()
+    assert stats["hits"] == 1 and stats["semantic_hits"] == 1
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils.dedup import dedupe, minhash, similarity
+from utils.retrieval import Retriever, StubSource
+
+PYTHON = (
+    "Python is a high-level programming language created by Guido van Rossum "
+    "and first released in 1991 with an emphasis on readability."
+)
+
+
+def doc(title, text, url="https://example.com"):
+    return {"title": title, "url": url, "text": text}
+
+
+def test_dedupe_drops_near_duplicates():
+    near_copy = PYTHON.replace("first released", "initially released")
+    other = "Volcanoes erupt molten rock, ash and gases through vents in the crust of a planet."
+    assert similarity(minhash(PYTHON), minhash(near_copy)) > 0.6
+    assert similarity(minhash(PYTHON), minhash(other)) < 0.2
+    assert dedupe([PYTHON, near_copy, other]) == [0, 2]
+
+
+def test_retriever_merges_sources_into_ranked_pack():
+    sources = {
+        "web": StubSource("web", [
+            doc("Python (language)", PYTHON, "https://web.example/python"),
+            doc("Volcanoes", "Volcanoes erupt molten rock and ash through vents in the crust."),
+        ]),
+        "wiki": StubSource("wiki", [doc("Python", PYTHON + " ", "https://wiki.example/Python")]),
+    }
+    pack = Retriever(sources, budget=400).run("python programming language")
+
+    assert pack.startswith("Evidence for: python programming language")
+    assert pack.count("Guido van Rossum") == 1  # Same passage from both sources kept once
+    assert "[1] Python (language) (web) https://web.example/python" in pack
+    assert "Volcanoes" not in pack  # Shares no query term
+
+
+def test_retriever_respects_budget_and_skips_failed_sources():
+    def broken(query):
+        raise RuntimeError("rate limited")
+
+    passages = [doc(f"Python fact {i}", f"Python fact number {i} is distinct from the others {i * 7}.")
+                for i in range(50)]
+    sources = {"web": StubSource("web", passages), "broken": broken,
+               "slow": StubSource("slow", latency=1.0)}
+    retriever = Retriever(sources, budget=100, timeout=0.2)
+    selected = retriever.select("python fact", retriever.passages(retriever.fetch("python fact")))
+
+    assert selected and all(p["source"] == "web" for p in selected)
+    assert len(selected) < 50
@@ -0,0 +1,126 @@
+import sys
+import os
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from utils import agent_setup, pipeline, report_store, routing
+from utils.report_store import ReportStore
+from utils.routing import Router, Tier, classify
+
+LONG_SUMMARY = "Tides are caused by the gravitational pull of the Moon and the Sun. " * 5
+
+
+def test_classify_separates_lookups_from_analysis():
+    assert classify("What is photosynthesis?")[0] == "simple"
+    assert classify("capital of Peru")[0] == "simple"
+    assert classify("Compare the economic impact of solar and wind power in Europe")[0] == "complex"
+    assert classify("Why did the Roman Empire fall and how does it compare to Byzantium?")[0] == "complex"
+    assert classify("and in Chile?", follow_up=True)[1] > classify("and in Chile?")[1]
+
+
+def run_routed(tmp_path, monkeypatch, outputs):
+    """Run the pipeline with one scripted executor per tier"""
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(report_store, "_store", {"default": ReportStore(str(tmp_path / "r.db"))})
+    tiers = [Tier("fast", "fast-model", price=(1.0, 1.0)), Tier("strong", "strong-model")]
+    monkeypatch.setattr(routing, "_router", {"default": Router(tiers, min_summary_chars=100)})
+    monkeypatch.setattr(pipeline, "get_llm", lambda tier=None: None)  # No formatting re-ask
+    calls = []
+
+    class Executor:
+        def __init__(self, name):
+            self.name = name
+
+        def invoke(self, inputs, config=None):
+            calls.append(self.name)
+            return {"output": outputs[self.name]}
+
+    monkeypatch.setattr(pipeline, "get_agent_executor", lambda tier=None: Executor(tier.name))
+    response = pipeline.run_research("what is a tide", use_cache=False, include_timings=True)
+    return response, calls
+
+
+def answer(summary):
+    return json.dumps({"topic": "Tides", "summary": summary,
+                       "sources": ["https://example.com/tides"], "tools_used": []})
+
+
+def test_simple_query_stays_on_fast_tier(tmp_path, monkeypatch):
+    response, calls = run_routed(tmp_path, monkeypatch, {"fast": answer(LONG_SUMMARY)})
+    assert calls == ["fast"]
+    assert [a["outcome"] for a in response["timings"]["routing"]] == ["accepted"]
+
+
+@pytest.mark.parametrize("fast_output", ["no structured answer at all", answer("Moon.")])
+def test_parse_or_quality_failure_escalates(tmp_path, monkeypatch, fast_output):
+    outputs = {"fast": fast_output, "strong": answer(LONG_SUMMARY)}
+    response, calls = run_routed(tmp_path, monkeypatch, outputs)
+    assert calls == ["fast", "strong"]
+    attempts = response["timings"]["routing"]
+    assert [(a["tier"], a["outcome"]) for a in attempts] == [("fast", "escalated"), ("strong", "accepted")]
+    assert "gravitational pull" in response["summary"]
+
+
+class StandIn(BaseHTTPRequestHandler):
+    """Minimal OpenAI-compatible chat completions endpoint"""
+
+    def do_POST(self):
+        request = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        body = json.dumps({
+            "id": "chatcmpl-local", "object": "chat.completion", "created": 0,
+            "model": request["model"],
+            "choices": [{"index": 0, "finish_reason": "stop",
+                         "message": {"role": "assistant", "content": f"local:{request['model']}"}}],
+            "usage": {"prompt_tokens": 3, "completion_tokens": 2, "total_tokens": 5},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_tier_runs_against_local_openai_compatible_server(monkeypatch):
+    monkeypatch.delenv("OPENAI_API_KEY", raising=False)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StandIn)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    try:
+        tier = Tier("local", "tiny-local", base_url=f"http://127.0.0.1:{server.server_port}/v1")
+        assert agent_setup.build_llm(tier).invoke("hi").content == "local:tiny-local"
+    finally:
+        server.shutdown()
+
+
+def test_routing_off_serves_requests_from_the_warmed_executor(monkeypatch):
+    monkeypatch.delenv("ROUTING", raising=False)  # Opt-in: off by default
+    monkeypatch.setattr(routing, "_router", {})
+    monkeypatch.setattr(agent_setup, "_components", {})
+    built = []
+    monkeypatch.setattr(agent_setup, "build_llm", lambda tier=None: "llm")
+    monkeypatch.setattr(agent_setup, "build_agent_executor", lambda **kw: built.append(kw) or object())
+
+    assert not agent_setup.is_ready()
+    agent_setup.warm_up()
+    assert agent_setup.is_ready()
+    tier = routing.get_router().route("Compare the economies of Peru and Chile")
+    assert agent_setup.get_agent_executor(tier) is agent_setup._components["agent_executor"]
+    assert agent_setup.get_llm(tier) == "llm" and len(built) == 1
+
+
+def test_formatting_reask_uses_the_tier_model(monkeypatch):
+    asked = []
+
+    def get_llm(tier=None):
+        asked.append(tier)
+        raise RuntimeError("no model in tests")
+
+    monkeypatch.setattr(pipeline, "get_llm", get_llm)
+    strong = Tier("strong", "strong-model")
+    with pytest.raises(Exception):
+        pipeline.parse_output("no structured answer at all", strong)
+    assert asked == [strong]
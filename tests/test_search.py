@@ -0,0 +1,50 @@
+import sys
+import os
+import threading
+import time
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import pytest
+from utils.search import CachedSearch, StubSearchBackend
+from utils.rate_limit import TokenBucket
+
+
+def test_cached_search_memoizes_normalized_queries():
+    backend = StubSearchBackend()
+    search = CachedSearch(backend, rate=100, burst=100)
+    first = search.run("Python  History")
+    assert search.run("python history") == first
+    assert backend.calls == 1
+
+
+def test_cached_search_coalesces_concurrent_queries():
+    backend = StubSearchBackend(latency=0.2)
+    search = CachedSearch(backend, rate=100, burst=100)
+    threads = [threading.Thread(target=search.run, args=("same topic",)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert backend.calls == 1
+    assert search.stats()["coalesced"] == 4
+
+
+def test_cached_search_retries_then_raises():
+    calls = []
+
+    def flaky(query):
+        calls.append(query)
+        raise RuntimeError("rate limited")
+
+    search = CachedSearch(flaky, rate=100, burst=100, max_retries=2, backoff=0)
+    with pytest.raises(RuntimeError):
+        search.run("anything")
+    assert len(calls) == 3
+
+
+def test_token_bucket_limits_bursts():
+    now = [0.0]
+    bucket = TokenBucket(rate=1, capacity=2, clock=lambda: now[0])
+    assert bucket.try_acquire() and bucket.try_acquire()
+    assert not bucket.try_acquire()
+    now[0] = 1.0
+    assert bucket.try_acquire()
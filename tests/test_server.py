@@ -0,0 +1,41 @@
+import sys
+import os
+import runpy
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from utils import agent_setup
+from main import app
+
+CONFIG = os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'gunicorn.conf.py'))
+SHARED = ("RESEARCH_QUEUE_BACKEND", "MEMORY_BACKEND", "QUOTA_BACKEND", "AGENT_WARMUP")
+
+
+def test_readiness_reports_agent_warm_up(monkeypatch):
+    monkeypatch.setattr(agent_setup, "_components", {})
+    monkeypatch.setenv("AGENT_WARMUP", "1")
+    client = app.test_client()
+
+    assert client.get("/healthz").get_json()["status"] == "ok"
+    cold = client.get("/readyz")
+    assert cold.status_code == 503
+    assert cold.get_json()["agent"] == "cold"
+
+    agent_setup.set_agent_executor(object())
+    warm = client.get("/readyz")
+    assert warm.status_code == 200
+    assert warm.get_json() == {"status": "ready", "agent": "warm", "pid": os.getpid()}
+
+
+def test_gunicorn_config_shares_state_across_workers(monkeypatch):
+    for name in SHARED:
+        monkeypatch.setenv(name, "")  # Restored (removed) after the test
+        monkeypatch.delenv(name)
+    monkeypatch.setenv("WEB_CONCURRENCY", "4")
+    monkeypatch.setenv("MEMORY_BACKEND", "off")
+    monkeypatch.setenv("AGENT_DEADLINE_SECONDS", "60")
+
+    config = runpy.run_path(CONFIG)
+    assert config["workers"] == 4 and config["preload_app"]
+    assert config["graceful_timeout"] == 90  # In-flight runs finish on reload
+    assert os.environ["RESEARCH_QUEUE_BACKEND"] == "sqlite"
+    assert os.environ["QUOTA_BACKEND"] == "sqlite"
+    assert os.environ["MEMORY_BACKEND"] == "off"  # Explicit settings win
@@ -0,0 +1,53 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+os.environ.setdefault("OPENAI_API_KEY", "test-key")
+import json
+import pytest
+from langchain_core.messages import AIMessageChunk
+from langchain_core.outputs import ChatGenerationChunk
+from utils import streaming
+from utils.streaming import StreamingCallbackHandler, RunCancelled, format_sse
+
+
+def test_format_sse_frame():
+    assert format_sse("token", {"delta": "hi"}) == 'event: token\ndata: {"delta": "hi"}\n\n'
+
+
+def test_cancelled_handler_aborts_run():
+    handler = StreamingCallbackHandler()
+    handler.cancel()
+    with pytest.raises(RunCancelled):
+        handler.on_tool_start({"name": "search"}, "query")
+
+
+def test_stream_research_emits_tool_events_and_result(monkeypatch):
+    def fake_run(query, callbacks=None, session_id=None, budget=None):
+        handler = callbacks[0]
+        handler.on_tool_start({"name": "search"}, query, run_id="r1")
+        handler.on_tool_end("results", run_id="r1")
+        return {"topic": query}
+
+    monkeypatch.setattr(streaming, "run_research", fake_run)
+    frames = list(streaming.stream_research("bees"))
+    assert frames[0].startswith("event: tool_start")
+    assert frames[1].startswith("event: tool_end")
+    assert frames[-1] == format_sse("result", {"topic": "bees"})
+
+
+def test_tool_mode_answer_text_is_streamed(monkeypatch):
+    fragments = ['{"topic": "Bees", "sum', 'mary": "Bees make', ' honey.\\', 'nThey ', 'pollinate."', ', "sources": []}']
+
+    def fake_run(query, callbacks=None, session_id=None, budget=None):
+        handler = callbacks[0]
+        for i, args in enumerate(fragments):
+            call = {"name": "ResearchResponse" if i == 0 else None, "args": args, "id": None, "index": 0}
+            chunk = ChatGenerationChunk(message=AIMessageChunk(content="", tool_call_chunks=[call]))
+            handler.on_llm_new_token("", chunk=chunk, run_id="llm-1")
+        return {"topic": query}
+
+    monkeypatch.setattr(streaming, "run_research", fake_run)
+    frames = list(streaming.stream_research("bees"))
+    deltas = [json.loads(f.split("data: ", 1)[1])["delta"] for f in frames if f.startswith("event: token")]
+    assert len(deltas) > 1  # Incremental, not one block at the end
+    assert "".join(deltas) == "Bees make honey.\nThey pollinate."
@@ -0,0 +1,71 @@
+import sys
+import os
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import json
+
+import pytest
+from langchain_core.exceptions import OutputParserException
+from langchain_core.messages import AIMessage
+from langchain_core.outputs import ChatGeneration
+
+from utils.agent_setup import ResearchResponse, build_parser, build_prompt
+from utils.metrics import STRUCTURED_OUTPUTS
+from utils.structured_output import ResearchOutputParser, parse_research_output
+
+
+class FormattingModel:
+    """Stand-in chat model for the formatting re-ask"""
+
+    def __init__(self):
+        self.calls = 0
+
+    def with_structured_output(self, schema):
+        model = self
+
+        class Runnable:
+            def invoke(self, messages):
+                model.calls += 1
+                return schema(topic="Tides", summary="Moon", sources=[], tools_used=[])
+
+        return Runnable()
+
+
+def test_final_answer_tool_call_finishes_the_run():
+    args = {"topic": "T", "summary": "S", "sources": ["https://a"], "tools_used": ["search"]}
+    message = AIMessage(content="", tool_calls=[{"name": "ResearchResponse", "args": args, "id": "1"}])
+    finish = ResearchOutputParser().parse_result([ChatGeneration(message=message)])
+    assert json.loads(finish.return_values["output"]) == args
+
+
+def test_local_repair_handles_common_near_misses():
+    parser = build_parser()
+    fenced = 'Here you go:\n```json\n{"title": "Tides", "answer": "Moon pull",\n "urls": "https://a, https://b", "tools": ["search"],}\n```'
+    truncated = '{"topic": "Tides", "summary": "The moon pulls the ocean and'
+    before = STRUCTURED_OUTPUTS.value(outcome="repaired")
+
+    repaired = parse_research_output(fenced, parser)
+    assert repaired.topic == "Tides"
+    assert repaired.sources == ["https://a", "https://b"]
+    assert parse_research_output(truncated, parser).summary.startswith("The moon pulls")
+    assert STRUCTURED_OUTPUTS.value(outcome="repaired") == before + 2
+
+
+def test_reask_once_then_wasted():
+    parser = build_parser()
+    model = FormattingModel()
+    response = parse_research_output("The tides are caused by the moon.", parser, lambda: model)
+    assert isinstance(response, ResearchResponse) and model.calls == 1
+
+    wasted = STRUCTURED_OUTPUTS.value(outcome="wasted")
+    with pytest.raises(OutputParserException):
+        parse_research_output("no json here", parser)
+    assert STRUCTURED_OUTPUTS.value(outcome="wasted") == wasted + 1
+
+
+@pytest.mark.parametrize("mode, wrapped", [("tool", False), ("text", True)])
+def test_system_prompt_matches_the_output_mode(monkeypatch, mode, wrapped):
+    monkeypatch.setenv("STRUCTURED_OUTPUT", mode)
+    prompt = build_prompt(build_parser())
+    system = prompt.format_messages(query="q", chat_history=[], agent_scratchpad=[])[0].content
+    assert ("provide no\n                other text" in system) == wrapped
+    assert ("call the ResearchResponse tool" in system) != wrapped
@@ -1,6 +1,8 @@
 import sys
 import os
 sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import multiprocessing
+import tools
 from tools import save_to_txt
 
 def test_save_to_txt_creates_file(tmp_path):
@@ -10,3 +12,33 @@ def test_save_to_txt_creates_file(tmp_path):
     assert test_file.exists()
     content = test_file.read_text()
     assert "Sample research output" in content
+
+
+def test_save_to_txt_rotates_beyond_the_size_limit(tmp_path, monkeypatch):
+    monkeypatch.setattr(tools, "SAVE_MAX_BYTES", 200)
+    monkeypatch.setattr(tools, "SAVE_BACKUPS", 2)
+    test_file = tmp_path / "out.txt"
+    for i in range(6):
+        save_to_txt(f"entry {i} " + "x" * 100, str(test_file))
+    assert test_file.stat().st_size <= 200
+    assert "entry 5" in test_file.read_text()
+    assert "entry 4" in (tmp_path / "out.txt.1").read_text()
+    assert not (tmp_path / "out.txt.3").exists()  # Oldest rotated file dropped
+
+
+def _save_many(path, worker):
+    for i in range(20):
+        save_to_txt(f"worker {worker} entry {i}\n" + "line\n" * 50, path)
+
+
+def test_save_to_txt_entries_never_interleave_across_processes(tmp_path):
+    path = str(tmp_path / "shared.txt")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_save_many, args=(path, w)) for w in range(4)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+    entries = open(path, encoding="utf-8").read().split("--- Research Output ---")[1:]
+    assert len(entries) == 80
+    assert all(entry.count("line") == 50 for entry in entries)
@@ -7,10 +7,43 @@ functionality.
 """
 
 # Import LangChain components for knowledge retrieval and tool integration
-from langchain_community.tools import WikipediaQueryRun, DuckDuckGoSearchRun
+from langchain_community.tools import WikipediaQueryRun
 from langchain_community.utilities import WikipediaAPIWrapper  # Wikipedia API handler
 from langchain.tools import Tool  # Base class for AI-accessible tools
 from datetime import datetime  # For timestamping research outputs
+import asyncio  # Non-blocking tool variants for async agent runs
+import os  # Rotation limits and file sizes
+import threading  # Serialises appends from concurrent agent runs
+
+try:
+    import fcntl  # Serialises appends across worker processes
+except ImportError:  # Windows: in-process lock only
+    fcntl = None
+from utils.search import create_cached_search  # Memoized, rate-limited web search
+from utils.retrieval import create_retriever  # Multi-source ranked evidence
+from utils.metrics import registry  # Scrape-time search counters
+
+
+_save_lock = threading.Lock()
+SAVE_MAX_BYTES = int(os.environ.get("SAVE_TOOL_MAX_BYTES", str(10 * 1024 * 1024)))  # Rotation size
+SAVE_BACKUPS = int(os.environ.get("SAVE_TOOL_BACKUPS", "3"))  # Rotated files kept
+
+
+def _rotate(filename, incoming):
+    # Caller holds the file lock: <file> -> <file>.1 -> ... -> <file>.N
+    try:
+        size = os.path.getsize(filename)
+    except OSError:
+        return
+    if size + incoming <= SAVE_MAX_BYTES:
+        return
+    for index in range(SAVE_BACKUPS - 1, 0, -1):
+        if os.path.exists(f"{filename}.{index}"):
+            os.replace(f"{filename}.{index}", f"{filename}.{index + 1}")
+    if SAVE_BACKUPS > 0:
+        os.replace(filename, f"{filename}.1")
+    else:
+        os.remove(filename)
 
 
 def save_to_txt(data: str, filename: str = "research_output.txt"):
@@ -26,7 +59,10 @@ def save_to_txt(data: str, filename: str = "research_output.txt"):
 
     Features:
     - Appends new entries with timestamps
-    - Maintains full research history
+    - Rotates the file beyond SAVE_TOOL_MAX_BYTES, keeping
+      SAVE_TOOL_BACKUPS older files (<filename>.1 is the newest)
+    - Entries from concurrent runs and worker processes never interleave
+      (an flock on <filename>.lock)
     - Uses UTF-8 encoding for international text support
     """
     # Generate ISO 8601 timestamp
@@ -35,34 +71,92 @@ def save_to_txt(data: str, filename: str = "research_output.txt"):
     # Create structured document header
     formatted_text = f"--- Research Output ---\nTimestamp: {timestamp}\n\n{data}\n\n"
 
-    # Write to file with append mode and proper encoding
-    with open(filename, "a", encoding="utf-8") as f:
-        f.write(formatted_text)
+    # Write to file with append mode and proper encoding (locked: parallel
+    # tool calls and other workers would otherwise interleave entries; the
+    # lock lives in its own file because rotation renames the output)
+    entry = formatted_text.encode("utf-8")
+    with _save_lock, open(f"{filename}.lock", "a") as lock:
+        if fcntl is not None:
+            fcntl.flock(lock, fcntl.LOCK_EX)  # Released when the file closes
+        _rotate(filename, len(entry))
+        with open(filename, "ab") as f:
+            f.write(entry)
 
     return f"Data successfully saved to {filename}"
 
 
+async def asave_to_txt(data: str, filename: str = "research_output.txt"):
+    """
+    Async variant of save_to_txt - performs the write in a worker thread
+    so async agent runs never block the event loop on disk I/O
+    """
+    return await asyncio.to_thread(save_to_txt, data, filename)
+
+
 # Create LangChain Tool interface for the save functionality
 save_tool = Tool(
     name="save_text_to_file",  # Unique identifier for AI agent
     func=save_to_txt,  # Function to execute
+    coroutine=asave_to_txt,  # Used by async agent runs (ainvoke)
     description="Saves structured research data to a text file.",  # Agent-facing documentation
 )
 
 # Configure real-time web search capability using DuckDuckGo
-search = DuckDuckGoSearchRun()  # Instantiate search engine client
+# (cached, coalesced and rate limited; SEARCH_BACKEND=stub for offline runs)
+search = create_cached_search()  # Instantiate search engine client
 search_tool = Tool(
     name="search",  # Tool identifier
     func=search.run,  # Executes search queries
+    coroutine=search.arun,  # Used by async agent runs (ainvoke)
     description="Search the web for up-to-date information",  # Usage guidance
 )
 
-# Set up Wikipedia integration with controlled parameters
-api_wrapper = WikipediaAPIWrapper(
-    top_k_results=1,  # Return only most relevant article
-    doc_content_chars_max=100,  # Truncate content for concise responses
+
+def _collect_search_metrics():
+    stats = search.stats()
+    for name in ("hits", "misses", "backend_calls", "coalesced", "retries", "disk_hits"):
+        yield (f"search_{name}_total", "counter", f"Web search {name.replace('_', ' ')}", {}, stats[name])
+    yield ("search_cache_entries", "gauge", "Cached web search results", {}, stats["entries"])
+
+
+registry.register_collector(_collect_search_metrics)
+
+# Multi-source evidence retrieval: DuckDuckGo and Wikipedia queried in
+# parallel, near-duplicates dropped, passages ranked and packed to a budget
+# (RETRIEVAL_SOURCES=stub for offline runs)
+retriever = create_retriever()
+evidence_tool = Tool(
+    name="research_evidence",  # Tool identifier
+    func=retriever.run,  # Parallel fetch, dedupe, rank, pack
+    coroutine=retriever.arun,  # Used by async agent runs (ainvoke)
+    description=(
+        "Search the web and Wikipedia at once and return the most relevant, "
+        "deduplicated passages with their sources. Prefer one call with a "
+        "precise query over several searches."
+    ),
 )
-wiki_tool = WikipediaQueryRun(api_wrapper=api_wrapper)  # Create executable tool
+
+# Set up Wikipedia integration with controlled parameters
+# (built on first access - the agent does not use it by default)
+_wiki = {}
+
+
+def get_wiki_tool():
+    """Create executable Wikipedia tool on first use"""
+    if "tool" not in _wiki:
+        api_wrapper = WikipediaAPIWrapper(
+            top_k_results=1,  # Return only most relevant article
+            doc_content_chars_max=100,  # Truncate content for concise responses
+        )
+        _wiki["tool"] = WikipediaQueryRun(api_wrapper=api_wrapper)
+    return _wiki["tool"]
+
+
+def __getattr__(name):
+    # Backwards compatible module attribute (tools.wiki_tool)
+    if name == "wiki_tool":
+        return get_wiki_tool()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 """
 Tool Configuration Summary:
@@ -71,22 +165,31 @@ Tool Configuration Summary:
    - Real-time web search using DuckDuckGo
    - Returns raw HTML/plaintext results
    - Ideal for current events and recent developments
+   - Results cached per process; duplicate in-flight queries coalesced
+   - Outbound calls paced by a token bucket with retry/backoff
+
+2. Evidence Tool (evidence_tool, default):
+   - DuckDuckGo and Wikipedia queried in parallel (utils/retrieval.py)
+   - Overlapping passages removed with MinHash, ranked with BM25
+   - One numbered evidence pack with source names and URLs
+   - Per-source latency and failures in /metrics
 
-2. Wikipedia Tool (wiki_tool):
+3. Wikipedia Tool (wiki_tool):
    - Curated knowledge source
    - Returns verified information snippets
    - Limited to 100 characters for brevity
    - Single result for focused responses
 
-3. Save Tool (save_tool):
+4. Save Tool (save_tool):
    - Persistent storage system
    - Maintains chronological record
    - Structured markdown formatting
-   - Non-destructive append operations
+   - Non-destructive append operations, serialised across processes
+   - Size-bounded: rotated beyond SAVE_TOOL_MAX_BYTES
 
 Usage Flow:
-1. Agent uses search_tool for initial investigation
-2. Verifies facts with wiki_tool
+1. Agent gathers evidence with evidence_tool (search_tool when RETRIEVAL=off)
+2. Follows up with narrower queries only when the pack is insufficient
 3. Saves validated findings with save_tool
 4. Process repeats for iterative research
 """
@@ -1,11 +1,11 @@
 from pydantic import BaseModel
-from langchain_openai import ChatOpenAI
-from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.output_parsers import PydanticOutputParser
-from langchain.agents import create_tool_calling_agent, AgentExecutor
-from tools import search_tool, save_tool
+import threading
 import os
 
+# LangChain, the OpenAI client and the search/Wikipedia tools are imported
+# inside the builders below: importing this module is cheap and never fails,
+# and the agent is assembled once, on first use or via warm_up().
+
 
 # -----------------------------------------------------------------------------
 # Response Model Definition
@@ -29,15 +29,34 @@ class ResearchResponse(BaseModel):
 # -----------------------------------------------------------------------------
 # Model Configuration
 # -----------------------------------------------------------------------------
-OPENAI_API_KEY = os.environ.get("OPENAI_API_KEY")
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable not set!")
-
-# Initialize language model (Flexible model selection)
-llm = ChatOpenAI(
-    model="gpt-4o-mini",  # Current model - see alternatives below
-    openai_api_key=OPENAI_API_KEY,
-)
+def build_llm(tier=None):
+    """
+    Initialize language model (Flexible model selection)
+
+    Parameters:
+    - tier (routing.Tier): Model, OpenAI-compatible base URL and key of a
+      routing tier (None: gpt-4o-mini on api.openai.com)
+    """
+    from langchain_openai import ChatOpenAI
+    from utils.http_clients import get_http_client, get_async_http_client, get_timeout
+
+    OPENAI_API_KEY = (tier.api_key if tier is not None else None) or os.environ.get("OPENAI_API_KEY")
+    endpoint = {"base_url": tier.base_url} if tier is not None and tier.base_url else {}
+    if not OPENAI_API_KEY:
+        if not endpoint:
+            raise ValueError("OPENAI_API_KEY environment variable not set!")
+        OPENAI_API_KEY = "unused"  # Local OpenAI-compatible stand-ins ignore the key
+
+    return ChatOpenAI(
+        model=tier.model if tier is not None else "gpt-4o-mini",  # See alternatives below
+        openai_api_key=OPENAI_API_KEY,
+        **endpoint,  # OpenAI-compatible server of a routing tier (default: api.openai.com)
+        # Shared keep-alive connection pools and tuned timeouts
+        http_client=get_http_client("openai"),
+        http_async_client=get_async_http_client("openai"),
+        request_timeout=get_timeout("openai"),
+        stream_usage=True,  # Token counts on streamed responses (metrics)
+    )
 
 """
 Alternative Model Options:
@@ -64,46 +83,270 @@ Considerations when changing models:
 # -----------------------------------------------------------------------------
 # Output Parsing Setup
 # -----------------------------------------------------------------------------
-parser = PydanticOutputParser(pydantic_object=ResearchResponse)
+def build_parser():
+    from langchain_core.output_parsers import PydanticOutputParser
+
+    return PydanticOutputParser(pydantic_object=ResearchResponse)
 
 # -----------------------------------------------------------------------------
 # Prompt Engineering
 # -----------------------------------------------------------------------------
-prompt = ChatPromptTemplate.from_messages(
-    [
-        (
-            "system",
-            """You are a research assistant that will
-            help generate a research paper. Answer the
-            user query and use the necessary tools. Wrap
-            the output in this format and provide no
-            other text\n{format_instructions}""",
-        ),
-        ("placeholder", "{chat_history}"),
-        # Conversation context storage
-        ("human", "{query}"),
-        # User input placeholder
-        ("placeholder", "{agent_scratchpad}"),
-        # Agent's working memory
-    ]
-).partial(format_instructions=parser.get_format_instructions())
+# Hand-written equivalent of the parser's JSON schema instructions: the
+# same four fields in about a fifth of the tokens, resent on every call
+COMPACT_FORMAT_INSTRUCTIONS = (
+    "Reply with one JSON object and nothing else:\n"
+    '{"topic": str, "summary": str (markdown), '
+    '"sources": [str] (URLs), "tools_used": [str] (tool names)}'
+)
+
+
+# Tool-calling mode: the schema travels as the ResearchResponse tool definition
+TOOL_FORMAT_INSTRUCTIONS = (
+    "When the research is done, call the ResearchResponse tool with the final "
+    "answer (topic, markdown summary, source URLs, tools used) instead of "
+    "replying in text."
+)
+
+
+def structured_output_mode():
+    """STRUCTURED_OUTPUT: "tool" (default, schema enforced by tool calling) or "text" """
+    mode = os.environ.get("STRUCTURED_OUTPUT", "tool").lower()
+    if mode not in ("tool", "text"):
+        raise ValueError(f"Unknown STRUCTURED_OUTPUT mode: {mode}")
+    return mode
+
+
+def format_instructions(parser):
+    """
+    Output format instructions for the system prompt
+
+    Tool mode asks for a ResearchResponse tool call. In text mode,
+    PROMPT_FORMAT=compact (default) uses COMPACT_FORMAT_INSTRUCTIONS and
+    PROMPT_FORMAT=full the parser's complete JSON schema.
+    """
+    if structured_output_mode() == "tool":
+        return TOOL_FORMAT_INSTRUCTIONS
+    if os.environ.get("PROMPT_FORMAT", "compact").lower() == "full":
+        return parser.get_format_instructions()
+    return COMPACT_FORMAT_INSTRUCTIONS
+
+
+def build_prompt(parser):
+    from langchain_core.prompts import ChatPromptTemplate
+
+    system = """You are a research assistant that will
+                help generate a research paper. Answer the
+                user query and use the necessary tools."""
+    if structured_output_mode() == "text":
+        # Tool mode answers through the ResearchResponse tool, not text
+        system += """ Wrap
+                the output in this format and provide no
+                other text"""
+
+    return ChatPromptTemplate.from_messages(
+        [
+            (
+                "system",
+                system + "\n{format_instructions}",
+            ),
+            ("placeholder", "{chat_history}"),
+            # Conversation context storage
+            ("human", "{query}"),
+            # User input placeholder
+            ("placeholder", "{agent_scratchpad}"),
+            # Agent's working memory
+        ]
+    ).partial(format_instructions=format_instructions(parser))
 
 # -----------------------------------------------------------------------------
 # Tool Configuration
 # -----------------------------------------------------------------------------
-tools = [search_tool, save_tool]  # Core research tools
-# tools = [search_tool, wiki_tool, save_tool]
-# Uncomment for Wikipedia integration
+def build_tools(names=None):
+    """
+    Agent tools
+
+    Parameters:
+    - names (tuple): Only these tools (a routing tier's ROUTING_<TIER>_TOOLS)
+
+    Environment:
+    - RETRIEVAL: "on" (default) gives the agent the multi-source evidence
+      tool; "off" restores the plain web search tool
+    """
+    from tools import evidence_tool, search_tool, save_tool
+
+    if names:
+        available = {tool.name: tool for tool in (evidence_tool, search_tool, save_tool)}
+        unknown = set(names) - set(available)
+        if unknown:
+            raise ValueError(f"Unknown tools: {', '.join(sorted(unknown))}")
+        return [available[name] for name in names]
+    if os.environ.get("RETRIEVAL", "on").lower() == "off":
+        return [search_tool, save_tool]
+    return [evidence_tool, save_tool]  # Core research tools
+    # return [search_tool, wiki_tool, save_tool]
+    # Uncomment for Wikipedia integration
 
 # -----------------------------------------------------------------------------
 # Agent Assembly
 # -----------------------------------------------------------------------------
-agent = create_tool_calling_agent(llm=llm, prompt=prompt, tools=tools)
+def build_agent_executor(llm=None, tools=None, parser=None):
+    """
+    Assemble a fresh agent executor
 
-agent_executor = AgentExecutor(
-    agent=agent, tools=tools, verbose=True
-    # Enable detailed execution logging
-)
+    Parameters:
+    - llm: Chat model (default: build_llm()); benchmarks pass fakes here
+    - tools (list): Agent tools (default: build_tools())
+    - parser: Output parser whose format instructions go in the prompt
+    """
+    from langchain_core.runnables import RunnablePassthrough
+    from langchain_core.utils.function_calling import convert_to_openai_tool
+    from utils.compaction import create_compactor
+    from utils.parallel_executor import ParallelAgentExecutor
+    from utils.structured_output import ResearchOutputParser
+    from utils.tokens import estimate_tokens
+
+    llm = llm if llm is not None else build_llm()
+    tools = tools if tools is not None else build_tools()
+    parser = parser if parser is not None else build_parser()
+    prompt = build_prompt(parser)
+
+    # Tool mode: ResearchResponse is offered as a tool and a tool call is
+    # required on every turn, so the final answer is produced by the
+    # provider's tool-calling mode rather than free text
+    schema_tokens = 0
+    if structured_output_mode() == "tool":
+        final_tool = convert_to_openai_tool(ResearchResponse)
+        schema_tokens = estimate_tokens(str(final_tool))
+        llm_with_tools = llm.bind_tools(list(tools) + [final_tool], tool_choice="required")
+    else:
+        llm_with_tools = llm.bind_tools(tools)
+
+    # Tool outputs are compacted to a token budget before each LLM call;
+    # the format instruction savings are counted alongside
+    compactor = create_compactor(fixed_tokens=(
+        estimate_tokens(parser.get_format_instructions()),
+        estimate_tokens(format_instructions(parser)) + schema_tokens,
+    ))
+
+    # Same pipeline as langchain's create_tool_calling_agent, with the
+    # compacting scratchpad and the ResearchResponse-aware output parser
+    agent = (
+        RunnablePassthrough.assign(
+            agent_scratchpad=lambda x: compactor(x["intermediate_steps"])
+        )
+        | prompt
+        | llm_with_tools
+        | ResearchOutputParser()
+    )
+
+    return ParallelAgentExecutor(
+        agent=agent, tools=tools, verbose=True
+        # Enable detailed execution logging; tool calls emitted in the same
+        # step run concurrently (AGENT_TOOL_CONCURRENCY caps the fan-out);
+        # deadlines, iteration/tool limits and cancellation come from the
+        # run's RunBudget (utils/budget.py)
+    )
+
+# -----------------------------------------------------------------------------
+# Lazy, Thread-Safe Singletons
+# -----------------------------------------------------------------------------
+_lock = threading.RLock()  # Re-entrant: builders fetch other components
+_components = {}  # name -> built component (parser, agent_executor)
+
+
+def _get(name, builder):
+    component = _components.get(name)
+    if component is None:
+        with _lock:  # Double-checked: build exactly once across threads
+            component = _components.get(name)
+            if component is None:
+                component = _components[name] = builder()
+    return component
+
+
+def get_parser():
+    """Shared ResearchResponse output parser"""
+    return _get("parser", build_parser)
+
+
+def _suffix(tier):
+    # Cache key suffix of a tier: routing off (DEFAULT_TIER) shares the
+    # plain keys with warm_up() and set_agent_executor()
+    from utils.routing import DEFAULT_TIER
+
+    return "" if tier is None or tier is DEFAULT_TIER else f":{tier.name}"
+
+
+def get_llm(tier=None):
+    """Shared chat model (agent and formatting re-asks), per routing tier"""
+    if not _suffix(tier):
+        return _get("llm", build_llm)
+    return _get(f"llm{_suffix(tier)}", lambda: build_llm(tier))
+
+
+def get_agent_executor(tier=None):
+    """
+    Shared agent executor, built on first use
+
+    Parameters:
+    - tier (routing.Tier): Executor with the tier's model and tools
+      (None or DEFAULT_TIER: the default executor; an injected executor
+      serves every tier)
+    """
+    if not _suffix(tier) or executor_pinned():
+        return _get(
+            "agent_executor", lambda: build_agent_executor(llm=get_llm(), parser=get_parser())
+        )
+    return _get(
+        f"agent_executor{_suffix(tier)}",
+        lambda: build_agent_executor(
+            llm=get_llm(tier), tools=build_tools(tier.tools), parser=get_parser()
+        ),
+    )
+
+
+def set_agent_executor(executor, llm=None):
+    """Replace the shared executor (benchmarks and tests inject fakes here)"""
+    with _lock:
+        _components["agent_executor"] = executor
+        _components["pinned"] = executor is not None  # Bypasses model routing
+        if llm is not None:
+            _components["llm"] = llm  # Used by formatting re-asks
+
+
+def executor_pinned():
+    """True while an injected executor replaces every routing tier"""
+    return bool(_components.get("pinned"))
+
+
+def warm_up():
+    """
+    Explicit warm-up hook: build every component now instead of on the
+    first request (call at worker start or before forking)
+    """
+    from utils.routing import get_router
+
+    for tier in get_router().tiers:  # The executors requests will use
+        get_agent_executor(tier)
+    return True
+
+
+def is_ready():
+    """True once the executor of every routing tier has been built"""
+    from utils.routing import get_router
+
+    if executor_pinned():
+        return True
+    return all(f"agent_executor{_suffix(tier)}" in _components for tier in get_router().tiers)
+
+
+def __getattr__(name):
+    # Backwards compatible module attributes (utils.agent_setup.agent_executor)
+    if name == "agent_executor":
+        return get_agent_executor()
+    if name == "parser":
+        return get_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 """
 Key Architecture Decisions:
@@ -114,14 +357,31 @@ Key Architecture Decisions:
 
 2. Tool Chaining:
    - Sequential execution of search -> analysis -> saving
+   - Independent tool calls within one step run in parallel
    - Modular design allows adding new tools
 
 3. Validation Layer:
    - Pydantic ensures structured output
    - Prevents malformed responses from reaching users
+   - The agent finishes with a ResearchResponse tool call
+     (STRUCTURED_OUTPUT=text restores JSON-in-text answers)
+   - Near-miss answers are repaired locally or re-asked once for
+     formatting only (utils/structured_output.py)
+
+4. Lazy Initialization:
+   - Nothing heavy is built at import time; the login page is served
+     even when OPENAI_API_KEY is missing
+   - First research request (or warm_up()) builds the agent once
+
+Model Routing (utils/routing.py):
+   - Opt-in (ROUTING=on): each query goes to a tier (fast / strong by
+     default); every tier has its own executor, model endpoint, tools and
+     run budget
+   - Off by default: one gpt-4o-mini executor (the one warm_up() builds)
+     answers every query
 
 To switch models:
-1. Change model name in ChatOpenAI initialization
+1. Change model name in ChatOpenAI initialization (or ROUTING_<TIER>_MODEL)
 2. Adjust prompt templates if needed
 3. Update error handling for new model's quirks
 4. Modify temperature for desired creativity level
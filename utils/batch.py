@@ -0,0 +1,105 @@
+"""
+Batch Research Execution
+
+Runs a list of research queries with bounded concurrency. Queries that
+normalise to the same key run once and share the result; search results
+are shared across the whole batch through the process-wide search and
+result caches. Items are yielded as soon as they finish, followed by a
+summary with throughput, latency percentiles and failure counts.
+"""
+
+import os  # Environment configuration
+import threading  # Shared cancellation of the batch's runs
+import time  # Latency measurement
+from concurrent.futures import ThreadPoolExecutor, as_completed  # Bounded fan-out
+
+from utils.budget import RunBudget  # Per-run limits, cancelled together
+from utils.result_cache import normalize_query  # Shared dedupe key
+from utils.stats import percentile  # Latency summary
+
+MAX_BATCH_QUERIES = int(os.environ.get("BATCH_MAX_QUERIES", "500"))
+MAX_BATCH_CONCURRENCY = int(os.environ.get("BATCH_MAX_CONCURRENCY", "8"))
+
+
+def run_batch(queries, runner, concurrency=4):
+    """
+    Execute a batch of queries and yield results as they complete
+
+    Parameters:
+    - queries (list[str]): Research questions (duplicates allowed)
+    - runner (callable): (query, budget) -> result dict, e.g.
+      run_research(query, budget=budget)
+    - concurrency (int): Maximum concurrent agent runs (capped by
+      BATCH_MAX_CONCURRENCY)
+
+    Yields:
+    - dict: One item per input query ({"index", "query", "status",
+      "result" | "error", "latency", "deduplicated"}), then a final
+      {"summary": {...}} record
+
+    Closing the generator early (client gone) cancels queries that have
+    not started and kills running ones at their next agent step: every
+    run's RunBudget shares one cancellation event.
+    """
+    groups = {}  # normalised key -> [indexes]
+    for index, query in enumerate(queries):
+        groups.setdefault(normalize_query(query), []).append(index)
+
+    start = time.time()
+    latencies = []  # One sample per executed (unique) query
+    failed_items = 0
+    cancelled = threading.Event()
+    pool = ThreadPoolExecutor(
+        max_workers=max(1, min(concurrency, MAX_BATCH_CONCURRENCY)),
+        thread_name_prefix="research-batch",
+    )
+    try:
+        futures = {
+            pool.submit(_timed, runner, queries[indexes[0]], cancelled): indexes
+            for indexes in groups.values()
+        }
+        for future in as_completed(futures):
+            result, error, latency = future.result()
+            latencies.append(latency)
+            for position, index in enumerate(futures[future]):
+                item = {
+                    "index": index,
+                    "query": queries[index],
+                    "status": "failed" if error is not None else "succeeded",
+                    "latency": round(latency, 3),
+                    "deduplicated": position > 0,  # Answered by an identical query
+                }
+                if error is not None:
+                    item["error"] = error
+                    failed_items += 1
+                else:
+                    item["result"] = result
+                yield item
+    finally:
+        cancelled.set()  # Client gone: stop running queries...
+        pool.shutdown(wait=False, cancel_futures=True)  # ...and skip the rest
+
+    elapsed = time.time() - start
+    yield {
+        "summary": {
+            "total": len(queries),  # Input queries
+            "unique": len(groups),  # Agent runs after deduplication
+            "succeeded": len(queries) - failed_items,
+            "failed": failed_items,
+            "elapsed": round(elapsed, 3),  # Wall-clock seconds
+            "throughput": round(len(queries) / elapsed, 3) if elapsed else 0.0,  # Queries/s
+            "latency_p50": round(percentile(latencies, 50), 3),
+            "latency_p95": round(percentile(latencies, 95), 3),
+        }
+    }
+
+
+def _timed(runner, query, cancelled):
+    """Run one query, capturing (result, error, latency) instead of raising"""
+    started = time.time()
+    budget = RunBudget.from_env(cancelled=cancelled, cancel_reason="client_disconnected")
+    try:
+        return runner(query, budget), None, time.time() - started
+    except Exception as e:
+        print(f"Batch query failed ({query!r}):", e)  # Server-side logging
+        return None, str(e), time.time() - started
@@ -0,0 +1,210 @@
+"""
+Run Budgets - Deadlines, Iteration/Tool Limits and Cancellation
+
+Every research run gets a RunBudget that the agent executor checks
+between steps (utils.parallel_executor):
+
+1. Wall-clock deadline for the whole request
+2. Maximum agent iterations (LLM turns)
+3. Maximum tool calls; further calls are refused with a message asking
+   the model to answer with what it has
+4. Cooperative cancellation (client disconnect, job cancellation)
+
+A run that exhausts 1-3 is truncated: the pipeline answers with the best
+partial ResearchResponse built from the evidence gathered so far. A
+cancelled run is killed: RunCancelled is raised at the next step
+boundary. Both are counted in agent_runs_stopped_total{reason, outcome}.
+"""
+
+import os  # Environment configuration
+import re  # Source URL extraction
+import threading  # Cancellation events
+import time  # Deadlines
+from contextvars import ContextVar  # Per-run budget lookup inside the executor
+
+from utils.metrics import AGENT_RUNS_STOPPED  # Killed/truncated run accounting
+from utils.ranking import split_passages, top_passages  # Partial answer evidence
+from utils.tokens import truncate_tokens  # Partial answer size
+
+TOOL_BUDGET_MESSAGE = (
+    "Tool budget exhausted: no more tool calls are allowed in this run. "
+    "Answer now with the information already gathered."
+)
+STOP_LABELS = {
+    "deadline": "the time limit was reached",
+    "iterations": "the step limit was reached",
+    "tool_budget": "the tool call limit was reached",
+}
+PARTIAL_TOKENS = 400  # Evidence kept in a partial answer
+_URL = re.compile(r"https?://[^\s)\]>'\"]+")
+
+
+class RunCancelled(Exception):
+    """Raised inside the agent run once the client has gone away"""
+
+
+class RunBudget:
+    """
+    Limits and cancellation state of one research run
+
+    Parameters:
+    - deadline (float): Seconds the run may take (None: unlimited)
+    - max_iterations (int): Agent turns before the run is truncated
+    - max_tool_calls (int): Tool calls before further calls are refused
+    - cancelled: threading.Event (or anything with is_set()) that kills
+      the run when set; default: the job's event (current_cancel) or a
+      fresh one
+    - cancel_reason (str): Metric label when the run is killed
+    """
+
+    def __init__(self, deadline=None, max_iterations=None, max_tool_calls=None, cancelled=None,
+                 cancel_reason="cancelled"):
+        self.started = time.monotonic()
+        self.deadline = deadline
+        self.max_iterations = max_iterations
+        self.max_tool_calls = max_tool_calls
+        self._limits = (max_iterations, max_tool_calls)
+        if cancelled is None and current_cancel.get() is not None:
+            cancelled, cancel_reason = current_cancel.get(), "job_cancelled"
+        self.cancelled = cancelled or threading.Event()
+        self.cancel_reason = cancel_reason
+        self.reason = None  # Why the run was truncated
+        self.tool_calls = 0
+        self.iterations = 0
+        self.refused_at = None  # Iteration of the first refused tool call
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls, cancelled=None, cancel_reason="cancelled"):
+        """
+        Budget with the server's configured limits
+
+        Environment:
+        - AGENT_DEADLINE_SECONDS: Wall-clock limit per run (default 120, 0: none)
+        - AGENT_MAX_ITERATIONS: Agent turns per run (default 8)
+        - AGENT_MAX_TOOL_CALLS: Tool calls per run (default 12)
+        """
+        deadline = float(os.environ.get("AGENT_DEADLINE_SECONDS", "120"))
+        return cls(
+            deadline=deadline if deadline > 0 else None,
+            max_iterations=int(os.environ.get("AGENT_MAX_ITERATIONS", "8")),
+            max_tool_calls=int(os.environ.get("AGENT_MAX_TOOL_CALLS", "12")),
+            cancelled=cancelled,
+            cancel_reason=cancel_reason,
+        )
+
+    def restart(self, max_iterations=None, max_tool_calls=None):
+        """
+        Fresh limits for another attempt (model routing escalation)
+
+        The deadline and cancellation carry over; None keeps the limits
+        the budget was created with.
+        """
+        with self._lock:
+            self.max_iterations = max_iterations if max_iterations is not None else self._limits[0]
+            self.max_tool_calls = max_tool_calls if max_tool_calls is not None else self._limits[1]
+            self.reason = None
+            self.tool_calls = 0
+            self.iterations = 0
+            self.refused_at = None
+
+    def remaining(self):
+        """Seconds left before the deadline (None: unlimited)"""
+        if self.deadline is None:
+            return None
+        return max(self.deadline - (time.monotonic() - self.started), 0.0)
+
+    def cancel(self, reason="cancelled"):
+        """Kill the run at its next step boundary"""
+        self.cancel_reason = reason
+        self.cancelled.set()
+
+    def stop(self, reason):
+        """Record why the run is being truncated (first reason wins)"""
+        with self._lock:
+            if self.reason is None:
+                self.reason = reason
+
+    def should_continue(self, iterations):
+        """
+        Step-boundary check used by the agent executor
+
+        Returns:
+        - bool: False once the run must be truncated
+
+        Raises:
+        - RunCancelled: The run was cancelled
+        """
+        self.iterations = iterations
+        if self.cancelled.is_set():
+            raise RunCancelled(self.cancel_reason)
+        if self.deadline is not None and self.remaining() <= 0:
+            self.stop("deadline")
+        elif self.max_iterations is not None and iterations >= self.max_iterations:
+            self.stop("iterations")
+        elif self.refused_at is not None and iterations > self.refused_at + 1:
+            self.stop("tool_budget")  # Kept calling tools after the refusal
+        return self.reason is None
+
+    def take_tool_call(self):
+        """Count a tool call; False when the tool budget is spent"""
+        with self._lock:
+            if self.max_tool_calls is not None and self.tool_calls >= self.max_tool_calls:
+                if self.refused_at is None:
+                    self.refused_at = self.iterations
+                return False
+            self.tool_calls += 1
+            return True
+
+
+current_budget = ContextVar("current_budget", default=None)  # Set by the pipeline
+current_cancel = ContextVar("current_cancel", default=None)  # Set by job workers
+
+
+def record_stop(reason, outcome):
+    """Count a run that was killed or truncated"""
+    AGENT_RUNS_STOPPED.inc(reason=reason, outcome=outcome)
+
+
+def partial_response(query, tool_results, reason, response_model):
+    """
+    Best partial answer from the tool results gathered before the stop
+
+    No model call: the most query-relevant passages become the summary,
+    URLs found in the tool outputs become the sources.
+
+    Returns:
+    - response_model instance
+    """
+    outputs = [r["output"] for r in tool_results if r["tool"] != "save_text_to_file"]
+    passages = [p for output in outputs for p in split_passages(output)]
+    evidence = top_passages(query, passages, PARTIAL_TOKENS) if passages else []
+    lines = [
+        f"**Partial result:** research stopped early because "
+        f"{STOP_LABELS.get(reason, reason)}."
+    ]
+    if evidence:
+        lines.append("Findings gathered before the stop:")
+        lines.extend(f"- {passage}" for passage in evidence)
+    else:
+        lines.append("No findings were gathered before the stop.")
+    sources = []
+    for output in outputs:
+        for url in _URL.findall(output):
+            if url not in sources:
+                sources.append(url)
+    return response_model(
+        topic=truncate_tokens(query, 30),
+        summary="\n\n".join(lines),
+        sources=sources[:10],
+        tools_used=sorted({r["tool"] for r in tool_results}),
+    )
+
+
+"""
+Stop Outcomes (agent_runs_stopped_total):
+- truncated: deadline / iterations / tool_budget - the client still gets
+  a partial ResearchResponse (marked "partial": true, never cached)
+- killed: client_disconnected / job_cancelled - nobody is waiting, the
+  run is abandoned at the next step boundary
+"""
@@ -0,0 +1,109 @@
+"""
+In-Memory TTL + LRU Cache
+
+Thread-safe building block shared by the result and search caches.
+Entries expire after a fixed time-to-live and the least recently used
+entries are evicted once the entry count or byte budget is exceeded.
+"""
+
+import threading  # Guards the shared OrderedDict
+import time  # Expiry bookkeeping
+from collections import OrderedDict  # LRU ordering (oldest first)
+
+
+class TTLCache:
+    """
+    Bounded mapping with expiry and least-recently-used eviction
+
+    Parameters:
+    - max_entries (int): Maximum number of live entries
+    - ttl (float): Seconds an entry stays valid (None disables expiry)
+    - max_bytes (int): Optional total size budget, measured with `sizeof`
+    - sizeof (callable): value -> approximate size in bytes
+    - on_evict (callable): Called with each key removed by expiry/eviction
+    - clock (callable): Monotonic time source (injectable for tests)
+    """
+
+    def __init__(self, max_entries=1024, ttl=3600, max_bytes=None, sizeof=None,
+                 on_evict=None, clock=time.monotonic):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_bytes = max_bytes
+        self.sizeof = sizeof or (lambda value: 0)
+        self.on_evict = on_evict
+        self.clock = clock
+        self._data = OrderedDict()  # key -> (value, expires_at, size)
+        self._bytes = 0
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key, default=None):
+        """Return the cached value (refreshing its LRU position) or default"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                self.misses += 1
+                return default
+            value, expires_at, _ = entry
+            if expires_at is not None and expires_at <= self.clock():
+                self._remove(key)
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)  # Mark as most recently used
+            self.hits += 1
+            return value
+
+    def set(self, key, value):
+        """Insert or replace a value, evicting old entries if over budget"""
+        size = self.sizeof(value)
+        if self.max_bytes is not None and size > self.max_bytes:
+            return  # Never cache a value that alone exceeds the budget
+        expires_at = self.clock() + self.ttl if self.ttl is not None else None
+        with self._lock:
+            if key in self._data:
+                self._bytes -= self._data.pop(key)[2]
+            self._data[key] = (value, expires_at, size)
+            self._bytes += size
+            while len(self._data) > self.max_entries or (
+                self.max_bytes is not None and self._bytes > self.max_bytes
+            ):
+                oldest = next(iter(self._data))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def pop(self, key, default=None):
+        """Remove an entry explicitly and return its value"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return default
+            self._remove(key)
+            return entry[0]
+
+    def clear(self):
+        with self._lock:
+            for key in list(self._data):
+                self._remove(key)
+
+    def stats(self):
+        """Counters for monitoring (hit ratio, size, evictions)"""
+        with self._lock:
+            return {
+                "entries": len(self._data),
+                "bytes": self._bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+            }
+
+    def __len__(self):
+        return len(self._data)
+
+    def _remove(self, key):
+        # Caller holds self._lock
+        _, _, size = self._data.pop(key)
+        self._bytes -= size
+        if self.on_evict is not None:
+            self.on_evict(key)
@@ -0,0 +1,146 @@
+"""
+Prompt Compaction - Token-Budgeted Agent Scratchpad
+
+Every agent iteration resends the whole scratchpad, so raw search output
+is paid for again on each step. The compactor rewrites tool observations
+before they are formatted into the prompt:
+
+1. Exact repeats of an earlier observation are replaced by a short
+   back-reference; passages already shown once are dropped
+2. Each observation is cut to its share of a scratchpad token budget
+3. Optionally (COMPACTION_MODE=rank) the passages most relevant to the
+   tool input are kept instead of the head of the text, ranked with a
+   local BM25 (utils.ranking) in their original order
+
+Only the prompt changes: intermediate steps, callbacks and the tool
+results remembered for follow-up questions keep the full outputs.
+"""
+
+import os  # Environment configuration
+
+from utils.metrics import PROMPT_TOKENS, current_timings  # Before/after accounting
+from utils.ranking import split_passages, top_passages  # Relevant snippet selection
+from utils.tokens import estimate_tokens, truncate_tokens  # Budget arithmetic
+
+MIN_OUTPUT_TOKENS = 60  # Floor per observation, however many steps there are
+
+
+def _normalize(text):
+    return " ".join(text.lower().split())
+
+
+def _tool_query(tool_input):
+    # Tool inputs are strings or argument dicts ({"query": "..."})
+    if isinstance(tool_input, dict):
+        return " ".join(str(value) for value in tool_input.values())
+    return str(tool_input)
+
+
+class ToolOutputCompactor:
+    """
+    Scratchpad formatter that compacts tool observations to a token budget
+
+    build_agent_executor (utils/agent_setup.py) computes the agent
+    scratchpad with it through RunnablePassthrough.assign, so it sees
+    the full intermediate steps on every iteration.
+
+    Parameters:
+    - budget (int): Token budget for all observations of a run
+    - per_output (int): Upper bound for a single observation
+    - mode (str): "rank" (BM25 passage selection), "truncate" or "off"
+    - fixed_tokens (tuple): (raw, sent) tokens of other compacted prompt
+      parts (format instructions), added to the per-call accounting
+    """
+
+    def __init__(self, budget=2000, per_output=400, mode="rank", fixed_tokens=(0, 0)):
+        if mode not in ("rank", "truncate", "off"):
+            raise ValueError(f"Unknown compaction mode: {mode}")
+        self.budget = budget
+        self.per_output = per_output
+        self.mode = mode
+        self.fixed_tokens = fixed_tokens
+
+    def __call__(self, intermediate_steps):
+        from langchain.agents.format_scratchpad.tools import format_to_tool_messages
+
+        steps = list(intermediate_steps)
+        compacted = self.compact(steps) if self.mode != "off" else steps
+        self._account(steps, compacted)
+        return format_to_tool_messages(compacted)
+
+    def compact(self, steps):
+        """
+        Compacted copies of (action, observation) steps
+
+        Returns:
+        - list: Steps with the same actions and shortened observations
+        """
+        share = max(self.budget // max(len(steps), 1), MIN_OUTPUT_TOKENS)
+        limit = min(self.per_output, share)
+        seen_outputs = {}  # normalised observation -> tool that produced it
+        seen_passages = set()
+        result = []
+        for action, observation in steps:
+            text = str(observation)
+            key = _normalize(text)
+            if key in seen_outputs:
+                text = f"(Same result as the earlier {seen_outputs[key]} call.)"
+            else:
+                seen_outputs[key] = action.tool
+                text = self._shorten(text, _tool_query(action.tool_input), limit, seen_passages)
+            result.append((action, text))
+        return result
+
+    def _shorten(self, text, query, limit, seen_passages):
+        passages = split_passages(text)
+        fresh = []
+        for passage in passages:
+            key = _normalize(passage)
+            if key not in seen_passages:
+                seen_passages.add(key)
+                fresh.append(passage)
+        if len(fresh) == len(passages) and estimate_tokens(text) <= limit:
+            return text  # Short and new: keep it verbatim
+        if not fresh:
+            return "(No new information beyond earlier results.)"
+        if self.mode == "rank" and len(fresh) > 1:
+            selected = top_passages(query, fresh, limit)
+            if selected:
+                return " ... ".join(selected)
+        return truncate_tokens(" ".join(fresh), limit)
+
+    def _account(self, raw_steps, sent_steps):
+        raw = sum(estimate_tokens(str(obs)) for _, obs in raw_steps) + self.fixed_tokens[0]
+        sent = sum(estimate_tokens(str(obs)) for _, obs in sent_steps) + self.fixed_tokens[1]
+        PROMPT_TOKENS.inc(raw, stage="raw")
+        PROMPT_TOKENS.inc(sent, stage="sent")
+        timings = current_timings.get()
+        if timings is not None:
+            timings.add_compaction(raw, sent)
+
+
+def create_compactor(fixed_tokens=(0, 0)):
+    """
+    Build the scratchpad compactor from the environment
+
+    Environment:
+    - COMPACTION_MODE: "rank" (default), "truncate" or "off"
+    - COMPACTION_BUDGET: Token budget for all observations (default 2000)
+    - COMPACTION_TOOL_TOKENS: Per-observation cap (default 400)
+    """
+    return ToolOutputCompactor(
+        budget=int(os.environ.get("COMPACTION_BUDGET", "2000")),
+        per_output=int(os.environ.get("COMPACTION_TOOL_TOKENS", "400")),
+        mode=os.environ.get("COMPACTION_MODE", "rank").lower(),
+        fixed_tokens=fixed_tokens,
+    )
+
+
+"""
+Accounting Notes:
+- Token counts are estimates (~4 characters per token) of the parts the
+  compactor controls: tool observations plus the format instructions,
+  summed over every LLM call of a run (each call resends them)
+- RequestTimings reports them as prompt_tokens.compacted.before/after;
+  prompt_tokens.before/after add the provider-reported prompt tokens
+"""
@@ -0,0 +1,64 @@
+"""
+Near-Duplicate Detection - Shingling and MinHash
+
+Search engines and Wikipedia often return the same sentences (mirrors,
+syndicated articles, quoted intros). Passages are reduced to sets of
+word shingles and summarised by a bottom-k MinHash sketch: the k
+smallest shingle hashes. Two sketches estimate the Jaccard similarity
+of the underlying shingle sets without comparing the texts themselves.
+"""
+
+import re  # Word tokenisation
+import zlib  # Fast, stable shingle hashes
+
+_WORD = re.compile(r"\w+")
+
+
+def shingles(text, size=3):
+    """Set of `size`-word shingles (the whole text for shorter passages)"""
+    words = _WORD.findall(text.lower())
+    if len(words) <= size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i: i + size]) for i in range(len(words) - size + 1)}
+
+
+def minhash(text, k=64, size=3):
+    """Bottom-k MinHash sketch: the k smallest shingle hashes, sorted"""
+    hashes = {zlib.crc32(shingle.encode("utf-8")) for shingle in shingles(text, size)}
+    return sorted(hashes)[:k]
+
+
+def similarity(a, b, k=64):
+    """
+    Estimated Jaccard similarity of two bottom-k sketches
+
+    The k smallest hashes of the union are a uniform sample of the union;
+    the fraction of them present in both sketches estimates |A & B| / |A | B|.
+    """
+    if not a or not b:
+        return 0.0
+    sample = sorted(set(a) | set(b))[:k]
+    both = set(a) & set(b)
+    return sum(1 for value in sample if value in both) / len(sample)
+
+
+def dedupe(texts, threshold=0.6, k=64):
+    """
+    Indexes of the texts to keep, dropping near-duplicates of earlier ones
+
+    Parameters:
+    - texts (list): Passages in priority order (earlier ones win)
+    - threshold (float): Estimated Jaccard similarity counted as duplicate
+
+    Returns:
+    - list: Indexes of kept texts, in order
+    """
+    kept = []
+    sketches = []
+    for index, text in enumerate(texts):
+        sketch = minhash(text, k)
+        if any(similarity(sketch, other, k) >= threshold for other in sketches):
+            continue
+        kept.append(index)
+        sketches.append(sketch)
+    return kept
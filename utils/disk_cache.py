@@ -0,0 +1,356 @@
+"""
+Persistent Fetch Cache - Shared On-Disk Store for Raw Tool Results
+
+Second cache level behind the in-process search caches: raw results
+fetched from DuckDuckGo and Wikipedia survive restarts and are shared by
+every worker process pointing at the same SQLite file.
+
+1. Content-addressed: entries map (source, normalised query) to the
+   SHA-256 of the result; identical results are stored once
+2. zlib-compressed JSON blobs
+3. Per-source TTLs (web results go stale faster than encyclopedia intros)
+4. Size-bounded LRU eviction over the compressed bytes, driven by a
+   running byte total so ordinary writes never scan the tables
+5. Multi-process safe: WAL mode, per-thread connections, fork detection
+   and BEGIN IMMEDIATE writes
+
+Pre-warm from a list of common topics (one per line) with:
+    python -m utils.disk_cache --prewarm topics.txt
+"""
+
+import hashlib  # Content addresses
+import json  # Result serialisation
+import os  # Environment configuration and fork detection
+import sqlite3  # Shared store
+import threading  # Per-thread connections and counters
+import time  # Expiry and LRU timestamps
+import zlib  # Blob compression
+
+from utils.metrics import registry  # Scrape-time cache counters
+
+DEFAULT_TTLS = {
+    "search": 6 * 3600,  # Plain web search tool
+    "duckduckgo": 6 * 3600,  # Retrieval web results
+    "wikipedia": 7 * 86400,  # Article intros change slowly
+}
+TOUCH_INTERVAL = 60  # Seconds between LRU timestamp updates of a hot entry
+SWEEP_INTERVAL = 256  # Writes per process between sweeps of expired entries
+
+
+def _key(source, query):
+    return hashlib.sha256(f"{source}\0{query}".encode("utf-8")).hexdigest()
+
+
+class DiskCache:
+    """
+    SQLite-backed, compressed, size-bounded cache of raw fetch results
+
+    Parameters:
+    - path (str): Database file (shared by all processes using it)
+    - max_bytes (int): Compressed size budget; least recently used
+      entries are evicted beyond it
+    - ttls (dict): source -> seconds a result stays valid
+    - default_ttl (float): TTL for sources not listed in ttls
+    - level (int): zlib compression level
+    """
+
+    def __init__(self, path, max_bytes=256 * 1024 * 1024, ttls=None, default_ttl=86400, level=6):
+        self.path = os.path.abspath(path)
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.default_ttl = default_ttl
+        self.level = level
+        self._local = threading.local()  # One connection per thread
+        self._pid = os.getpid()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+        self._unswept = 0  # Writes since this process last swept
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS blobs (
+                digest TEXT PRIMARY KEY,
+                data BLOB NOT NULL,
+                size INTEGER NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS entries (
+                key TEXT PRIMARY KEY,
+                source TEXT NOT NULL,
+                digest TEXT NOT NULL,
+                expires_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_digest ON entries (digest)")
+        conn.execute("CREATE INDEX IF NOT EXISTS entries_expires ON entries (expires_at)")
+        conn.execute("CREATE TABLE IF NOT EXISTS meta (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+        # Running total of blob bytes; seeded once for databases created before it
+        conn.execute(
+            "INSERT OR IGNORE INTO meta (name, value) "
+            "SELECT 'bytes', COALESCE(SUM(size), 0) FROM blobs"
+        )
+
+    def _connect(self):
+        if os.getpid() != self._pid:  # Forked worker: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            self._local.conn = conn
+        return conn
+
+    def ttl(self, source):
+        return self.ttls.get(source, self.default_ttl)
+
+    def get(self, source, query):
+        """
+        Cached result for a source and normalised query
+
+        Returns:
+        - The stored value, or None when missing or expired
+        """
+        conn = self._connect()
+        now = time.time()
+        key = _key(source, query)
+        row = conn.execute(
+            "SELECT b.data, e.accessed_at FROM entries e JOIN blobs b ON b.digest = e.digest "
+            "WHERE e.key = ? AND e.expires_at > ?",
+            (key, now),
+        ).fetchone()
+        if row is None:
+            with self._lock:
+                self.misses += 1
+            return None
+        if now - row[1] > TOUCH_INTERVAL:  # Throttled: hot keys must not serialise on writes
+            conn.execute("UPDATE entries SET accessed_at = ? WHERE key = ?", (now, key))
+        with self._lock:
+            self.hits += 1
+        return json.loads(zlib.decompress(row[0]))
+
+    def set(self, source, query, value):
+        """Store a result (JSON-serialisable) and evict beyond the size budget"""
+        data = zlib.compress(json.dumps(value).encode("utf-8"), self.level)
+        if len(data) > self.max_bytes:
+            return  # Never cache a value that alone exceeds the budget
+        digest = hashlib.sha256(data).hexdigest()
+        now = time.time()
+        with self._lock:
+            self._unswept += 1
+            sweep = self._unswept >= SWEEP_INTERVAL
+            if sweep:
+                self._unswept = 0
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            if conn.execute(
+                "INSERT OR IGNORE INTO blobs (digest, data, size) VALUES (?, ?, ?)",
+                (digest, data, len(data)),
+            ).rowcount:
+                conn.execute("UPDATE meta SET value = value + ? WHERE name = 'bytes'", (len(data),))
+            conn.execute(
+                "INSERT INTO entries (key, source, digest, expires_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?) ON CONFLICT(key) DO UPDATE SET "
+                "digest = excluded.digest, expires_at = excluded.expires_at, "
+                "accessed_at = excluded.accessed_at",
+                (_key(source, query), source, digest, now + self.ttl(source), now),
+            )
+            total = conn.execute("SELECT value FROM meta WHERE name = 'bytes'").fetchone()[0]
+            evicted = 0
+            if sweep or total > self.max_bytes:  # Common path: two inserts and a lookup
+                evicted = self._evict(conn, now)
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        with self._lock:
+            self.writes += 1
+            self.evictions += evicted
+
+    def _evict(self, conn, now):
+        # Expired entries first, then least recently used until within budget
+        evicted = conn.execute("DELETE FROM entries WHERE expires_at <= ?", (now,)).rowcount
+        total = self._sweep_blobs(conn)
+        if total > self.max_bytes:
+            rows = conn.execute(
+                "SELECT e.key, b.size FROM entries e JOIN blobs b ON b.digest = e.digest "
+                "ORDER BY e.accessed_at"
+            )
+            victims = []
+            for key, size in rows:
+                if total <= self.max_bytes:
+                    break
+                victims.append((key,))
+                total -= size  # Shared blobs may free less; the next write catches up
+            conn.executemany("DELETE FROM entries WHERE key = ?", victims)
+            evicted += len(victims)
+            self._sweep_blobs(conn)
+        return evicted
+
+    def _sweep_blobs(self, conn):
+        # Drop unreferenced blobs (evicted or overwritten results) and
+        # re-base the running total on the exact size
+        conn.execute("DELETE FROM blobs WHERE digest NOT IN (SELECT digest FROM entries)")
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM blobs").fetchone()[0]
+        conn.execute("UPDATE meta SET value = ? WHERE name = 'bytes'", (total,))
+        return total
+
+    def clear(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        conn.execute("DELETE FROM entries")
+        conn.execute("DELETE FROM blobs")
+        conn.execute("UPDATE meta SET value = 0 WHERE name = 'bytes'")
+        conn.execute("COMMIT")
+
+    def stats(self):
+        """Entry count, compressed bytes and this process's hit/miss counters"""
+        entries, size = self._connect().execute(
+            "SELECT (SELECT COUNT(*) FROM entries), (SELECT value FROM meta WHERE name = 'bytes')"
+        ).fetchone()
+        with self._lock:
+            return {
+                "entries": entries,
+                "bytes": size,
+                "hits": self.hits,
+                "misses": self.misses,
+                "writes": self.writes,
+                "evictions": self.evictions,
+            }
+
+
+def parse_ttls(value):
+    """'wikipedia=604800,duckduckgo=3600' -> {"wikipedia": 604800.0, ...}"""
+    ttls = {}
+    for item in value.split(","):
+        if "=" in item:
+            source, seconds = item.split("=", 1)
+            ttls[source.strip()] = float(seconds)
+    return ttls
+
+
+def create_disk_cache():
+    """
+    Build the shared fetch cache from the environment
+
+    Environment:
+    - FETCH_CACHE: "sqlite" (default) or "off"
+    - FETCH_CACHE_DB: SQLite file path (default: data/fetch_cache.sqlite3)
+    - FETCH_CACHE_MAX_MB: Compressed size budget in MiB (default 256)
+    - FETCH_CACHE_TTL: Default TTL in seconds (default 86400)
+    - FETCH_CACHE_TTLS: Per-source TTLs, e.g. "wikipedia=604800,duckduckgo=3600"
+
+    Returns:
+    - DiskCache, or None when disabled
+    """
+    backend = os.environ.get("FETCH_CACHE", "sqlite").lower()
+    if backend == "off":
+        return None
+    if backend != "sqlite":
+        raise ValueError(f"Unknown FETCH_CACHE: {backend}")
+    return DiskCache(
+        os.environ.get("FETCH_CACHE_DB", os.path.join("data", "fetch_cache.sqlite3")),
+        max_bytes=int(float(os.environ.get("FETCH_CACHE_MAX_MB", "256")) * 1024 * 1024),
+        ttls=parse_ttls(os.environ.get("FETCH_CACHE_TTLS", "")),
+        default_ttl=float(os.environ.get("FETCH_CACHE_TTL", "86400")),
+    )
+
+
+_lock = threading.Lock()
+_cache = {}
+
+
+def get_disk_cache():
+    """Process-wide fetch cache, opened on first use (None when off)"""
+    if "default" not in _cache:
+        with _lock:
+            if "default" not in _cache:
+                _cache["default"] = create_disk_cache()
+    return _cache["default"]
+
+
+def set_disk_cache(cache):
+    """Replace the process-wide fetch cache (tests and benchmarks)"""
+    with _lock:
+        _cache["default"] = cache
+
+
+def _collect_disk_cache_metrics():
+    cache = _cache.get("default")  # Never opens the database just for a scrape
+    if cache is None:
+        return
+    stats = cache.stats()
+    for name in ("hits", "misses", "writes", "evictions"):
+        yield (f"fetch_cache_{name}_total", "counter", f"On-disk fetch cache {name}", {}, stats[name])
+    yield ("fetch_cache_entries", "gauge", "Results in the on-disk fetch cache", {}, stats["entries"])
+    yield ("fetch_cache_bytes", "gauge", "Compressed bytes in the on-disk fetch cache", {}, stats["bytes"])
+
+
+registry.register_collector(_collect_disk_cache_metrics)
+
+
+def prewarm(topics):
+    """
+    Fetch every topic from every retrieval source into the shared cache
+
+    Returns:
+    - int: Topics fetched
+    """
+    from utils.retrieval import create_retriever
+
+    retriever = create_retriever()
+    count = 0
+    for topic in topics:
+        topic = topic.strip()
+        if not topic or topic.startswith("#"):
+            continue
+        documents = retriever.fetch(topic)
+        count += 1
+        print(f"{topic}: {len(documents)} document(s)")
+    return count
+
+
+if __name__ == "__main__":
+    import argparse  # Maintenance options
+
+    arguments = argparse.ArgumentParser(description="Fetch cache maintenance")
+    arguments.add_argument("--prewarm", metavar="FILE",
+                           help="Fetch the topics listed in FILE (one per line)")
+    arguments.add_argument("--clear", action="store_true", help="Remove every cached result")
+    options = arguments.parse_args()
+
+    cache = get_disk_cache()
+    if cache is None:
+        raise SystemExit("FETCH_CACHE=off: nothing to do")
+    if options.clear:
+        cache.clear()
+        print("Fetch cache cleared")
+    if options.prewarm:
+        with open(options.prewarm, encoding="utf-8") as f:
+            print(f"Pre-warmed {prewarm(f)} topic(s)")
+    stats = cache.stats()
+    print(f"{stats['entries']} result(s), {stats['bytes']} compressed byte(s) in {cache.path}")
+
+
+"""
+Cache Notes:
+- Keys are SHA-256 of "<source>\\0<normalised query>"; blobs are keyed by
+  the SHA-256 of their compressed bytes, so repeated results share a row
+- Entries are touched at most once a minute, so concurrent readers of a
+  hot key do not queue behind the writer lock
+- Eviction runs inside the writing transaction, only when the running
+  byte total exceeds the budget or every SWEEP_INTERVAL writes; expired
+  rows go first (indexed by expires_at) and the sweep re-bases the total,
+  so blobs orphaned by overwritten results are counted until then
+- Late results of timed-out retrieval sources are still written, so the
+  next request (in any worker) is served from disk
+"""
@@ -0,0 +1,317 @@
+"""
+Report Downloads - Conditional, Ranged and Precompressed Delivery
+
+Shared by the Flask and ASGI download endpoints:
+
+1. Strong ETags (SHA-256 of the report) and Last-Modified, answering
+   If-None-Match / If-Modified-Since with 304 Not Modified
+2. Single byte-range requests (206 / 416), honouring If-Range
+3. Content-Encoding negotiation (br, gzip) against variants written
+   once next to the report, never compressed per request
+4. Zip bundles streamed report by report in constant memory
+"""
+
+import gzip  # Precompressed .gz variants
+import hashlib  # Strong ETags
+import os  # Paths, stat and atomic rename
+import tempfile  # Atomic variant writes
+import zipfile  # Report bundles
+
+from werkzeug.http import (  # RFC 9110 header parsing
+    http_date,
+    parse_accept_header,
+    parse_date,
+    parse_etags,
+    parse_range_header,
+    quote_etag,
+)
+from werkzeug.security import safe_join  # Path traversal protection
+
+from utils.cache import TTLCache  # Content hash memo
+from utils.report_store import get_report_store  # On-demand report export
+
+try:
+    import brotli  # Brotli variants (optional)
+except ImportError:  # pragma: no cover - gzip only without the brotli package
+    brotli = None
+
+CHUNK_SIZE = 64 * 1024  # Streaming read size
+CACHE_CONTROL = "private, max-age=86400"  # Report files never change once written
+MIN_COMPRESS_SIZE = 512  # Smaller files are served as-is
+
+
+def _gzip(data):
+    return gzip.compress(data, compresslevel=9, mtime=0)  # mtime=0: reproducible bytes
+
+
+# Encoding -> (file suffix, compressor), in server preference order
+ENCODINGS = {"gzip": (".gz", _gzip)}
+if brotli is not None:
+    ENCODINGS = {"br": (".br", lambda data: brotli.compress(data, quality=11)), **ENCODINGS}
+
+# (path, mtime, size) -> SHA-256 hex digest of the file
+_hashes = TTLCache(max_entries=4096, ttl=None)
+# (report store path, filename) of reports known to exist
+_known = TTLCache(max_entries=4096, ttl=None)
+
+
+# -----------------------------------------------------------------------------
+# Precompression
+# -----------------------------------------------------------------------------
+def precompress(path):
+    """
+    Write compressed variants of a file (path.gz, path.br) once
+
+    Existing variants are kept; each one is written to a temporary name
+    and renamed into place so readers never see a partial file.
+    """
+    missing = [
+        (suffix, compress)
+        for suffix, compress in ENCODINGS.values()
+        if not os.path.isfile(path + suffix)
+    ]
+    if not missing or os.path.getsize(path) < MIN_COMPRESS_SIZE:
+        return
+    with open(path, "rb") as f:
+        data = f.read()
+    directory = os.path.dirname(path)
+    for suffix, compress in missing:
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".compress-")
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(compress(data))
+            os.replace(temp_path, path + suffix)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+
+
+def is_known_report(filename):
+    """
+    True for export filenames of stored reports (memoised; reports are
+    immutable, so a known filename stays known)
+    """
+    store = get_report_store()
+    key = (store.path, filename)
+    if _known.get(key) is None:
+        if store.get_by_filename(filename) is None:
+            return False
+        _known.set(key, True)
+    return True
+
+
+def resolve_report(directory, filename):
+    """
+    Validated path of a downloadable report, exporting it if needed
+
+    Only reports known to the report store (and their .gz/.br variants)
+    are served; anything else in the directory is never exposed. The
+    first download exports the report from the store and writes its
+    compressed variants; later downloads only stat the files.
+
+    Returns:
+    - str: File path, or None for traversal attempts and unknown files
+    """
+    report = filename
+    for suffix, _ in ENCODINGS.values():
+        if report.endswith(suffix):
+            report = report[: -len(suffix)]
+    file_path = safe_join(directory, filename)  # None on traversal attempts
+    if file_path is None or not is_known_report(report):
+        return None
+    report_path = get_report_store().export(report, directory)
+    if report_path is None:
+        return None
+    precompress(report_path)
+    return file_path if os.path.isfile(file_path) else None
+
+
+def file_hash(path, stat):
+    """SHA-256 of a file, memoised by (path, mtime, size)"""
+    key = (path, stat.st_mtime_ns, stat.st_size)
+    digest = _hashes.get(key)
+    if digest is None:
+        sha = hashlib.sha256()
+        with open(path, "rb") as f:
+            for chunk in iter(lambda: f.read(CHUNK_SIZE), b""):
+                sha.update(chunk)
+        digest = sha.hexdigest()
+        _hashes.set(key, digest)
+    return digest
+
+
+# -----------------------------------------------------------------------------
+# Response Planning
+# -----------------------------------------------------------------------------
+class DownloadPlan:
+    """
+    Framework-neutral description of a download response
+
+    Attributes:
+    - status (int): 200, 206, 304 or 416
+    - headers (list): (name, value) pairs
+    - path (str): File to stream (None when there is no body)
+    - start / length (int): Byte window of `path` to send
+    """
+
+    def __init__(self, status, headers, path=None, start=0, length=0):
+        self.status = status
+        self.headers = headers
+        self.path = path
+        self.start = start
+        self.length = length
+
+
+def plan_download(file_path, headers):
+    """
+    Decide how to answer a GET for an existing report file
+
+    Parameters:
+    - file_path (str): Validated path of the report (identity encoding)
+    - headers (callable): name -> request header value or None
+
+    Returns:
+    - DownloadPlan
+    """
+    stat = os.stat(file_path)
+    digest = file_hash(file_path, stat)
+    range_header = headers("Range")
+
+    # Compressed variants are whole-representation only: ranges get identity
+    encoding = None
+    if range_header is None:
+        accepted = parse_accept_header(headers("Accept-Encoding"))
+        available = [name for name, (suffix, _) in ENCODINGS.items()
+                     if os.path.isfile(file_path + suffix)]
+        encoding = accepted.best_match(available) if available else None
+
+    served_path, served_stat = file_path, stat
+    if encoding:
+        served_path = file_path + ENCODINGS[encoding][0]
+        served_stat = os.stat(served_path)
+
+    etag = quote_etag(f"{digest[:32]}-{encoding}" if encoding else digest[:32])
+    response_headers = [
+        ("ETag", etag),
+        ("Last-Modified", http_date(stat.st_mtime)),
+        ("Cache-Control", CACHE_CONTROL),
+        ("Accept-Ranges", "bytes"),
+        ("Vary", "Accept-Encoding"),
+    ]
+
+    if not_modified(headers, etag, stat.st_mtime):
+        return DownloadPlan(304, response_headers)
+
+    response_headers += [
+        ("Content-Type", "text/markdown; charset=utf-8"),
+        ("Content-Disposition", f'attachment; filename="{os.path.basename(file_path)}"'),
+    ]
+    if encoding:
+        response_headers.append(("Content-Encoding", encoding))
+
+    size = served_stat.st_size
+    byte_range = parse_range_header(range_header) if range_header else None
+    if byte_range is not None and if_range_matches(headers("If-Range"), etag, stat.st_mtime):
+        window = byte_range.range_for_length(size)
+        if window is None and len(byte_range.ranges) == 1:
+            response_headers.append(("Content-Range", f"bytes */{size}"))
+            return DownloadPlan(416, response_headers)
+        if window is not None:  # Multi-range requests fall through to a full 200
+            start, stop = window
+            response_headers += [
+                ("Content-Range", f"bytes {start}-{stop - 1}/{size}"),
+                ("Content-Length", str(stop - start)),
+            ]
+            return DownloadPlan(206, response_headers, served_path, start, stop - start)
+
+    response_headers.append(("Content-Length", str(size)))
+    return DownloadPlan(200, response_headers, served_path, 0, size)
+
+
+def not_modified(headers, etag, mtime):
+    """If-None-Match takes precedence over If-Modified-Since (RFC 9110)"""
+    if_none_match = headers("If-None-Match")
+    if if_none_match is not None:
+        etags = parse_etags(if_none_match)
+        return etags.star_tag or etags.contains_weak(etag.strip('"'))
+    since = parse_date(headers("If-Modified-Since"))
+    return since is not None and int(mtime) <= since.timestamp()
+
+
+def if_range_matches(value, etag, mtime):
+    """A stale If-Range validator turns a range request into a full one"""
+    if value is None:
+        return True
+    if value.startswith('"') or value.startswith("W/"):
+        return value == etag  # Strong comparison only
+    since = parse_date(value)
+    return since is not None and int(mtime) == int(since.timestamp())
+
+
+def iter_file(path, start, length):
+    """Yield `length` bytes of a file from `start` in CHUNK_SIZE pieces"""
+    with open(path, "rb") as f:
+        f.seek(start)
+        remaining = length
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+# -----------------------------------------------------------------------------
+# Zip Bundles
+# -----------------------------------------------------------------------------
+class _ZipSink:
+    """Write-only stream whose bytes are drained after every chunk"""
+
+    def __init__(self):
+        self._chunks = []
+
+    def write(self, data):
+        self._chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self._chunks)
+        self._chunks.clear()
+        return data
+
+
+def iter_zip(paths):
+    """
+    Stream a zip archive of files without building it in memory
+
+    zipfile writes data descriptors when the output cannot seek, so each
+    member is compressed and emitted chunk by chunk.
+
+    Parameters:
+    - paths (list): (archive name, file path) pairs
+    """
+    sink = _ZipSink()
+    with zipfile.ZipFile(sink, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        for name, path in paths:
+            with open(path, "rb") as source, archive.open(name, "w", force_zip64=True) as member:
+                for chunk in iter(lambda: source.read(CHUNK_SIZE), b""):
+                    member.write(chunk)
+                    data = sink.drain()
+                    if data:
+                        yield data
+            data = sink.drain()
+            if data:
+                yield data
+    yield sink.drain()  # Central directory
+
+
+"""
+Caching Notes:
+- ETags are per representation: the gzip and brotli variants carry
+  their own tag so caches never mix encodings
+- Variants are created when a report is exported (first download); the
+  .gz/.br files are derived data and may be deleted at any time
+"""
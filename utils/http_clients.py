@@ -0,0 +1,329 @@
+"""
+Shared HTTP Transport Layer
+
+One pooled, keep-alive HTTP client per outbound backend (OpenAI, web
+search, Wikipedia) instead of whatever default each library builds.
+Every backend gets its own connection pool limits and connect/read
+timeouts, HTTP/2 when the `h2` package is installed, and counters that
+show how close each pool is to saturation.
+
+Environment (per backend, prefix OPENAI_/SEARCH_/WIKIPEDIA_):
+- <PREFIX>HTTP_MAX_CONNECTIONS: Pool size (default 100)
+- <PREFIX>HTTP_MAX_KEEPALIVE: Idle connections kept open (default 20)
+- <PREFIX>HTTP_KEEPALIVE_EXPIRY: Idle connection lifetime in seconds (30)
+- <PREFIX>CONNECT_TIMEOUT / <PREFIX>READ_TIMEOUT: Seconds
+- HTTP2: "auto" (default), "1" or "0"
+"""
+
+import importlib.util  # Optional HTTP/2 support detection
+import os  # Environment configuration and fork detection
+import threading  # Shared client registry
+
+import httpx  # Pooled HTTP client (also used by the OpenAI SDK)
+
+# Default connect/read timeouts (seconds) per backend
+DEFAULT_TIMEOUTS = {
+    "openai": (5.0, 60.0),  # LLM responses can take a while
+    "search": (5.0, 10.0),
+    "wikipedia": (5.0, 10.0),
+}
+
+
+def _env(backend, name, default):
+    return os.environ.get(f"{backend.upper()}_{name}", default)
+
+
+def http2_enabled():
+    """HTTP/2 negotiation (needs the optional `h2` package)"""
+    setting = os.environ.get("HTTP2", "auto").lower()
+    if setting == "0":
+        return False
+    available = importlib.util.find_spec("h2") is not None
+    if setting == "1" and not available:
+        print("HTTP2=1 requested but the h2 package is not installed; using HTTP/1.1")
+    return available
+
+
+def backend_config(backend):
+    """Pool limits and timeouts for one backend"""
+    connect, read = DEFAULT_TIMEOUTS.get(backend, (5.0, 30.0))
+    return {
+        "max_connections": int(_env(backend, "HTTP_MAX_CONNECTIONS", "100")),
+        "max_keepalive": int(_env(backend, "HTTP_MAX_KEEPALIVE", "20")),
+        "keepalive_expiry": float(_env(backend, "HTTP_KEEPALIVE_EXPIRY", "30")),
+        "connect_timeout": float(_env(backend, "CONNECT_TIMEOUT", str(connect))),
+        "read_timeout": float(_env(backend, "READ_TIMEOUT", str(read))),
+        "http2": http2_enabled(),
+    }
+
+
+# -----------------------------------------------------------------------------
+# Pool Metrics
+# -----------------------------------------------------------------------------
+class PoolStats:
+    """
+    Per-backend request counters
+
+    Saturation is in-flight requests divided by the pool size; sustained
+    values near 1.0 mean requests are queueing for a free connection.
+    """
+
+    def __init__(self, backend, max_connections):
+        self.backend = backend
+        self.max_connections = max_connections
+        self.requests = 0
+        self.errors = 0
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self._lock = threading.Lock()
+
+    def started(self):
+        with self._lock:
+            self.requests += 1
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+
+    def finished(self, failed=False):
+        with self._lock:
+            self.in_flight -= 1
+            if failed:
+                self.errors += 1
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                "max_connections": self.max_connections,
+                "requests": self.requests,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "peak_in_flight": self.peak_in_flight,
+                "saturation": round(self.in_flight / self.max_connections, 3)
+                if self.max_connections
+                else 0.0,
+            }
+
+
+class _CountedStream(httpx.SyncByteStream):
+    # Response body that stays "in flight" until it is closed, so streamed
+    # LLM responses count for their whole duration, not just the headers
+    def __init__(self, stream, stats):
+        self._stream = stream
+        self._stats = stats
+        self._open = True
+
+    def _finish(self, failed=False):
+        if self._open:
+            self._open = False
+            self._stats.finished(failed=failed)
+
+    def __iter__(self):
+        try:
+            yield from self._stream
+        except Exception:
+            self._finish(failed=True)
+            raise
+
+    def close(self):
+        try:
+            self._stream.close()
+        finally:
+            self._finish()
+
+
+class _CountedAsyncStream(httpx.AsyncByteStream):
+    # Async counterpart of _CountedStream
+    def __init__(self, stream, stats):
+        self._stream = stream
+        self._stats = stats
+        self._open = True
+
+    def _finish(self, failed=False):
+        if self._open:
+            self._open = False
+            self._stats.finished(failed=failed)
+
+    async def __aiter__(self):
+        try:
+            async for chunk in self._stream:
+                yield chunk
+        except Exception:
+            self._finish(failed=True)
+            raise
+
+    async def aclose(self):
+        try:
+            await self._stream.aclose()
+        finally:
+            self._finish()
+
+
+class InstrumentedTransport(httpx.BaseTransport):
+    """
+    Pooled transport that reports request start/finish to PoolStats
+
+    A request is in flight until its response is closed (the whole body
+    of a streamed response has been read or abandoned).
+
+    Fork-safe: a process that did not create the transport (a worker
+    forked from a preloaded master) gets its own connection pool on first
+    use, and requests are counted in that process's PoolStats.
+    """
+
+    def __init__(self, backend, **kwargs):
+        self.backend = backend
+        self._kwargs = kwargs  # httpx.HTTPTransport options
+        self._pid = None
+        self._transport = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():  # Never reuse the parent's sockets
+                    self._transport = httpx.HTTPTransport(**self._kwargs)
+                    self._pid = os.getpid()
+        return self._transport
+
+    def handle_request(self, request):
+        stats = get_pool_stats(self.backend)
+        stats.started()
+        try:
+            response = self._pool().handle_request(request)
+        except Exception:
+            stats.finished(failed=True)
+            raise
+        response.stream = _CountedStream(response.stream, stats)  # Finished on close
+        return response
+
+    def close(self):
+        if self._transport is not None and self._pid == os.getpid():
+            self._transport.close()
+
+
+class InstrumentedAsyncTransport(httpx.AsyncBaseTransport):
+    """Async counterpart of InstrumentedTransport"""
+
+    def __init__(self, backend, **kwargs):
+        self.backend = backend
+        self._kwargs = kwargs  # httpx.AsyncHTTPTransport options
+        self._pid = None
+        self._transport = None
+        self._lock = threading.Lock()
+
+    def _pool(self):
+        if self._pid != os.getpid():
+            with self._lock:
+                if self._pid != os.getpid():
+                    self._transport = httpx.AsyncHTTPTransport(**self._kwargs)
+                    self._pid = os.getpid()
+        return self._transport
+
+    async def handle_async_request(self, request):
+        stats = get_pool_stats(self.backend)
+        stats.started()
+        try:
+            response = await self._pool().handle_async_request(request)
+        except Exception:
+            stats.finished(failed=True)
+            raise
+        response.stream = _CountedAsyncStream(response.stream, stats)  # Finished on close
+        return response
+
+    async def aclose(self):
+        if self._transport is not None and self._pid == os.getpid():
+            await self._transport.aclose()
+
+
+# -----------------------------------------------------------------------------
+# Client Registry
+# -----------------------------------------------------------------------------
+_lock = threading.Lock()
+_clients = {}  # (backend, is_async) -> client (fork-safe transports)
+_stats = {}  # backend -> PoolStats of this process
+_pid = os.getpid()  # Counters start from zero in every forked worker
+
+
+def _build(backend, is_async):
+    config = backend_config(backend)
+    limits = httpx.Limits(
+        max_connections=config["max_connections"],
+        max_keepalive_connections=config["max_keepalive"],
+        keepalive_expiry=config["keepalive_expiry"],
+    )
+    timeout = get_timeout(backend)
+    if is_async:
+        transport = InstrumentedAsyncTransport(backend, limits=limits, http2=config["http2"])
+        return httpx.AsyncClient(transport=transport, timeout=timeout, limits=limits)
+    transport = InstrumentedTransport(backend, limits=limits, http2=config["http2"])
+    return httpx.Client(transport=transport, timeout=timeout, limits=limits)
+
+
+def _reset_if_forked():
+    # Caller holds _lock. Forked child: the parent's counters are not ours.
+    # Clients are kept: objects built before the fork (a preloaded, warmed
+    # agent) hold them, and their transports open a fresh pool per process
+    global _pid
+    if os.getpid() != _pid:
+        for backend, stats in list(_stats.items()):
+            _stats[backend] = PoolStats(backend, stats.max_connections)  # Zeroed, still listed
+        _pid = os.getpid()
+
+
+def _get(backend, is_async):
+    key = (backend, is_async)
+    with _lock:
+        _reset_if_forked()
+        client = _clients.get(key)
+        if client is None:
+            client = _clients[key] = _build(backend, is_async)
+        return client
+
+
+def get_http_client(backend):
+    """Shared synchronous httpx.Client for a backend"""
+    return _get(backend, False)
+
+
+def get_async_http_client(backend):
+    """Shared httpx.AsyncClient for a backend (ASGI / ainvoke paths)"""
+    return _get(backend, True)
+
+
+def get_pool_stats(backend):
+    """PoolStats for a backend (created with its config if not yet used)"""
+    with _lock:
+        _reset_if_forked()
+        stats = _stats.get(backend)
+        if stats is None:
+            stats = _stats[backend] = PoolStats(
+                backend, backend_config(backend)["max_connections"]
+            )
+        return stats
+
+
+def pool_stats():
+    """Snapshot of every backend's pool counters"""
+    with _lock:
+        _reset_if_forked()
+        return {backend: stats.snapshot() for backend, stats in _stats.items()}
+
+
+def get_timeout(backend):
+    """httpx.Timeout for a backend (SDKs that set per-request timeouts)"""
+    config = backend_config(backend)
+    return httpx.Timeout(config["read_timeout"], connect=config["connect_timeout"])
+
+
+"""
+Backend Coverage:
+- openai: ChatOpenAI receives the shared sync and async clients
+- search: duckduckgo_search uses its own Rust HTTP client (primp); one
+  DDGS session is kept per thread for keep-alive, with these timeouts,
+  and its calls are counted in the same PoolStats
+- wikipedia: reserved for Wikipedia fetches made through httpx
+
+Pre-fork Servers:
+- Clients built in a preloaded master (gunicorn, AGENT_WARMUP=1) are
+  inherited by every worker; each worker's first request through them
+  opens a new connection pool, and counters are per worker
+"""
@@ -0,0 +1,732 @@
+"""
+Background Job Queue for Research Requests
+
+Decouples HTTP request handling from long-running agent executions:
+requests submit a job and return immediately, while a bounded pool of
+worker threads drains the queue and records each job's status and result.
+
+Backends:
+1. InProcessJobQueue - Thread-safe in-memory queue (single process)
+2. SQLiteJobQueue - Shared SQLite table (multi-process deployments)
+
+Both backends pick the next job by weighted round-robin across the
+submitting subjects (payload["subject"]), skipping subjects that are
+already at their concurrent-run quota, so one user's backlog cannot
+starve everyone else.
+"""
+
+import json  # Payload/result serialisation for the shared backend
+import os  # Environment configuration
+import queue  # Bounded in-memory FIFO
+import sqlite3  # Shared job table for multi-process deployments
+import threading  # Worker pool and state locking
+import time  # Job timestamps and polling
+import uuid  # Job identifiers
+from collections import OrderedDict, deque  # Job registry, per-subject FIFOs
+
+from utils.budget import RunCancelled, current_cancel  # Cooperative job cancellation
+
+
+# -----------------------------------------------------------------------------
+# Configuration
+# -----------------------------------------------------------------------------
+DEFAULT_WORKERS = int(os.environ.get("RESEARCH_WORKERS", "4"))
+DEFAULT_QUEUE_DEPTH = int(os.environ.get("RESEARCH_QUEUE_DEPTH", "32"))
+DEFAULT_RETRY_AFTER = int(os.environ.get("RESEARCH_RETRY_AFTER", "5"))  # Seconds
+DEFAULT_JOB_RETENTION = int(os.environ.get("RESEARCH_JOB_RETENTION", "3600"))
+DEFAULT_JOB_LEASE = float(os.environ.get("RESEARCH_JOB_LEASE", "60"))  # Seconds without a heartbeat
+DEFAULT_MAX_ATTEMPTS = int(os.environ.get("RESEARCH_JOB_MAX_ATTEMPTS", "3"))  # Claims per job
+MAX_BACKOFF = 5.0  # Seconds between retries of a failing queue backend
+FINISH_RETRIES = 5  # Attempts to record a job's outcome
+ANONYMOUS = "anonymous"  # Subject of payloads submitted without one
+
+
+class QueueFullError(Exception):
+    """
+    Raised when the queue is at its configured depth
+
+    Attributes:
+    - retry_after (int): Suggested client back-off in seconds
+    """
+
+    def __init__(self, retry_after=DEFAULT_RETRY_AFTER):
+        super().__init__("Research queue is full, retry later")
+        self.retry_after = retry_after
+
+
+class JobQueue:
+    """
+    Backend-independent worker pool
+
+    Subclasses implement storage (_enqueue, _claim, _finish, get, depth);
+    this class owns the worker threads and handler execution.
+    """
+
+    def __init__(self, handler, max_workers=DEFAULT_WORKERS, max_depth=DEFAULT_QUEUE_DEPTH,
+                 quotas=None):
+        self.handler = handler  # Callable(payload) -> JSON-serialisable result
+        self.max_workers = max_workers  # Concurrent agent runs per process
+        self.max_depth = max_depth  # Queued (not yet running) jobs allowed
+        self.quotas = quotas  # Callable() -> QuotaManager or None (run slots, weights)
+        self._threads = []
+        self._start_lock = threading.Lock()
+        self._stopping = threading.Event()
+        self._running = {}  # job_id -> cancellation event of jobs running here
+
+    def submit(self, payload):
+        """
+        Enqueue a job and return its identifier
+
+        Raises:
+        - QueueFullError: Queue depth limit reached (maps to HTTP 429)
+        """
+        self._ensure_workers()  # Started lazily so pre-forked workers own their threads
+        job_id = uuid.uuid4().hex
+        self._enqueue(job_id, payload)
+        return job_id
+
+    def shutdown(self, wait=True):
+        """Stop accepting work and let worker threads exit"""
+        self._stopping.set()
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _ensure_workers(self):
+        if self._threads:
+            return
+        with self._start_lock:
+            if self._threads:
+                return
+            for i in range(self.max_workers):
+                thread = threading.Thread(
+                    target=self._worker_loop, name=f"research-worker-{i}", daemon=True
+                )
+                thread.start()
+                self._threads.append(thread)
+            if self._threads:  # Producer-only instances run nothing to renew
+                self._start_heartbeat()
+
+    def _start_heartbeat(self):
+        """Backends with leases renew the jobs running in this process"""
+
+    def _worker_loop(self):
+        backoff = 0.0
+        while not self._stopping.is_set():
+            try:
+                claimed = self._claim(timeout=0.5)
+            except Exception as e:
+                # e.g. "database is locked": keep the worker alive and back off
+                backoff = min(max(backoff * 2, 0.5), MAX_BACKOFF)
+                print(f"Research queue claim failed (retrying in {backoff}s):", e)  # Server-side logging
+                self._stopping.wait(backoff)
+                continue
+            backoff = 0.0
+            if claimed is None:
+                continue  # Idle - re-check the stop flag
+            job_id, payload, lease, claim = claimed
+            cancelled = self._running[job_id] = self._cancel_event(job_id)
+            token = current_cancel.set(cancelled)  # Picked up by the run's budget
+            try:
+                result, status, error = self.handler(payload), "succeeded", None
+            except RunCancelled:
+                result, status, error = None, "cancelled", "Cancelled by the client"
+            except Exception as e:
+                print(f"Research job {job_id} failed:", e)  # Server-side logging
+                result, status, error = None, "failed", str(e)
+            finally:
+                current_cancel.reset(token)
+                self._running.pop(job_id, None)
+                if lease is not None:
+                    self._quota_manager().release(lease)  # Before _finish wakes workers
+            self._record(job_id, claim, status, result, error)
+
+    def _record(self, job_id, claim, status, result, error):
+        # A failed write must not kill the worker; after the last attempt
+        # a leased backend requeues the job once its lease expires
+        for attempt in range(1, FINISH_RETRIES + 1):
+            try:
+                self._finish(job_id, status, result=result, error=error, claim=claim)
+                return
+            except Exception as e:
+                print(f"Recording research job {job_id} failed (attempt {attempt}):", e)  # Server-side logging
+                if self._stopping.wait(min(0.5 * 2 ** attempt, MAX_BACKOFF)):
+                    return
+
+    def cancel(self, job_id):
+        """
+        Cancel a queued or running job
+
+        Queued jobs are never started; running jobs stop at their next
+        agent step (any process, for the shared backend).
+
+        Returns:
+        - dict: The job record afterwards, or None for unknown job ids
+        """
+        if self._mark_cancelled(job_id):
+            event = self._running.get(job_id)
+            if event is not None:
+                event.set()  # Running in this process: stop right away
+        return self.get(job_id)
+
+    def _cancel_event(self, job_id):
+        return threading.Event()
+
+    # Fair scheduling ---------------------------------------------------------
+    def _quota_manager(self):
+        return self.quotas() if self.quotas is not None else None
+
+    def _weight(self, subject):
+        manager = self._quota_manager()
+        return manager.weight(subject) if manager is not None else 1.0
+
+    def _admit(self, subject):
+        """
+        Run slot for a subject's next job
+
+        Returns:
+        - (bool, lease): Whether the subject may start a job now, and the
+          lease to release afterwards (None when quotas are off)
+        """
+        manager = self._quota_manager()
+        if manager is None:
+            return True, None
+        lease = manager.try_acquire(subject)
+        return lease is not None, lease
+
+    # Storage interface -------------------------------------------------------
+    def _enqueue(self, job_id, payload):
+        raise NotImplementedError
+
+    def _claim(self, timeout):
+        """
+        (job_id, payload, lease, claim) of the next job to run, or None on
+        timeout; claim identifies this run of the job (None: not needed)
+        """
+        raise NotImplementedError
+
+    def _finish(self, job_id, status, result=None, error=None, claim=None):
+        """Record the outcome of the run identified by claim"""
+        raise NotImplementedError
+
+    def _mark_cancelled(self, job_id):
+        """Record a cancellation request; True when the job was still running"""
+        raise NotImplementedError
+
+    def get(self, job_id):
+        """Return the job record (dict) or None when unknown/expired"""
+        raise NotImplementedError
+
+    def depth(self):
+        """Number of jobs waiting for a worker"""
+        raise NotImplementedError
+
+
+# -----------------------------------------------------------------------------
+# In-Process Backend
+# -----------------------------------------------------------------------------
+class FairQueue:
+    """
+    Bounded queue with one FIFO per subject, served by weighted round-robin
+
+    Each subject has a pass value that advances by 1/weight per job it
+    gets (stride scheduling), and the subject with the lowest pass goes
+    next: a subject with weight 3 gets three jobs for every one of a
+    subject with weight 1. Subjects joining the queue start at the lowest
+    pass among those waiting, so past usage is not held against them.
+    """
+
+    def __init__(self, max_depth, weight=lambda subject: 1.0):
+        self.max_depth = max_depth
+        self.weight = weight
+        self._queues = {}  # subject -> deque of items
+        self._passes = {}  # subject -> pass value
+        self._size = 0
+        self._ready = threading.Condition()
+
+    def put_nowait(self, subject, item):
+        """Raises queue.Full at max_depth waiting items"""
+        with self._ready:
+            if self._size >= self.max_depth:
+                raise queue.Full
+            if subject not in self._queues:
+                self._queues[subject] = deque()
+                self._passes[subject] = min(self._passes.values(), default=0.0)
+            self._queues[subject].append(item)
+            self._size += 1
+            self._ready.notify()
+
+    def get(self, timeout, admit=lambda subject: (True, None)):
+        """
+        Next item by weighted round-robin
+
+        Parameters:
+        - timeout (float): Seconds to wait for an admissible item
+        - admit (callable): subject -> (allowed, lease); subjects that are
+          not allowed (at their concurrency quota) are skipped
+
+        Returns:
+        - (subject, item, lease), or None on timeout
+        """
+        deadline = time.monotonic() + timeout
+        with self._ready:
+            while True:
+                for subject in sorted(self._queues, key=self._passes.__getitem__):
+                    allowed, lease = admit(subject)
+                    if not allowed:
+                        continue
+                    item = self._queues[subject].popleft()
+                    self._size -= 1
+                    self._passes[subject] += 1.0 / self.weight(subject)
+                    if not self._queues[subject]:
+                        del self._queues[subject], self._passes[subject]
+                    return subject, item, lease
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return None
+                self._ready.wait(remaining)
+
+    def notify(self):
+        """Wake waiting workers (a run slot was released)"""
+        with self._ready:
+            self._ready.notify_all()
+
+    def qsize(self):
+        with self._ready:
+            return self._size
+
+
+class InProcessJobQueue(JobQueue):
+    """
+    Memory-backed queue for single-process deployments
+
+    Finished jobs are kept for `retention` seconds so clients can poll
+    for the result, then dropped to bound memory usage.
+    """
+
+    def __init__(self, handler, max_workers=DEFAULT_WORKERS,
+                 max_depth=DEFAULT_QUEUE_DEPTH, retention=DEFAULT_JOB_RETENTION, quotas=None):
+        super().__init__(handler, max_workers, max_depth, quotas)
+        self.retention = retention
+        self._queue = FairQueue(max_depth, weight=self._weight)
+        self._jobs = OrderedDict()  # job_id -> record (oldest first)
+        self._lock = threading.Lock()
+
+    def _enqueue(self, job_id, payload):
+        record = {
+            "id": job_id,
+            "status": "queued",
+            "created_at": time.time(),
+            "started_at": None,
+            "finished_at": None,
+            "result": None,
+            "error": None,
+        }
+        with self._lock:
+            self._purge_expired()
+            self._jobs[job_id] = record
+        try:
+            self._queue.put_nowait(payload.get("subject", ANONYMOUS), (job_id, payload))
+        except queue.Full:
+            with self._lock:
+                self._jobs.pop(job_id, None)
+            raise QueueFullError()
+
+    def _claim(self, timeout):
+        claimed = self._queue.get(timeout, admit=self._admit)
+        if claimed is None:
+            return None
+        _, (job_id, payload), lease = claimed
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is not None and record["status"] == "cancelled":
+                skipped = True  # Cancelled while queued: never started
+            else:
+                skipped = False
+                if record is not None:
+                    record["status"] = "running"
+                    record["started_at"] = time.time()
+        if skipped:
+            if lease is not None:
+                self._quota_manager().release(lease)
+            return None
+        return job_id, payload, lease, None
+
+    def _finish(self, job_id, status, result=None, error=None, claim=None):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is not None:
+                record.update(
+                    status=status, result=result, error=error, finished_at=time.time()
+                )
+        self._queue.notify()  # The subject's run slot frees up next
+
+    def _mark_cancelled(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            if record is None:
+                return False
+            if record["status"] == "queued":
+                record.update(status="cancelled", finished_at=time.time())
+            return record["status"] == "running"
+
+    def get(self, job_id):
+        with self._lock:
+            record = self._jobs.get(job_id)
+            return dict(record) if record else None
+
+    def depth(self):
+        return self._queue.qsize()
+
+    def _purge_expired(self):
+        # Caller holds self._lock
+        cutoff = time.time() - self.retention
+        expired = [
+            job_id
+            for job_id, record in self._jobs.items()
+            if record["finished_at"] and record["finished_at"] < cutoff
+        ]
+        for job_id in expired:
+            del self._jobs[job_id]
+
+
+# -----------------------------------------------------------------------------
+# Shared SQLite Backend
+# -----------------------------------------------------------------------------
+class SQLiteJobQueue(JobQueue):
+    """
+    SQLite-backed queue shared by every process pointing at the same file
+
+    Any process can accept a submission, any worker in any process can
+    claim it, and status polling works regardless of which process the
+    client hits. Claims use BEGIN IMMEDIATE so two workers never run
+    the same job. Fair-share pass values live in job_shares, so the
+    weighted round-robin spans every process.
+    """
+
+    def __init__(self, handler, path, max_workers=DEFAULT_WORKERS,
+                 max_depth=DEFAULT_QUEUE_DEPTH, retention=DEFAULT_JOB_RETENTION,
+                 poll_interval=0.5, quotas=None, lease=DEFAULT_JOB_LEASE,
+                 max_attempts=DEFAULT_MAX_ATTEMPTS):
+        super().__init__(handler, max_workers, max_depth, quotas)
+        self.path = path
+        self.retention = retention
+        self.poll_interval = poll_interval
+        self.lease = lease  # Running jobs without a heartbeat this long are requeued
+        self.max_attempts = max_attempts  # Lost runs before a job is failed
+        self._local = threading.local()  # One connection per thread
+        self._pid = os.getpid()
+        with self._connect() as conn:
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS jobs (
+                    id TEXT PRIMARY KEY,
+                    status TEXT NOT NULL,
+                    payload TEXT NOT NULL,
+                    subject TEXT NOT NULL DEFAULT 'anonymous',
+                    result TEXT,
+                    error TEXT,
+                    created_at REAL NOT NULL,
+                    started_at REAL,
+                    finished_at REAL
+                )"""
+            )
+            columns = {row[1] for row in conn.execute("PRAGMA table_info(jobs)")}
+            if "subject" not in columns:  # Tables created before fair scheduling
+                conn.execute("ALTER TABLE jobs ADD COLUMN subject TEXT NOT NULL DEFAULT 'anonymous'")
+            if "heartbeat_at" not in columns:  # Tables created before leases
+                conn.execute("ALTER TABLE jobs ADD COLUMN heartbeat_at REAL")
+                conn.execute("ALTER TABLE jobs ADD COLUMN attempts INTEGER NOT NULL DEFAULT 0")
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_status ON jobs (status, created_at)"
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS jobs_subject ON jobs (status, subject, created_at)"
+            )
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS job_shares (
+                    subject TEXT PRIMARY KEY,
+                    pass REAL NOT NULL
+                )"""
+            )
+
+    def _connect(self):
+        if os.getpid() != self._pid:  # Forked worker: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            self._local.conn = conn
+        return conn
+
+    def _enqueue(self, job_id, payload):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            (depth,) = conn.execute(
+                "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+            ).fetchone()
+            if depth >= self.max_depth:
+                raise QueueFullError()
+            conn.execute(
+                "DELETE FROM jobs WHERE finished_at IS NOT NULL AND finished_at < ?",
+                (time.time() - self.retention,),
+            )
+            conn.execute(
+                "INSERT INTO jobs (id, status, payload, subject, created_at) "
+                "VALUES (?, 'queued', ?, ?, ?)",
+                (job_id, json.dumps(payload), payload.get("subject", ANONYMOUS), time.time()),
+            )
+            # New subjects join at the lowest pass among those waiting
+            conn.execute(
+                "INSERT OR IGNORE INTO job_shares (subject, pass) "
+                "SELECT ?, COALESCE(MIN(pass), 0) FROM job_shares",
+                (payload.get("subject", ANONYMOUS),),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def _claim(self, timeout):
+        conn = self._connect()
+        deadline = time.time() + timeout
+        while True:
+            conn.execute("BEGIN IMMEDIATE")
+            claimed = lease = None
+            try:
+                self._requeue_stale(conn)
+                claimed, lease = self._claim_fair(conn)
+                conn.execute("COMMIT")
+            except BaseException:
+                conn.execute("ROLLBACK")
+                if lease is not None:
+                    self._quota_manager().release(lease)
+                raise
+            if claimed is not None:
+                return claimed
+            if time.time() >= deadline:
+                return None
+            time.sleep(self.poll_interval)
+
+    def _requeue_stale(self, conn):
+        # Caller holds the write transaction. Jobs of a crashed or recycled
+        # process stop heartbeating: run them again, or fail them after
+        # max_attempts lost runs
+        now = time.time()
+        stale = "status IN ('running', 'cancelling') AND COALESCE(heartbeat_at, started_at) < ?"
+        cutoff = now - self.lease
+        conn.execute(
+            f"UPDATE jobs SET status = 'cancelled', finished_at = ? "
+            f"WHERE {stale} AND status = 'cancelling'",
+            (now, cutoff),
+        )
+        conn.execute(
+            f"UPDATE jobs SET status = 'failed', error = 'Worker lost too many times', "
+            f"finished_at = ? WHERE {stale} AND attempts >= ?",
+            (now, cutoff, self.max_attempts),
+        )
+        requeued = conn.execute(
+            f"UPDATE jobs SET status = 'queued', started_at = NULL, heartbeat_at = NULL "
+            f"WHERE {stale}",
+            (cutoff,),
+        ).rowcount
+        if requeued:
+            print(f"Requeued {requeued} research job(s) of a lost worker")  # Server-side logging
+
+    def _start_heartbeat(self):
+        thread = threading.Thread(target=self._heartbeat_loop, name="research-heartbeat", daemon=True)
+        thread.start()
+
+    def _heartbeat_loop(self):
+        while not self._stopping.wait(max(self.lease / 4, 0.05)):
+            running = list(self._running)
+            if not running:
+                continue
+            try:
+                self._connect().execute(
+                    f"UPDATE jobs SET heartbeat_at = ? WHERE id IN ({', '.join('?' * len(running))})",
+                    [time.time()] + running,
+                )
+            except Exception as e:
+                print("Research job heartbeat failed:", e)  # Server-side logging
+
+    def _claim_fair(self, conn):
+        # Caller holds the write transaction; same ordering as FairQueue
+        subjects = conn.execute(
+            "SELECT q.subject, s.pass FROM "
+            "(SELECT DISTINCT subject FROM jobs WHERE status = 'queued') q "
+            "LEFT JOIN job_shares s ON s.subject = q.subject"
+        ).fetchall()
+        base = min((value for _, value in subjects if value is not None), default=0.0)
+        claimed = lease = None
+        # Jobs queued before fair scheduling have no share row: treat as newcomers
+        for subject, value in sorted(subjects, key=lambda r: base if r[1] is None else r[1]):
+            allowed, lease = self._admit(subject)
+            if not allowed:
+                continue
+            try:
+                row = conn.execute(
+                    "SELECT id, payload, attempts FROM jobs WHERE status = 'queued' "
+                    "AND subject = ? ORDER BY created_at LIMIT 1",
+                    (subject,),
+                ).fetchone()
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', started_at = ?, heartbeat_at = ?, "
+                    "attempts = attempts + 1 WHERE id = ?",
+                    (time.time(), time.time(), row[0]),
+                )
+                conn.execute(
+                    "INSERT OR REPLACE INTO job_shares (subject, pass) VALUES (?, ?)",
+                    (subject, (base if value is None else value) + 1.0 / self._weight(subject)),
+                )
+            except BaseException:
+                if lease is not None:
+                    self._quota_manager().release(lease)  # The caller never sees it
+                raise
+            # The attempt number identifies this run of the job (see _finish)
+            claimed = (row[0], json.loads(row[1]), lease, row[2] + 1)
+            break
+        # Subjects with nothing queued rejoin at the lowest pass later on
+        conn.execute(
+            "DELETE FROM job_shares WHERE subject NOT IN "
+            "(SELECT subject FROM jobs WHERE status = 'queued')"
+        )
+        return claimed, lease
+
+    def _finish(self, job_id, status, result=None, error=None, claim=None):
+        # Only the current run may record an outcome: a worker presumed lost
+        # must not overwrite a job that was requeued and claimed again
+        updated = self._connect().execute(
+            "UPDATE jobs SET status = ?, result = ?, error = ?, finished_at = ? "
+            "WHERE id = ? AND status IN ('running', 'cancelling') "
+            "AND (? IS NULL OR attempts = ?)",
+            (status, json.dumps(result), error, time.time(), job_id, claim, claim),
+        ).rowcount
+        if not updated:
+            print(f"Research job {job_id} was requeued; dropping the outcome of a stale run")  # Server-side logging
+
+    def _mark_cancelled(self, job_id):
+        conn = self._connect()
+        conn.execute(
+            "UPDATE jobs SET status = 'cancelled', finished_at = ? WHERE id = ? AND status = 'queued'",
+            (time.time(), job_id),
+        )
+        running = conn.execute(
+            "UPDATE jobs SET status = 'cancelling' WHERE id = ? AND status = 'running'", (job_id,)
+        ).rowcount
+        return running > 0
+
+    def _cancel_event(self, job_id):
+        return _PolledCancel(self, job_id, self.poll_interval * 4)
+
+    def _cancel_requested(self, job_id):
+        row = self._connect().execute("SELECT status FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        return row is not None and row[0] == "cancelling"
+
+    def get(self, job_id):
+        row = self._connect().execute(
+            "SELECT id, status, created_at, started_at, finished_at, result, error "
+            "FROM jobs WHERE id = ?",
+            (job_id,),
+        ).fetchone()
+        if row is None:
+            return None
+        return {
+            "id": row[0],
+            "status": row[1],
+            "created_at": row[2],
+            "started_at": row[3],
+            "finished_at": row[4],
+            "result": json.loads(row[5]) if row[5] else None,
+            "error": row[6],
+        }
+
+    def depth(self):
+        (depth,) = self._connect().execute(
+            "SELECT COUNT(*) FROM jobs WHERE status = 'queued'"
+        ).fetchone()
+        return depth
+
+
+class _PolledCancel:
+    """
+    Cancellation event that also sees requests made by other processes
+
+    is_set() is checked at every agent step; the job row is read at most
+    once per `interval` seconds.
+    """
+
+    def __init__(self, queue, job_id, interval):
+        self.queue = queue
+        self.job_id = job_id
+        self.interval = interval
+        self._event = threading.Event()
+        self._checked = time.monotonic()
+
+    def set(self):
+        self._event.set()
+
+    def is_set(self):
+        if not self._event.is_set() and time.monotonic() - self._checked >= self.interval:
+            self._checked = time.monotonic()
+            if self.queue._cancel_requested(self.job_id):
+                self._event.set()
+        return self._event.is_set()
+
+
+# -----------------------------------------------------------------------------
+# Factory
+# -----------------------------------------------------------------------------
+def create_job_queue(handler):
+    """
+    Build the queue backend selected by the environment
+
+    Environment:
+    - RESEARCH_QUEUE_BACKEND: "memory" (default) or "sqlite"
+    - RESEARCH_QUEUE_DB: SQLite file path (default: data/jobs.sqlite3)
+    - RESEARCH_WORKERS / RESEARCH_QUEUE_DEPTH: Pool size and depth limit
+    - RESEARCH_JOB_LEASE / RESEARCH_JOB_MAX_ATTEMPTS: Requeueing of jobs
+      whose worker process died (sqlite backend)
+
+    Run slots and fair-share weights come from utils.quotas.
+    """
+    from utils.quotas import get_quota_manager
+
+    backend = os.environ.get("RESEARCH_QUEUE_BACKEND", "memory").lower()
+    if backend == "sqlite":
+        path = os.environ.get("RESEARCH_QUEUE_DB", os.path.join("data", "jobs.sqlite3"))
+        return SQLiteJobQueue(handler, path, quotas=get_quota_manager)
+    if backend == "memory":
+        return InProcessJobQueue(handler, quotas=get_quota_manager)
+    raise ValueError(f"Unknown RESEARCH_QUEUE_BACKEND: {backend}")
+
+
+"""
+Job Lifecycle:
+
+queued -> running -> succeeded | failed
+running -> queued (shared backend: no heartbeat for RESEARCH_JOB_LEASE
+           seconds, e.g. a crashed or recycled worker process; failed
+           after RESEARCH_JOB_MAX_ATTEMPTS lost runs; a presumed-lost run
+           that still finishes cannot overwrite the requeued job)
+queued -> cancelled (DELETE before a worker claimed it)
+running -> [cancelling ->] cancelled (stops at the next agent step;
+           "cancelling" is the shared backend's cross-process request)
+
+Operational Notes:
+- Worker threads start on the first submission, never at import time,
+  so pre-forking servers do not inherit half-initialised threads
+- A failing backend (e.g. "database is locked") never kills a worker
+  thread: claims back off up to MAX_BACKOFF seconds and are retried
+- The in-process backend loses queued jobs on restart; use the SQLite
+  backend when several worker processes serve the same clients
+- Queue depth counts only waiting jobs; running jobs are bounded by
+  RESEARCH_WORKERS per process and QUOTA_CONCURRENCY per subject
+- A job whose subject is at its concurrency quota stays queued while
+  other subjects' jobs run; it is claimed once one of its runs finishes
+"""
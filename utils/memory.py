@@ -0,0 +1,389 @@
+"""
+Conversation Memory
+
+Session-scoped chat history for follow-up questions, kept within a fixed
+token budget:
+
+1. Recent turns are replayed verbatim as chat_history messages
+2. Older turns are folded into a running summary (extractive by default,
+   optionally written by the LLM)
+3. Tool results from earlier turns are offered as context, so follow-ups
+   can be answered without repeating the same searches
+4. Pluggable session stores with eviction: in-process LRU or SQLite
+"""
+
+import json  # SQLite session serialisation
+import os  # Environment configuration and fork detection
+import re  # Sentence extraction
+import sqlite3  # Shared session store
+import threading  # Store locking and per-thread connections
+import time  # Session timestamps and expiry
+
+from langchain_core.callbacks import BaseCallbackHandler  # Tool result capture
+from langchain_core.messages import AIMessage, HumanMessage, SystemMessage
+
+from utils.cache import TTLCache  # In-process LRU store
+from utils.tokens import estimate_tokens, truncate_tokens  # Budget arithmetic
+
+
+def first_sentence(text, budget=40):
+    match = re.search(r"(.+?[.!?])(\s|$)", " ".join(text.split()))
+    return truncate_tokens(match.group(1) if match else text, budget)
+
+
+# -----------------------------------------------------------------------------
+# Session Stores
+# -----------------------------------------------------------------------------
+class InMemorySessionStore:
+    """
+    Per-process LRU of sessions
+
+    Parameters:
+    - max_sessions (int): Least recently used sessions beyond this are evicted
+    - ttl (float): Seconds of inactivity before a session expires
+    """
+
+    def __init__(self, max_sessions=1000, ttl=86400):
+        self._cache = TTLCache(max_entries=max_sessions, ttl=ttl)
+        self._lock = threading.Lock()  # Serialises update()
+
+    def get(self, session_id):
+        return self._cache.get(session_id)
+
+    def put(self, session_id, data):
+        self._cache.set(session_id, data)
+
+    def update(self, session_id, change):
+        """Read-modify-write of one session (change: data or None -> data)"""
+        with self._lock:
+            data = change(self._cache.get(session_id))
+            self._cache.set(session_id, data)
+            return data
+
+    def delete(self, session_id):
+        self._cache.pop(session_id)
+
+
+class SQLiteSessionStore:
+    """
+    Sessions shared by every worker process using the same file
+
+    Expired sessions are deleted on write, and the least recently
+    updated ones are removed once max_sessions is exceeded.
+    """
+
+    def __init__(self, path, max_sessions=10000, ttl=86400):
+        self.path = os.path.abspath(path)
+        self.max_sessions = max_sessions
+        self.ttl = ttl
+        self._local = threading.local()  # One connection per thread
+        self._pid = os.getpid()
+        self._connect().execute(
+            """CREATE TABLE IF NOT EXISTS sessions (
+                id TEXT PRIMARY KEY,
+                data TEXT NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        self._connect().execute(
+            "CREATE INDEX IF NOT EXISTS sessions_updated ON sessions (updated_at)"
+        )
+
+    def _connect(self):
+        if os.getpid() != self._pid:  # Forked worker: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            self._local.conn = conn
+        return conn
+
+    def get(self, session_id):
+        row = self._connect().execute(
+            "SELECT data FROM sessions WHERE id = ? AND updated_at >= ?",
+            (session_id, time.time() - self.ttl),
+        ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def put(self, session_id, data):
+        self.update(session_id, lambda current: data)
+
+    def update(self, session_id, change):
+        """
+        Read-modify-write of one session in a single write transaction,
+        so concurrent turns from several worker processes are never lost
+
+        Parameters:
+        - change (callable): Current data (None when missing or expired)
+          -> new data
+        """
+        conn = self._connect()
+        now = time.time()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT data FROM sessions WHERE id = ? AND updated_at >= ?",
+                (session_id, now - self.ttl),
+            ).fetchone()
+            data = change(json.loads(row[0]) if row else None)
+            conn.execute(
+                "INSERT INTO sessions (id, data, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(id) DO UPDATE SET data = excluded.data, updated_at = excluded.updated_at",
+                (session_id, json.dumps(data), now),
+            )
+            conn.execute("DELETE FROM sessions WHERE updated_at < ?", (now - self.ttl,))
+            conn.execute(
+                "DELETE FROM sessions WHERE id IN (SELECT id FROM sessions "
+                "ORDER BY updated_at DESC LIMIT -1 OFFSET ?)",
+                (self.max_sessions,),
+            )
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+        return data
+
+    def delete(self, session_id):
+        self._connect().execute("DELETE FROM sessions WHERE id = ?", (session_id,))
+
+
+# -----------------------------------------------------------------------------
+# Summarizers
+# -----------------------------------------------------------------------------
+def extractive_summarizer(summary, turn):
+    """Fold a turn into the running summary as one line (no LLM call)"""
+    line = f"- {turn['query']} -> {turn['topic']}: {first_sentence(turn['answer'])}"
+    return f"{summary}\n{line}" if summary else line
+
+
+def llm_summarizer(llm):
+    """Summarizer that asks the chat model to merge a turn into the summary"""
+
+    def summarize(summary, turn):
+        prompt = (
+            "Update the running summary of a research conversation with the "
+            "new exchange. Keep names, numbers and conclusions; at most 5 "
+            f"sentences.\n\nSummary so far:\n{summary or '(empty)'}\n\n"
+            f"Question: {turn['query']}\nAnswer: {turn['answer']}"
+        )
+        return llm.invoke(prompt).content.strip()
+
+    return summarize
+
+
+# -----------------------------------------------------------------------------
+# Conversation Memory
+# -----------------------------------------------------------------------------
+class ToolResultCollector(BaseCallbackHandler):
+    """Callback that records (tool, input, output) for every tool call of a run"""
+
+    def __init__(self):
+        self.results = []
+        self._pending = {}  # run_id -> (tool, input)
+        self._lock = threading.Lock()
+
+    def on_tool_start(self, serialized, input_str, run_id=None, **kwargs):
+        with self._lock:
+            self._pending[run_id] = ((serialized or {}).get("name", "tool"), input_str)
+
+    def on_tool_end(self, output, run_id=None, **kwargs):
+        with self._lock:
+            pending = self._pending.pop(run_id, None)
+            if pending is not None:
+                self.results.append(
+                    {"tool": pending[0], "input": pending[1], "output": str(output)}
+                )
+
+
+class ConversationMemory:
+    """
+    Token-budgeted chat history per session
+
+    Parameters:
+    - store: Session store (InMemorySessionStore or SQLiteSessionStore)
+    - token_budget (int): Upper bound for the replayed history
+    - summarizer (callable): (summary, turn) -> summary
+    - answer_tokens (int): Per-turn answer length kept verbatim
+    - tool_tokens (int): Per tool result length kept for reuse
+    - skip_tools (tuple): Tools whose output is not worth replaying
+    """
+
+    def __init__(self, store, token_budget=1500, summarizer=extractive_summarizer,
+                 answer_tokens=300, tool_tokens=250, skip_tools=("save_text_to_file",)):
+        self.store = store
+        self.token_budget = token_budget
+        self.summarizer = summarizer
+        self.answer_tokens = answer_tokens
+        self.tool_tokens = tool_tokens
+        self.skip_tools = set(skip_tools)
+
+    def history(self, session_id):
+        """
+        chat_history messages for the next turn of a session
+
+        Returns:
+        - list: Context message (summary + reusable tool results) followed
+          by the recent turns as Human/AI message pairs
+        """
+        data = self.store.get(session_id)
+        if not data:
+            return []
+
+        messages = []
+        context = []
+        if data["summary"]:
+            context.append(f"Earlier in this conversation:\n{data['summary']}")
+        if data["tools"]:
+            lines = [f"- {t['tool']}({t['input']!r}): {t['output']}" for t in data["tools"]]
+            context.append(
+                "Tool results already gathered in this conversation "
+                "(reuse them instead of repeating the same calls):\n" + "\n".join(lines)
+            )
+        if context:
+            messages.append(SystemMessage(content="\n\n".join(context)))
+        for turn in data["turns"]:
+            messages.append(HumanMessage(content=turn["query"]))
+            messages.append(AIMessage(content=f"{turn['topic']}\n\n{turn['answer']}"))
+        return messages
+
+    def record(self, session_id, query, response, tool_results=()):
+        """Append a finished turn and compact the session to the token budget"""
+        turn = {
+            "query": query,
+            "topic": response.topic,
+            "answer": truncate_tokens(response.summary, self.answer_tokens),
+        }
+        def change(data):
+            data = data or {"summary": "", "turns": [], "tools": []}
+            data["turns"].append(turn)
+
+            # Newest result wins for repeated calls with the same input
+            tools = {(t["tool"], t["input"]): t for t in data["tools"]}
+            for result in tool_results:
+                if result["tool"] in self.skip_tools:
+                    continue
+                tools.pop((result["tool"], result["input"]), None)
+                tools[(result["tool"], result["input"])] = dict(
+                    result, output=truncate_tokens(result["output"], self.tool_tokens)
+                )
+            data["tools"] = list(tools.values())
+
+            self._compact(data)
+            return data
+
+        # Atomic in the store: the SQLite store holds its write lock, so
+        # turns recorded by other worker processes are never overwritten
+        self.store.update(session_id, change)
+
+    def tokens(self, data):
+        """Approximate size of the history a session would replay"""
+        return (
+            estimate_tokens(data["summary"])
+            + sum(estimate_tokens(t["query"] + t["topic"] + t["answer"]) for t in data["turns"])
+            + sum(estimate_tokens(t["tool"] + t["input"] + t["output"]) for t in data["tools"])
+        )
+
+    def _compact(self, data):
+        # 1. Fold the oldest turns into the summary (the newest stays verbatim)
+        while self.tokens(data) > self.token_budget and len(data["turns"]) > 1:
+            data["summary"] = self.summarizer(data["summary"], data["turns"].pop(0))
+            data["summary"] = self._trim_summary(data["summary"])
+        # 2. Drop the oldest tool results
+        while self.tokens(data) > self.token_budget and data["tools"]:
+            data["tools"].pop(0)
+
+    def _trim_summary(self, summary):
+        # Keep the newest summary lines within a quarter of the budget
+        budget = self.token_budget // 4
+        lines = summary.splitlines()
+        while len(lines) > 1 and estimate_tokens("\n".join(lines)) > budget:
+            lines.pop(0)
+        return truncate_tokens("\n".join(lines), budget)
+
+    def clear(self, session_id):
+        self.store.delete(session_id)
+
+
+def create_conversation_memory():
+    """
+    Build conversation memory from the environment
+
+    Environment:
+    - MEMORY_BACKEND: "memory" (default), "sqlite" or "off"
+    - MEMORY_DB: SQLite file path (default: data/sessions.sqlite3)
+    - MEMORY_TOKEN_BUDGET: Replayed history size in tokens (default 1500)
+    - MEMORY_MAX_SESSIONS / MEMORY_TTL: Eviction (1000 sessions, 86400 s)
+    - MEMORY_SUMMARIZER: "extractive" (default) or "llm"
+
+    Returns:
+    - ConversationMemory, or None when disabled
+    """
+    backend = os.environ.get("MEMORY_BACKEND", "memory").lower()
+    if backend == "off":
+        return None
+    max_sessions = int(os.environ.get("MEMORY_MAX_SESSIONS", "1000"))
+    ttl = float(os.environ.get("MEMORY_TTL", "86400"))
+    if backend == "sqlite":
+        store = SQLiteSessionStore(
+            os.environ.get("MEMORY_DB", os.path.join("data", "sessions.sqlite3")),
+            max_sessions=max_sessions,
+            ttl=ttl,
+        )
+    elif backend == "memory":
+        store = InMemorySessionStore(max_sessions=max_sessions, ttl=ttl)
+    else:
+        raise ValueError(f"Unknown MEMORY_BACKEND: {backend}")
+
+    summarizer = extractive_summarizer
+    if os.environ.get("MEMORY_SUMMARIZER", "extractive").lower() == "llm":
+        from utils.agent_setup import build_llm
+
+        summarizer = llm_summarizer(build_llm())
+    return ConversationMemory(
+        store,
+        token_budget=int(os.environ.get("MEMORY_TOKEN_BUDGET", "1500")),
+        summarizer=summarizer,
+    )
+
+
+def session_key(session_id=None, user=None):
+    """
+    Memory key for a request (None: stateless)
+
+    Only requests that name a conversation are stateful; authenticated
+    users get their own namespace, so a client-chosen session id can
+    never read another user's conversation.
+    """
+    if not session_id:
+        return None
+    return f"user:{user}:{session_id}" if user else f"session:{session_id}"
+
+
+_lock = threading.Lock()
+_memory = {}
+
+
+def get_conversation_memory():
+    """Process-wide conversation memory, built on first use (None when off)"""
+    if "default" not in _memory:
+        with _lock:
+            if "default" not in _memory:
+                _memory["default"] = create_conversation_memory()
+    return _memory["default"]
+
+
+"""
+Session Keys (session_key):
+- Authenticated requests: "user:<jwt sub>:<session_id>", so a user can
+  keep parallel conversations
+- Anonymous requests: "session:<session_id>" from the client
+- No session_id: the request is stateless, exactly as before (a user's
+  identity alone never opens a conversation)
+- The web UI starts a new session_id for every new topic and reuses it
+  only for questions marked as follow-ups
+"""
@@ -0,0 +1,379 @@
+"""
+Metrics and Latency Instrumentation
+
+Dependency-free counters and histograms rendered in the Prometheus text
+exposition format, plus the hooks that feed them:
+
+1. Stage timers around each step of the research pipeline
+2. A LangChain callback handler for LLM tokens/latency and tool calls
+3. Collectors that snapshot cache, queue and connection pool state at
+   scrape time
+"""
+
+import bisect  # Histogram bucket lookup
+import threading  # Registry locking
+import time  # Stage timing
+from contextlib import contextmanager  # Stage timer helper
+from contextvars import ContextVar  # Request-scoped timings for deep callers
+
+from langchain_core.callbacks import BaseCallbackHandler  # LangChain event hooks
+
+# Latency buckets in seconds (sub-millisecond cache hits up to slow agent runs)
+DEFAULT_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+
+
+def _label_key(labels):
+    return tuple(sorted(labels.items()))
+
+
+def _escape(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _format_labels(pairs):
+    if not pairs:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in pairs) + "}"
+
+
+class Counter:
+    """Monotonically increasing value per label set"""
+
+    kind = "counter"
+
+    def __init__(self, name, help_text):
+        self.name = name
+        self.help = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        with self._lock:
+            return self._values.get(_label_key(labels), 0)
+
+    def samples(self):
+        with self._lock:
+            return [(self.name, key, value) for key, value in self._values.items()]
+
+
+class Histogram:
+    """Cumulative bucketed distribution per label set"""
+
+    kind = "histogram"
+
+    def __init__(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._series = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * len(self.buckets) + [0.0, 0])
+            if index < len(self.buckets):
+                series[index] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        with self._lock:
+            series = self._series.get(_label_key(labels))
+            return series[-1] if series else 0
+
+    def samples(self):
+        result = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series):
+                    cumulative += count
+                    result.append((f"{self.name}_bucket", key + (("le", repr(float(bound))),), cumulative))
+                result.append((f"{self.name}_bucket", key + (("le", "+Inf"),), series[-1]))
+                result.append((f"{self.name}_sum", key, series[-2]))
+                result.append((f"{self.name}_count", key, series[-1]))
+        return result
+
+
+class Registry:
+    """
+    Named metric store
+
+    Collectors are callables run at scrape time that yield
+    (name, kind, help, labels, value) tuples for state owned elsewhere
+    (cache counters, queue depth, pool saturation).
+    """
+
+    def __init__(self):
+        self._metrics = {}
+        self._collectors = []
+        self._lock = threading.Lock()
+
+    def counter(self, name, help_text):
+        return self._register(name, lambda: Counter(name, help_text))
+
+    def histogram(self, name, help_text, buckets=DEFAULT_BUCKETS):
+        return self._register(name, lambda: Histogram(name, help_text, buckets))
+
+    def _register(self, name, factory):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = factory()
+            return metric
+
+    def register_collector(self, collector):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self):
+        """Prometheus text exposition format (version 0.0.4)"""
+        lines = []
+        with self._lock:
+            metrics = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for metric in metrics:
+            lines.append(f"# HELP {metric.name} {metric.help}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, key, value in metric.samples():
+                lines.append(f"{name}{_format_labels(key)} {value}")
+
+        collected = {}
+        for collector in collectors:
+            try:
+                for name, kind, help_text, labels, value in collector():
+                    entry = collected.setdefault(name, (kind, help_text, []))
+                    entry[2].append((_label_key(labels), value))
+            except Exception as e:
+                print("Metrics collector failed:", e)  # Never break the scrape
+        for name, (kind, help_text, samples) in collected.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for key, value in samples:
+                lines.append(f"{name}{_format_labels(key)} {value}")
+        return "\n".join(lines) + "\n"
+
+
+registry = Registry()  # Process-wide default registry
+
+# -----------------------------------------------------------------------------
+# Research Pipeline Metrics
+# -----------------------------------------------------------------------------
+RESEARCH_RUNS = registry.counter(
+    "research_runs_total", "Research pipeline runs by outcome"
+)
+AGENT_RUNS_STOPPED = registry.counter(
+    "agent_runs_stopped_total", "Agent runs killed or truncated by a budget (reason, outcome)"
+)
+RESEARCH_SECONDS = registry.histogram(
+    "research_run_seconds", "End-to-end research pipeline latency"
+)
+STAGE_SECONDS = registry.histogram(
+    "research_stage_seconds", "Latency of each research pipeline stage"
+)
+STAGE_ERRORS = registry.counter(
+    "research_stage_errors_total", "Pipeline failures by stage"
+)
+LLM_CALLS = registry.counter("llm_calls_total", "LLM calls by outcome")
+LLM_SECONDS = registry.histogram("llm_call_seconds", "LLM call latency")
+LLM_TOKENS = registry.counter("llm_tokens_total", "LLM tokens by direction (in/out)")
+TOOL_CALLS = registry.counter("tool_calls_total", "Agent tool calls by tool and outcome")
+TOOL_SECONDS = registry.histogram("tool_call_seconds", "Agent tool call latency")
+RETRIEVAL_SECONDS = registry.histogram(
+    "retrieval_source_seconds", "Evidence retrieval latency per source"
+)
+RETRIEVAL_ERRORS = registry.counter(
+    "retrieval_source_errors_total", "Evidence sources that failed or timed out (reason)"
+)
+RETRIEVAL_PASSAGES = registry.counter(
+    "retrieval_passages_total", "Evidence passages by stage (fetched/unique/selected)"
+)
+ROUTING_DECISIONS = registry.counter(
+    "model_routing_decisions_total", "First model tier chosen per query (tier, label, method)"
+)
+ROUTING_ESCALATIONS = registry.counter(
+    "model_routing_escalations_total", "Runs retried on a stronger tier (source, target, cause)"
+)
+TIER_SECONDS = registry.histogram("model_tier_seconds", "Agent attempt latency per model tier")
+TIER_COST = registry.counter(
+    "model_tier_cost_usd_total", "Estimated model spend per tier in USD (reported tokens x price)"
+)
+STRUCTURED_OUTPUTS = registry.counter(
+    "structured_output_total", "Final answer parsing by outcome (valid/repaired/reasked/wasted)"
+)
+PROMPT_TOKENS = registry.counter(
+    "prompt_compaction_tokens_total", "Estimated compactable prompt tokens (stage=raw|sent)"
+)
+HTTP_REQUESTS = registry.counter("http_requests_total", "HTTP requests by endpoint and status")
+HTTP_SECONDS = registry.histogram("http_request_seconds", "HTTP request latency by endpoint")
+
+
+class RequestTimings:
+    """
+    Per-request timing breakdown
+
+    Stage durations feed the shared histograms and are kept so they can
+    be returned in the API response when the client asks for them.
+    """
+
+    def __init__(self):
+        self.stages = {}
+        self.llm_tokens_in = 0
+        self.llm_tokens_out = 0
+        self.llm_calls = 0
+        self.tool_calls = 0
+        self.compaction_raw = 0  # Estimated tokens before/after prompt compaction
+        self.compaction_sent = 0
+        self.attempts = []  # Model routing attempts (tier, latency, cost, outcome)
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def stage(self, name):
+        """Time a pipeline stage; failures are counted per stage"""
+        started = time.perf_counter()
+        try:
+            yield
+        except Exception:
+            STAGE_ERRORS.inc(stage=name)
+            raise
+        finally:
+            elapsed = time.perf_counter() - started
+            STAGE_SECONDS.observe(elapsed, stage=name)
+            with self._lock:
+                self.stages[name] = round(self.stages.get(name, 0.0) + elapsed, 4)
+
+    def add_compaction(self, raw, sent):
+        """Record one LLM call's compactable prompt size before and after"""
+        with self._lock:
+            self.compaction_raw += raw
+            self.compaction_sent += sent
+
+    def add_attempt(self, attempt):
+        """Record one agent attempt on a model tier"""
+        with self._lock:
+            self.attempts.append(attempt)
+
+    def as_dict(self):
+        with self._lock:
+            saved = self.compaction_raw - self.compaction_sent
+            routing = {"routing": list(self.attempts)} if self.attempts else {}
+            return {
+                "stages": dict(self.stages),
+                "llm_calls": self.llm_calls,
+                "llm_tokens_in": self.llm_tokens_in,
+                "llm_tokens_out": self.llm_tokens_out,
+                "tool_calls": self.tool_calls,
+                "prompt_tokens": {
+                    "before": self.llm_tokens_in + saved,
+                    "after": self.llm_tokens_in,
+                    "compacted": {"before": self.compaction_raw, "after": self.compaction_sent},
+                },
+                **routing,
+            }
+
+
+# Timings of the research run executing in this context (None outside a
+# run); lets code deep inside the agent report without extra arguments
+current_timings = ContextVar("current_timings", default=None)
+
+
+class MetricsCallbackHandler(BaseCallbackHandler):
+    """
+    LangChain callback feeding LLM/tool metrics
+
+    Parameters:
+    - timings (RequestTimings): Optional per-request accumulator
+    """
+
+    def __init__(self, timings=None):
+        self.timings = timings
+        self._started = {}  # run_id -> (start time, tool name)
+
+    def on_chat_model_start(self, serialized, messages, run_id=None, **kwargs):
+        self._started[run_id] = (time.perf_counter(), None)
+
+    def on_llm_start(self, serialized, prompts, run_id=None, **kwargs):
+        self._started[run_id] = (time.perf_counter(), None)
+
+    def on_llm_end(self, response, run_id=None, **kwargs):
+        started, _ = self._started.pop(run_id, (None, None))
+        if started is not None:
+            LLM_SECONDS.observe(time.perf_counter() - started)
+        LLM_CALLS.inc(status="ok")
+        tokens_in, tokens_out = token_usage(response)
+        LLM_TOKENS.inc(tokens_in, direction="in")
+        LLM_TOKENS.inc(tokens_out, direction="out")
+        if self.timings is not None:
+            with self.timings._lock:
+                self.timings.llm_calls += 1
+                self.timings.llm_tokens_in += tokens_in
+                self.timings.llm_tokens_out += tokens_out
+
+    def on_llm_error(self, error, run_id=None, **kwargs):
+        self._started.pop(run_id, None)
+        LLM_CALLS.inc(status="error")
+
+    def on_tool_start(self, serialized, input_str, run_id=None, **kwargs):
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._started[run_id] = (time.perf_counter(), name)
+
+    def on_tool_end(self, output, run_id=None, **kwargs):
+        self._tool_finished(run_id, "ok")
+
+    def on_tool_error(self, error, run_id=None, **kwargs):
+        self._tool_finished(run_id, "error")
+
+    def _tool_finished(self, run_id, status):
+        started, name = self._started.pop(run_id, (None, "tool"))
+        if started is not None:
+            TOOL_SECONDS.observe(time.perf_counter() - started, tool=name)
+        TOOL_CALLS.inc(tool=name, status=status)
+        if self.timings is not None:
+            with self.timings._lock:
+                self.timings.tool_calls += 1
+
+
+def token_usage(response):
+    """(input, output) token counts from an LLMResult, 0 when unreported"""
+    tokens_in = tokens_out = 0
+    for generations in response.generations:
+        for generation in generations:
+            usage = getattr(getattr(generation, "message", None), "usage_metadata", None)
+            if usage:
+                tokens_in += usage.get("input_tokens", 0)
+                tokens_out += usage.get("output_tokens", 0)
+    if not (tokens_in or tokens_out):
+        usage = (response.llm_output or {}).get("token_usage") or {}
+        tokens_in = usage.get("prompt_tokens", 0)
+        tokens_out = usage.get("completion_tokens", 0)
+    return tokens_in, tokens_out
+
+
+
+def _collect_pool_metrics():
+    # Outbound connection pools (only backends that have been used)
+    from utils.http_clients import pool_stats
+
+    for backend, stats in pool_stats().items():
+        labels = {"backend": backend}
+        yield ("http_pool_requests_total", "counter", "Outbound HTTP requests", labels, stats["requests"])
+        yield ("http_pool_errors_total", "counter", "Outbound HTTP failures", labels, stats["errors"])
+        yield ("http_pool_in_flight", "gauge", "Outbound requests in flight", labels, stats["in_flight"])
+        yield ("http_pool_saturation", "gauge", "In-flight requests / pool size", labels, stats["saturation"])
+
+
+registry.register_collector(_collect_pool_metrics)
+
+"""
+Exposition Notes:
+- GET /metrics returns registry.render() as text/plain; version=0.0.4
+- Metrics are per process; scrape every worker (or aggregate upstream)
+- Collectors must be cheap: they run on every scrape
+"""
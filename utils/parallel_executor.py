@@ -0,0 +1,150 @@
+"""
+Parallel Tool Execution for Tool-Calling Agents
+
+AgentExecutor runs every tool call of a step one after another, so a
+turn with several web searches costs several network round-trips. This
+executor dispatches the tool calls of one step to a thread pool and
+merges the observations back in the order the model requested them.
+
+It also enforces the run's RunBudget (utils.budget) at every step
+boundary: deadline, iteration and tool-call limits, and cancellation.
+"""
+
+import asyncio  # Deadline for async runs
+import contextvars  # Preserve LangChain run context in worker threads
+import os  # Environment configuration
+import threading  # Per-thread dispatch state
+from concurrent.futures import Future, ThreadPoolExecutor  # Tool fan-out
+from concurrent.futures import TimeoutError as FutureTimeout
+
+from langchain.agents import AgentExecutor  # Base agent loop
+from langchain_core.agents import AgentStep  # Refused / timed-out tool calls
+
+from utils.budget import TOOL_BUDGET_MESSAGE, current_budget  # Per-run limits
+
+DEFAULT_TOOL_CONCURRENCY = int(os.environ.get("AGENT_TOOL_CONCURRENCY", "4"))
+
+# Pool for the step currently being executed on this thread (if any)
+_dispatch = threading.local()
+
+
+class ParallelAgentExecutor(AgentExecutor):
+    """
+    AgentExecutor that runs independent tool calls of a step concurrently
+
+    Attributes:
+    - max_parallel_tools (int): Per-request cap on concurrent tool calls;
+      1 restores the stock sequential behaviour
+
+    The async path (ainvoke) already gathers tool calls concurrently in
+    AgentExecutor, so only the synchronous loop is overridden.
+    """
+
+    max_parallel_tools: int = DEFAULT_TOOL_CONCURRENCY
+
+    # Budget enforcement -------------------------------------------------------
+    def _should_continue(self, iterations, time_elapsed):
+        if not super()._should_continue(iterations, time_elapsed):
+            return False
+        budget = current_budget.get()
+        return budget is None or budget.should_continue(iterations)
+
+    async def _acall(self, inputs, run_manager=None):
+        budget = current_budget.get()
+        remaining = budget.remaining() if budget is not None else None
+        if remaining is None:
+            return await super()._acall(inputs, run_manager)
+        # Hard stop for async runs: an in-flight model or tool call is
+        # interrupted at the deadline instead of at the next step
+        # (wait_for, not asyncio.timeout: the image runs Python 3.10)
+        try:
+            return await asyncio.wait_for(super()._acall(inputs, run_manager), remaining)
+        except asyncio.TimeoutError:
+            budget.stop("deadline")
+            return {"output": ""}
+
+    def _refused(self, agent_action):
+        budget = current_budget.get()
+        if budget is None or budget.take_tool_call():
+            return None
+        return AgentStep(action=agent_action, observation=TOOL_BUDGET_MESSAGE)
+
+    async def _aperform_agent_action(self, name_to_tool_map, color_mapping, agent_action,
+                                     run_manager=None):
+        refused = self._refused(agent_action)
+        if refused is not None:
+            return refused
+        return await super()._aperform_agent_action(
+            name_to_tool_map, color_mapping, agent_action, run_manager
+        )
+
+    # Parallel dispatch ---------------------------------------------------------
+
+    def _iter_next_step(self, name_to_tool_map, color_mapping, inputs,
+                        intermediate_steps, run_manager=None):
+        if self.max_parallel_tools <= 1:
+            yield from super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            )
+            return
+
+        # The base loop yields every AgentAction first and then one result
+        # per action; _perform_agent_action below turns those results into
+        # futures so all tool calls are in flight before we wait on any.
+        pending = []
+        pool = ThreadPoolExecutor(
+            max_workers=self.max_parallel_tools, thread_name_prefix="agent-tool"
+        )
+        timed_out = False
+        _dispatch.pool = pool
+        try:
+            for item in super()._iter_next_step(
+                name_to_tool_map, color_mapping, inputs, intermediate_steps, run_manager
+            ):
+                if isinstance(item, Future):
+                    pending.append(item)
+                else:
+                    yield item  # AgentAction / AgentFinish / parsing-error step
+            _dispatch.pool = None
+            budget = current_budget.get()
+            for future in pending:
+                # Deterministic: model's requested order; a tool still running
+                # at the deadline is reported as timed out, not waited for
+                try:
+                    yield future.result(timeout=budget.remaining() if budget else None)
+                except FutureTimeout:
+                    timed_out = True
+                    budget.stop("deadline")
+                    yield AgentStep(
+                        action=future.agent_action,
+                        observation="Tool call timed out (run deadline reached).",
+                    )
+        finally:
+            _dispatch.pool = None
+            pool.shutdown(wait=not timed_out)  # Abandoned tool calls finish in the background
+
+    def _perform_agent_action(self, name_to_tool_map, color_mapping, agent_action,
+                              run_manager=None):
+        refused = self._refused(agent_action)
+        pool = getattr(_dispatch, "pool", None)
+        if refused is not None and pool is not None:
+            future = Future()  # Same shape as a dispatched call
+            future.set_result(refused)
+        elif refused is not None:
+            return refused
+        elif pool is None:
+            return super()._perform_agent_action(
+                name_to_tool_map, color_mapping, agent_action, run_manager
+            )
+        else:
+            context = contextvars.copy_context()  # Callbacks/tracing follow the tool
+            future = pool.submit(
+                context.run,
+                super()._perform_agent_action,
+                name_to_tool_map,
+                color_mapping,
+                agent_action,
+                run_manager,
+            )
+        future.agent_action = agent_action  # For timed-out observations
+        return future
@@ -0,0 +1,344 @@
+"""
+Research Pipeline - Shared Execution Path
+
+Runs a single research query end to end (agent run, parsing, rendering,
+persistence) so the synchronous endpoint, the background job workers and
+the ASGI server share exactly the same behaviour.
+"""
+
+import asyncio  # Non-blocking variant for the ASGI server
+import time  # Processing time measurement
+
+from utils.budget import (  # Deadlines, limits and cancellation
+    RunBudget,
+    RunCancelled,
+    current_budget,
+    partial_response,
+    record_stop,
+)
+
+from utils.agent_setup import get_agent_executor, get_llm, get_parser  # AI research components (lazy)
+from utils.routing import get_router  # Fast/strong model tiers with escalation
+from utils.structured_output import parse_research_output  # Validation, repair and re-ask
+from utils.result_cache import create_result_cache  # Repeated-query short-circuit
+from utils.report_store import get_report_store  # Durable, searchable report records
+from utils.rendering import render_summary, cache_stats as render_cache_stats  # Cached HTML
+from utils.memory import get_conversation_memory, ToolResultCollector  # Session history
+from utils.metrics import (  # Hot-path instrumentation
+    registry,
+    MetricsCallbackHandler,
+    RequestTimings,
+    current_timings,
+    RESEARCH_RUNS,
+    RESEARCH_SECONDS,
+)
+
+# Process-wide cache of parsed ResearchResponse objects (None when disabled)
+result_cache = create_result_cache()
+
+
+def run_research(query, callbacks=None, use_cache=True, include_timings=False, session_id=None,
+                 budget=None):
+    """
+    Execute the research agent pipeline for one query
+
+    Parameters:
+    - query (str): User research question
+    - callbacks (list): Optional LangChain callback handlers (streaming)
+    - use_cache (bool): Serve/store results through the result cache
+    - include_timings (bool): Add a per-stage timing breakdown to the result
+    - session_id (str): Conversation key; earlier turns become chat_history
+      and this turn is remembered (None: stateless)
+    - budget (RunBudget): Deadline, limits and cancellation of this run
+      (default: RunBudget.from_env())
+
+    Returns:
+    - dict: JSON-serialisable research result (topic, summary, sources,
+      tools, report_id, download_link, processing_time, cached[, timings]);
+      runs stopped by a budget add partial=True and stop_reason
+
+    Raises:
+    - RunCancelled: The run was cancelled (client gone, job cancelled)
+    - Exception: Any agent, parsing or file system failure is propagated
+      to the caller, which decides how to report it
+    """
+    steps = research_steps(query, callbacks, use_cache, include_timings, session_id, budget)
+    value = error = None
+    while True:
+        try:
+            function, args = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            value, error = function(*args), None
+        except BaseException as e:
+            value, error = None, e
+
+
+async def arun_research(query, callbacks=None, use_cache=True, include_timings=False, session_id=None,
+                        budget=None):
+    """
+    Asyncio counterpart of run_research for the ASGI server
+
+    Uses agent_executor.ainvoke (async LLM client, concurrently gathered
+    tool calls) and moves blocking cache and file work off the event loop.
+    Parameters, return value and errors match run_research; cancelling
+    the task (client disconnect) kills the run like RunCancelled.
+    """
+    steps = research_steps(query, callbacks, use_cache, include_timings, session_id, budget)
+    value = error = None
+    while True:
+        try:
+            function, args = steps.throw(error) if error is not None else steps.send(value)
+        except StopIteration as done:
+            return done.value
+        try:
+            if function is invoke_agent:
+                executor, inputs, config = args
+                value = await executor.ainvoke(inputs, config=config)
+            else:
+                value = await asyncio.to_thread(function, *args)
+            error = None
+        except BaseException as e:  # Includes task cancellation
+            value, error = None, e
+
+
+def research_steps(query, callbacks, use_cache, include_timings, session_id, budget):
+    """
+    The pipeline stages, shared by run_research and arun_research
+
+    A generator: every blocking call (model, cache, database) is yielded
+    as (function, args) and its result (or exception) is sent back in, so
+    the sync wrapper calls it directly and the async wrapper awaits it
+    (invoke_agent via ainvoke, everything else in a worker thread).
+
+    Returns (StopIteration.value):
+    - dict: The research result (see run_research)
+    """
+    start_time = time.time()  # Begin performance tracking
+    timings = RequestTimings()
+    collector = ToolResultCollector()  # Tool results worth remembering
+    callbacks = list(callbacks or []) + [MetricsCallbackHandler(timings), collector]
+    budget = budget or RunBudget.from_env()
+    context_token = current_timings.set(timings)  # Prompt compaction accounting
+    budget_token = current_budget.set(budget)  # Checked by the executor at every step
+
+    try:
+        with timings.stage("memory"):
+            chat_history = yield load_history, (session_id,)
+        use_cache = use_cache and not chat_history  # Follow-ups depend on the conversation
+
+        # Serve repeated questions without touching the LLM
+        with timings.stage("cache_lookup"):
+            structured_response = yield lookup_cached, (query, use_cache)
+        cache_hit = structured_response is not None
+
+        if not cache_hit:
+            # Execute AI research pipeline on the routed model tier (a model
+            # classifier is a blocking call)
+            router = get_router()
+            tier = yield router.route, (query, bool(chat_history))
+            while tier is not None:
+                attempt = router.apply(tier, budget, timings) if router.enabled else None
+                with timings.stage("agent"):
+                    result = yield invoke_agent, (
+                        get_agent_executor(tier), agent_inputs(query, chat_history),
+                        {"callbacks": callbacks},
+                    )
+
+                # Parse structured output from LLM response (or fall back to
+                # the evidence gathered so far when a budget stopped the run);
+                # a failed or weak answer is retried on a stronger tier. A
+                # formatting re-ask is a blocking model call
+                with timings.stage("parse"):
+                    structured_response, tier = yield settle_attempt, (
+                        router, tier, attempt, query, result, budget, collector, timings
+                    )
+            yield store_cached, (query, structured_response, use_cache and budget.reason is None)
+
+        with timings.stage("store"):
+            record = yield store_report, (query, structured_response, cache_hit, timings)
+        with timings.stage("memory"):
+            yield remember, (session_id, query, structured_response, collector.results)
+        with timings.stage("render"):
+            response = build_response(structured_response, record, start_time, cache_hit)
+    except (RunCancelled, asyncio.CancelledError):
+        record_stop(budget.cancel_reason, "killed")
+        record_run("cancelled", start_time)
+        raise
+    except Exception:
+        record_run("failed", start_time)
+        raise
+    finally:
+        current_timings.reset(context_token)
+        current_budget.reset(budget_token)
+
+    record_run(run_status(cache_hit, budget, response), start_time)
+    if include_timings:
+        response["timings"] = timings.as_dict()
+    return response
+
+
+def record_run(status, start_time):
+    RESEARCH_RUNS.inc(status=status)
+    RESEARCH_SECONDS.observe(time.time() - start_time)
+
+
+def run_status(cache_hit, budget, response):
+    """Outcome label of a finished run; marks budget-truncated responses"""
+    if cache_hit:
+        return "cached"
+    if budget.reason is not None:
+        record_stop(budget.reason, "truncated")
+        response.update(partial=True, stop_reason=budget.reason)
+        return "partial"
+    return "succeeded"
+
+
+def _collect_cache_metrics():
+    # Scrape-time snapshot of the result cache counters
+    if result_cache is None:
+        return
+    stats = result_cache.stats()
+    for name in ("hits", "misses", "semantic_hits", "evictions"):
+        yield (f"research_result_cache_{name}_total", "counter",
+               f"Result cache {name.replace('_', ' ')}", {}, stats[name])
+    yield ("research_result_cache_entries", "gauge", "Result cache entries", {}, stats["entries"])
+    yield ("research_result_cache_bytes", "gauge", "Result cache size in bytes", {}, stats["bytes"])
+
+
+def _collect_render_metrics():
+    stats = render_cache_stats()
+    yield ("markdown_render_cache_hits_total", "counter", "Summaries served pre-rendered", {}, stats["hits"])
+    yield ("markdown_render_cache_misses_total", "counter", "Render cache misses", {}, stats["misses"])
+
+
+registry.register_collector(_collect_cache_metrics)
+registry.register_collector(_collect_render_metrics)
+
+
+# -----------------------------------------------------------------------------
+# Pipeline Stages (shared by the sync and async paths)
+# -----------------------------------------------------------------------------
+def agent_inputs(query, chat_history=None):
+    """Agent executor input mapping (chat_history: earlier turns of a session)"""
+    return {
+        "query": query,
+        "chat_history": chat_history or [],  # Context storage (empty for new sessions)
+        "agent_scratchpad": [],  # Agent's working memory
+    }
+
+
+def invoke_agent(executor, inputs, config):
+    """Blocking agent run (the async wrapper awaits executor.ainvoke instead)"""
+    return executor.invoke(inputs, config=config)
+
+
+def parse_output(output, tier=None):
+    """
+    ResearchResponse for the agent output (repaired or re-asked if needed)
+
+    A formatting re-ask goes to the model of the tier that produced the
+    output.
+    """
+    return parse_research_output(output, get_parser(), get_llm=lambda: get_llm(tier))
+
+
+def finish_output(query, result, budget, collector, tier=None):
+    """
+    ResearchResponse for a finished agent run
+
+    Runs stopped by a budget answer with the evidence gathered so far
+    (no extra model call); complete runs are parsed (and repaired).
+    """
+    if budget.reason is not None:
+        return partial_response(
+            query, collector.results, budget.reason, get_parser().pydantic_object
+        )
+    return parse_output(result.get("output"), tier)
+
+
+def settle_attempt(router, tier, attempt, query, result, budget, collector, timings):
+    """
+    Accept one routed agent attempt or pick the tier to retry it on
+
+    Returns:
+    - (ResearchResponse, Tier): The answer and the next tier, or
+      (ResearchResponse, None) once the answer is accepted
+
+    Raises:
+    - Exception: The parse failure, when no stronger tier is left
+    """
+    try:
+        structured_response, error = finish_output(query, result, budget, collector, tier), None
+    except Exception as e:
+        structured_response, error = None, e
+    if not router.enabled:
+        if error is not None:
+            raise error
+        return structured_response, None
+
+    cause = "parse_failed" if error is not None else router.problem(structured_response, budget)
+    following = router.escalate(tier, cause, budget)
+    outcome = "escalated" if following is not None else ("failed" if error is not None else "accepted")
+    router.record(tier, attempt, timings, outcome)
+    if following is None and error is not None:
+        raise error
+    return structured_response, following
+
+
+def load_history(session_id):
+    """Token-budgeted chat_history for a session ([] when stateless)"""
+    memory = get_conversation_memory() if session_id else None
+    return memory.history(session_id) if memory is not None else []
+
+
+def remember(session_id, query, structured_response, tool_results):
+    memory = get_conversation_memory() if session_id else None
+    if memory is not None:
+        memory.record(session_id, query, structured_response, tool_results)
+
+
+def lookup_cached(query, use_cache):
+    """Cached ResearchResponse for the query, or None"""
+    if use_cache and result_cache is not None:
+        return result_cache.get(query)
+    return None
+
+
+def store_cached(query, structured_response, use_cache):
+    if use_cache and result_cache is not None:
+        result_cache.put(query, structured_response)
+
+
+def store_report(query, structured_response, cache_hit, timings):
+    """
+    Record the result in the report store
+
+    Cache hits reuse the report stored by the run that produced the
+    cached answer instead of writing a duplicate.
+    """
+    store = get_report_store()
+    if cache_hit:
+        record = store.latest_for_topic(structured_response.topic)
+        if record is not None and record["summary"] == structured_response.summary:
+            return record
+    return store.add(query, structured_response, timings.as_dict())
+
+
+def build_response(structured_response, record, start_time, cache_hit):
+    """Construct the API response payload"""
+    # Convert markdown content to HTML for web display (rendered once per
+    # distinct summary, then served from the in-memory/report store cache)
+    html_summary = render_summary(structured_response.summary, get_report_store())
+
+    return {
+        "topic": structured_response.topic,  # Research topic title
+        "summary": html_summary,  # HTML-formatted content
+        "sources": structured_response.sources,  # Reference URLs
+        "tools": structured_response.tools_used,  # AI tools utilized
+        "report_id": record["id"],  # Stored report identifier
+        "download_link": f"/download/{record['filename']}",  # Exported on demand
+        "processing_time": round(time.time() - start_time, 2),  # Duration in seconds
+        "cached": cache_hit,  # Served from the result cache
+    }
@@ -0,0 +1,437 @@
+"""
+Per-User Quotas - Request Rates, Concurrent Runs and Fair Shares
+
+Keeps one user from starving everyone else:
+
+1. Token-bucket request rate per subject (QUOTA_RATE / QUOTA_BURST)
+2. Maximum concurrent research runs per subject (QUOTA_CONCURRENCY),
+   shared by synchronous requests, streams, batches and queued jobs
+3. Per-subject weights for the job queue's weighted round-robin
+   (QUOTA_WEIGHTS), so queued work is served fairly across users
+
+Subjects are the JWT subject of an authenticated request ("user:<sub>")
+or the client address for anonymous ones ("ip:<addr>"). Backends: an
+in-process store, or SQLite for several worker processes sharing quotas.
+Rejections carry a retry_after for the HTTP Retry-After header.
+"""
+
+import math  # Retry-After rounding
+import os  # Environment configuration and fork detection
+import sqlite3  # Shared quota store
+import threading  # Store locking and per-thread connections
+import time  # Bucket refill and lease expiry
+import uuid  # Lease identifiers
+from contextlib import contextmanager  # Run slot helper
+
+from utils.budget import RunCancelled  # Batch gone while waiting for a slot
+from utils.cache import TTLCache  # Bounded per-subject state
+from utils.metrics import registry  # Rejection counters
+from utils.rate_limit import TokenBucket  # Request rate per subject
+
+QUOTA_REJECTIONS = registry.counter(
+    "quota_rejections_total", "Requests rejected by per-user quotas (reason=rate|concurrency)"
+)
+DEFAULT_RETRY_AFTER = int(os.environ.get("QUOTA_RETRY_AFTER", "5"))  # Concurrency rejections
+LEASE_TTL = float(os.environ.get("QUOTA_LEASE_TTL", "3600"))  # Slots of crashed workers expire
+SLOT_POLL_INTERVAL = 0.25  # Seconds between slot attempts of a waiting batch run
+
+
+class QuotaExceeded(Exception):
+    """
+    Raised when a subject is over its request rate or concurrency limit
+
+    Attributes:
+    - retry_after (int): Suggested client back-off in seconds
+    - reason (str): "rate" or "concurrency"
+    """
+
+    def __init__(self, retry_after, reason):
+        messages = {
+            "rate": "Too many research requests, retry later",
+            "concurrency": "Too many research runs in progress, retry later",
+        }
+        super().__init__(messages[reason])
+        self.retry_after = max(1, math.ceil(retry_after))
+        self.reason = reason
+
+
+def quota_subject(user=None, address=None):
+    """Quota key: the JWT subject when authenticated, else the client address"""
+    if user:
+        return f"user:{user}"
+    return f"ip:{address or 'unknown'}"
+
+
+def parse_weights(spec):
+    """'user:alice=3,user:bob=2' -> {"user:alice": 3.0, "user:bob": 2.0}"""
+    weights = {}
+    for item in (spec or "").split(","):
+        if "=" in item:
+            subject, weight = item.rsplit("=", 1)
+            weights[subject.strip()] = max(float(weight), 0.01)
+    return weights
+
+
+# -----------------------------------------------------------------------------
+# Quota Stores
+# -----------------------------------------------------------------------------
+class InMemoryQuotaStore:
+    """
+    Per-process buckets and run slots
+
+    Parameters:
+    - max_subjects (int): Idle subjects beyond this are forgotten (LRU)
+    """
+
+    def __init__(self, max_subjects=10000):
+        self._buckets = TTLCache(max_entries=max_subjects, ttl=None)
+        self._running = {}  # subject -> {lease ids}
+        self._leases = {}  # lease id -> subject
+        self._lock = threading.Lock()
+
+    def take(self, subject, rate, burst):
+        """Consume one request token; returns 0, or seconds until one is available"""
+        with self._lock:
+            bucket = self._buckets.get(subject)
+            if bucket is None:
+                bucket = TokenBucket(rate, burst)
+                self._buckets.set(subject, bucket)
+        if bucket.try_acquire():
+            return 0.0
+        return max(bucket.wait_time(), 0.001)
+
+    def acquire(self, subject, limit):
+        """Lease id for a run slot, or None when `limit` runs are in progress"""
+        with self._lock:
+            running = self._running.setdefault(subject, set())
+            if len(running) >= limit:
+                return None
+            lease = uuid.uuid4().hex
+            running.add(lease)
+            self._leases[lease] = subject
+            return lease
+
+    def release(self, lease):
+        with self._lock:
+            subject = self._leases.pop(lease, None)
+            running = self._running.get(subject)
+            if running is not None:
+                running.discard(lease)
+                if not running:
+                    del self._running[subject]
+
+    def running(self, subject):
+        with self._lock:
+            return len(self._running.get(subject, ()))
+
+
+class SQLiteQuotaStore:
+    """
+    Buckets and run slots shared by every process using the same file
+
+    Run slots are leases with an expiry, so slots held by a worker that
+    died are reclaimed after LEASE_TTL seconds.
+    """
+
+    def __init__(self, path, lease_ttl=LEASE_TTL):
+        self.path = os.path.abspath(path)
+        self.lease_ttl = lease_ttl
+        self._local = threading.local()  # One connection per thread
+        self._pid = os.getpid()
+        conn = self._connect()
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS quota_buckets (
+                subject TEXT PRIMARY KEY,
+                tokens REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )"""
+        )
+        conn.execute(
+            """CREATE TABLE IF NOT EXISTS quota_leases (
+                id TEXT PRIMARY KEY,
+                subject TEXT NOT NULL,
+                expires_at REAL NOT NULL
+            )"""
+        )
+        conn.execute("CREATE INDEX IF NOT EXISTS quota_leases_subject ON quota_leases (subject)")
+
+    def _connect(self):
+        if os.getpid() != self._pid:  # Forked worker: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            self._local.conn = conn
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connect()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield conn
+            conn.execute("COMMIT")
+        except BaseException:
+            conn.execute("ROLLBACK")
+            raise
+
+    def take(self, subject, rate, burst):
+        now = time.time()
+        with self._transaction() as conn:
+            row = conn.execute(
+                "SELECT tokens, updated_at FROM quota_buckets WHERE subject = ?", (subject,)
+            ).fetchone()
+            tokens = burst if row is None else min(burst, row[0] + (now - row[1]) * rate)
+            wait = 0.0
+            if tokens >= 1:
+                tokens -= 1
+            else:
+                wait = (1 - tokens) / rate if rate else float("inf")
+            conn.execute(
+                "INSERT INTO quota_buckets (subject, tokens, updated_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(subject) DO UPDATE SET tokens = excluded.tokens, "
+                "updated_at = excluded.updated_at",
+                (subject, tokens, now),
+            )
+        return wait
+
+    def acquire(self, subject, limit):
+        now = time.time()
+        with self._transaction() as conn:
+            conn.execute("DELETE FROM quota_leases WHERE expires_at < ?", (now,))
+            (running,) = conn.execute(
+                "SELECT COUNT(*) FROM quota_leases WHERE subject = ?", (subject,)
+            ).fetchone()
+            if running >= limit:
+                return None
+            lease = uuid.uuid4().hex
+            conn.execute(
+                "INSERT INTO quota_leases (id, subject, expires_at) VALUES (?, ?, ?)",
+                (lease, subject, now + self.lease_ttl),
+            )
+            return lease
+
+    def release(self, lease):
+        self._connect().execute("DELETE FROM quota_leases WHERE id = ?", (lease,))
+
+    def running(self, subject):
+        (running,) = self._connect().execute(
+            "SELECT COUNT(*) FROM quota_leases WHERE subject = ? AND expires_at >= ?",
+            (subject, time.time()),
+        ).fetchone()
+        return running
+
+
+# -----------------------------------------------------------------------------
+# Quota Manager
+# -----------------------------------------------------------------------------
+class QuotaManager:
+    """
+    Quota policy on top of a store
+
+    Parameters:
+    - store: InMemoryQuotaStore or SQLiteQuotaStore
+    - rate (float): Sustained requests per second per subject
+    - burst (float): Requests a subject may send at once
+    - max_concurrent (int): Research runs in progress per subject
+    - weights (dict): subject -> fair-share weight (default 1)
+    """
+
+    def __init__(self, store, rate=0.5, burst=10, max_concurrent=3, weights=None):
+        self.store = store
+        self.rate = rate
+        self.burst = burst
+        self.max_concurrent = max_concurrent
+        self.weights = weights or {}
+
+    def weight(self, subject):
+        return self.weights.get(subject, 1.0)
+
+    def check_rate(self, subject):
+        """
+        Charge one request to the subject's bucket
+
+        Raises:
+        - QuotaExceeded: Bucket empty (retry_after: time to the next token)
+        """
+        if self.rate <= 0:
+            return  # QUOTA_RATE=0: no request rate limit
+        wait = self.store.take(subject, self.rate, self.burst)
+        if wait > 0:
+            QUOTA_REJECTIONS.inc(reason="rate")
+            raise QuotaExceeded(wait, "rate")
+
+    def try_acquire(self, subject):
+        """Run slot lease, or None when the subject is at its limit"""
+        return self.store.acquire(subject, self.max_concurrent)
+
+    def release(self, lease):
+        self.store.release(lease)
+
+    def reserve(self, subject):
+        """
+        Rate check plus a run slot: the gate for a research run
+
+        Returns:
+        - str: Lease to release() when the run ends
+
+        Raises:
+        - QuotaExceeded: Over the request rate or the concurrency limit
+        """
+        self.check_rate(subject)
+        lease = self.try_acquire(subject)
+        if lease is None:
+            QUOTA_REJECTIONS.inc(reason="concurrency")
+            raise QuotaExceeded(DEFAULT_RETRY_AFTER, "concurrency")
+        return lease
+
+    @contextmanager
+    def admit(self, subject):
+        """reserve() for the duration of a with block"""
+        lease = self.reserve(subject)
+        try:
+            yield
+        finally:
+            self.release(lease)
+
+
+def create_quota_manager():
+    """
+    Build the quota manager from the environment
+
+    Environment:
+    - QUOTA_BACKEND: "memory" (default), "sqlite" or "off"
+    - QUOTA_DB: SQLite file path (default: data/quotas.sqlite3)
+    - QUOTA_RATE / QUOTA_BURST: Requests per second and burst (0.5 / 10;
+      a rate of 0 disables the rate limit)
+    - QUOTA_CONCURRENCY: Research runs in progress per subject (3)
+    - QUOTA_WEIGHTS: Fair-share weights, e.g. "user:alice=3,user:bob=2"
+
+    Returns:
+    - QuotaManager, or None when disabled
+    """
+    backend = os.environ.get("QUOTA_BACKEND", "memory").lower()
+    if backend == "off":
+        return None
+    if backend == "sqlite":
+        store = SQLiteQuotaStore(os.environ.get("QUOTA_DB", os.path.join("data", "quotas.sqlite3")))
+    elif backend == "memory":
+        store = InMemoryQuotaStore()
+    else:
+        raise ValueError(f"Unknown QUOTA_BACKEND: {backend}")
+    return QuotaManager(
+        store,
+        rate=float(os.environ.get("QUOTA_RATE", "0.5")),
+        burst=float(os.environ.get("QUOTA_BURST", "10")),
+        max_concurrent=int(os.environ.get("QUOTA_CONCURRENCY", "3")),
+        weights=parse_weights(os.environ.get("QUOTA_WEIGHTS")),
+    )
+
+
+_lock = threading.Lock()
+_manager = {}
+
+
+def get_quota_manager():
+    """Process-wide quota manager, built on first use (None when off)"""
+    if "default" not in _manager:
+        with _lock:
+            if "default" not in _manager:
+                _manager["default"] = create_quota_manager()
+    return _manager["default"]
+
+
+def set_quota_manager(manager):
+    """Replace the shared manager (None disables quotas; benchmarks and tests)"""
+    with _lock:
+        _manager["default"] = manager
+
+
+def check_rate(subject):
+    """QuotaManager.check_rate for the shared manager (no-op when quotas are off)"""
+    manager = get_quota_manager()
+    if manager is not None:
+        manager.check_rate(subject)
+
+
+def reserve(subject):
+    """QuotaManager.reserve for the shared manager (None when quotas are off)"""
+    manager = get_quota_manager()
+    return manager.reserve(subject) if manager is not None else None
+
+
+def release(lease):
+    if lease is not None:
+        get_quota_manager().release(lease)
+
+
+@contextmanager
+def admitted(subject):
+    """Hold a run slot of the shared manager for the duration of a with block"""
+    lease = reserve(subject)
+    try:
+        yield
+    finally:
+        release(lease)
+
+
+class BatchSlots:
+    """
+    Run slots of a batch: one per query in flight
+
+    The slot reserved when the batch was admitted serves its first run;
+    every further run waits for a free slot of the subject, so a batch
+    never runs more queries at once than the subject's concurrency
+    limit. Each slot is released when its own run ends.
+
+    Parameters:
+    - subject (str): Quota subject of the batch
+    - lease (str): Slot reserved at admission (None when quotas are off)
+    """
+
+    def __init__(self, subject, lease):
+        self.subject = subject
+        self._spare = lease
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def slot(self, cancelled):
+        """
+        Hold a run slot for the duration of a with block
+
+        Raises:
+        - RunCancelled: The batch was cancelled while waiting
+        """
+        with self._lock:
+            lease, self._spare = self._spare, None
+        manager = get_quota_manager()
+        while lease is None and manager is not None:
+            lease = manager.try_acquire(self.subject)
+            if lease is None and cancelled.wait(SLOT_POLL_INTERVAL):
+                raise RunCancelled("client_disconnected")
+        try:
+            yield
+        finally:
+            release(lease)
+
+    def close(self):
+        """Return the admission slot if no run has taken it"""
+        with self._lock:
+            lease, self._spare = self._spare, None
+        release(lease)
+
+
+"""
+Where Quotas Apply:
+- POST /research (sync), /research/stream and /research/batch: rate
+  check and a run slot held while the agent runs (batches hold one slot
+  per query in flight, BatchSlots, released as each query finishes)
+- Async submissions: rate check at submission; the slot is taken when a
+  worker claims the job, and the job queue picks the next job by
+  weighted round-robin across subjects, skipping subjects at their limit
+"""
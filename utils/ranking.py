@@ -0,0 +1,115 @@
+"""
+Local Relevance Ranking
+
+A small, dependency-free Okapi BM25 ranker for picking the passages of a
+text that best match a query. It runs in-process on a few kilobytes of
+text per call, so it costs microseconds rather than an embedding or LLM
+round trip.
+"""
+
+import math  # IDF
+import re  # Tokenisation and passage splitting
+from collections import Counter  # Term frequencies
+
+from utils.tokens import estimate_tokens  # Passage budgets
+
+_TOKEN = re.compile(r"\w+")
+# Sentence ends, or the "..." DuckDuckGo puts between result snippets
+_PASSAGE_BREAK = re.compile(r"(?<=[.!?])\s+|\s*\.\.\.\s*|\n+")
+
+STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were which with what who how why when".split()
+)
+
+
+def terms(text):
+    """Lowercased word tokens without stopwords"""
+    return [t for t in _TOKEN.findall(text.lower()) if t not in STOPWORDS]
+
+
+def split_passages(text, min_chars=20):
+    """
+    Split text into sentence-sized passages
+
+    Fragments shorter than `min_chars` are merged into the next passage so
+    abbreviations and list markers do not become passages of their own.
+    """
+    passages = []
+    carry = ""
+    for part in _PASSAGE_BREAK.split(text):
+        part = (carry + " " + part).strip() if carry else part.strip()
+        if len(part) < min_chars:
+            carry = part
+            continue
+        passages.append(part)
+        carry = ""
+    if carry:
+        passages.append(carry)
+    return passages
+
+
+class BM25:
+    """
+    Okapi BM25 over a fixed list of documents
+
+    Parameters:
+    - documents (list): Document strings
+    - k1 (float): Term frequency saturation
+    - b (float): Document length normalisation
+    """
+
+    def __init__(self, documents, k1=1.5, b=0.75):
+        self.k1 = k1
+        self.b = b
+        self._docs = [Counter(terms(doc)) for doc in documents]
+        self._lengths = [sum(doc.values()) for doc in self._docs]
+        self._avg_length = (sum(self._lengths) / len(self._lengths)) if self._lengths else 0.0
+        frequency = Counter()
+        for doc in self._docs:
+            frequency.update(doc.keys())
+        count = len(self._docs)
+        self._idf = {
+            term: math.log(1 + (count - df + 0.5) / (df + 0.5))
+            for term, df in frequency.items()
+        }
+
+    def scores(self, query):
+        """BM25 score of every document for the query, in document order"""
+        query_terms = set(terms(query))
+        results = []
+        for doc, length in zip(self._docs, self._lengths):
+            norm = self.k1 * (1 - self.b + self.b * length / (self._avg_length or 1))
+            score = 0.0
+            for term in query_terms:
+                tf = doc.get(term)
+                if tf:
+                    score += self._idf[term] * tf * (self.k1 + 1) / (tf + norm)
+            results.append(score)
+        return results
+
+
+def top_passages(query, passages, budget):
+    """
+    Most relevant passages that fit a token budget, in their original order
+
+    Parameters:
+    - query (str): Relevance query
+    - passages (list): Candidate passages
+    - budget (int): Token budget for the selection
+
+    Returns:
+    - list: Selected passages (original order preserved for readability)
+    """
+    scores = BM25(passages).scores(query)
+    # Best score first; ties keep the earlier passage (search results are ranked)
+    order = sorted(range(len(passages)), key=lambda i: (-scores[i], i))
+    chosen = []
+    used = 0
+    for index in order:
+        cost = estimate_tokens(passages[index]) + 1
+        if used + cost > budget:
+            continue
+        chosen.append(index)
+        used += cost
+    return [passages[i] for i in sorted(chosen)]
@@ -0,0 +1,69 @@
+"""
+Token Bucket Rate Limiter
+
+Smooths bursts of outbound or inbound requests to a sustained rate:
+the bucket refills continuously at `rate` tokens per second up to
+`capacity`, and every request consumes one token.
+"""
+
+import threading  # Shared bucket state
+import time  # Refill bookkeeping
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket
+
+    Parameters:
+    - rate (float): Tokens added per second (sustained request rate)
+    - capacity (float): Maximum burst size
+    - clock (callable): Monotonic time source (injectable for tests)
+    """
+
+    def __init__(self, rate, capacity, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = capacity
+        self.clock = clock
+        self._tokens = capacity  # Start full so the first burst is allowed
+        self._updated = clock()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        # Caller holds self._lock
+        now = self.clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens=1):
+        """Consume tokens if available; never blocks"""
+        with self._lock:
+            self._refill()
+            if self._tokens >= tokens:
+                self._tokens -= tokens
+                return True
+            return False
+
+    def wait_time(self, tokens=1):
+        """Seconds until `tokens` would be available (0 when available now)"""
+        with self._lock:
+            self._refill()
+            missing = tokens - self._tokens
+            return max(0.0, missing / self.rate) if self.rate else float("inf")
+
+    def acquire(self, tokens=1, timeout=None):
+        """
+        Block until tokens are available
+
+        Returns:
+        - bool: True once acquired, False if `timeout` seconds elapsed first
+        """
+        deadline = None if timeout is None else self.clock() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            delay = self.wait_time(tokens)
+            if deadline is not None:
+                remaining = deadline - self.clock()
+                if remaining <= 0 or delay > remaining:
+                    return False
+            time.sleep(delay)
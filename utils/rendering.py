@@ -0,0 +1,80 @@
+"""
+Markdown Rendering
+
+Converts report summaries to HTML without rebuilding the converter on
+every call:
+
+1. One pre-configured markdown.Markdown instance per thread, reset
+   between documents (instances are not thread-safe)
+2. Rendered HTML keyed by the SHA-256 of the markdown source, kept in a
+   small in-memory LRU and persisted next to the report in the report
+   store, so a summary is rendered once no matter how often it is viewed
+"""
+
+import hashlib  # Content hashes
+import os  # Environment configuration
+import threading  # Per-thread converters
+
+import markdown  # Markdown to HTML conversion
+
+from utils.cache import TTLCache  # Hot rendered summaries
+
+EXTENSIONS = ["fenced_code", "tables"]  # Support code blocks and tables
+
+_local = threading.local()
+
+# Rendered HTML by content hash (no expiry: the key changes with the content)
+_html_cache = TTLCache(
+    max_entries=int(os.environ.get("RENDER_CACHE_MAX_ENTRIES", "1024")),
+    ttl=None,
+    max_bytes=int(os.environ.get("RENDER_CACHE_MAX_BYTES", str(8 * 1024 * 1024))),
+    sizeof=len,
+)
+
+
+def get_converter():
+    """This thread's Markdown converter (extensions loaded once)"""
+    converter = getattr(_local, "converter", None)
+    if converter is None:
+        converter = _local.converter = markdown.Markdown(extensions=EXTENSIONS)
+    return converter
+
+
+def render_markdown_html(text):
+    """Convert markdown to HTML with the reused per-thread converter"""
+    # reset() clears per-document state (references, footnotes, ...)
+    return get_converter().reset().convert(text)
+
+
+def content_hash(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def render_summary(text, store=None):
+    """
+    HTML for a summary, rendering it at most once per content hash
+
+    Parameters:
+    - text (str): Markdown source
+    - store (ReportStore): Optional persistent HTML store
+
+    Returns:
+    - str: Rendered HTML
+    """
+    key = content_hash(text)
+    html = _html_cache.get(key)
+    if html is not None:
+        return html
+
+    html = store.get_html(key) if store is not None else None
+    if html is None:
+        html = render_markdown_html(text)
+        if store is not None:
+            store.put_html(key, html)
+    _html_cache.set(key, html)
+    return html
+
+
+def cache_stats():
+    """In-memory rendered HTML cache counters"""
+    return _html_cache.stats()
@@ -0,0 +1,496 @@
+"""
+Research Report Store
+
+Durable, concurrency-safe record of every research result, replacing
+ad-hoc markdown files written per topic:
+
+1. SQLite in WAL mode - one atomic INSERT per report, readers never
+   block the writer, safe across threads and worker processes
+2. FTS5 index over topic, summary and sources (kept in sync by triggers)
+3. Unique report ids - concurrent runs on the same topic never collide
+4. Markdown files in outputs/ are an on-demand export of a stored report
+"""
+
+import json  # Sources, tools and timings columns
+import os  # Paths, atomic rename and fork detection
+import re  # Filename slugs and search tokens
+import sqlite3  # Storage engine
+import tempfile  # Atomic export
+import threading  # Per-thread connections and lazy singleton
+import time  # Report timestamps
+import uuid  # Report identifiers
+
+
+def slugify(text, max_length=60):
+    """Filesystem-safe fragment of a topic (used in export filenames)"""
+    slug = re.sub(r"[^A-Za-z0-9]+", "_", text).strip("_")
+    return slug[:max_length] or "report"
+
+
+def render_markdown(record):
+    """Markdown document for a stored report (the export format)"""
+    return f"# {record['topic']}\n\n{record['summary']}"
+
+
+URL_PATTERN = re.compile(r"https?://[^\s)\]>\"']+")
+
+
+def parse_markdown(text, filename):
+    """(topic, summary) of an exported report; the filename is the fallback topic"""
+    first, _, rest = text.partition("\n")
+    if first.startswith("# "):
+        return first[2:].strip(), rest.strip()
+    topic = filename[:-3].replace("research_", "", 1).replace("_", " ")
+    return topic, text.strip()
+
+
+def snippet(summary, terms, width=160):
+    """Summary excerpt around the first matching term"""
+    lowered = summary.lower()
+    positions = [lowered.find(term) for term in terms]
+    positions = [p for p in positions if p >= 0]
+    start = max(0, min(positions) - width // 4) if positions else 0
+    excerpt = " ".join(summary[start:start + width].split())
+    return ("..." if start else "") + excerpt + ("..." if start + width < len(summary) else "")
+
+
+def fts_query(text):
+    """
+    Turn free text into a safe FTS5 MATCH expression
+
+    Every term is quoted (FTS operators in user input are treated as
+    plain words) and the last term matches as a prefix.
+    """
+    terms = re.findall(r"\w+", text.lower())
+    if not terms:
+        return None
+    quoted = [f'"{term}"' for term in terms]
+    quoted[-1] += "*"  # Search-as-you-type
+    return " ".join(quoted)
+
+
+class ReportStore:
+    """
+    SQLite-backed research report store
+
+    Parameters:
+    - path (str): Database file (created with its directory if missing)
+    - candidates (int): Newest full-text matches ranked by BM25 per search
+    """
+
+    COLUMNS = "id, query, topic, summary, sources, tools_used, timings, filename, created_at"
+    LISTING = "rowid, id, query, topic, sources, filename, created_at"  # + snippet
+
+    def __init__(self, path, candidates=500):
+        self.path = os.path.abspath(path)  # Threads must not depend on the cwd
+        self.candidates = candidates  # Newest full-text matches ranked per search
+        self._local = threading.local()  # One connection per thread
+        self._pid = os.getpid()
+        conn = self._connect()
+        conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS reports (
+                rowid INTEGER PRIMARY KEY AUTOINCREMENT,
+                id TEXT NOT NULL UNIQUE,
+                query TEXT NOT NULL,
+                topic TEXT NOT NULL,
+                summary TEXT NOT NULL,
+                sources TEXT NOT NULL,
+                tools_used TEXT NOT NULL,
+                timings TEXT,
+                filename TEXT NOT NULL UNIQUE,
+                created_at REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS reports_topic ON reports (topic COLLATE NOCASE, created_at);
+            CREATE INDEX IF NOT EXISTS reports_created ON reports (created_at);
+            CREATE TABLE IF NOT EXISTS rendered_html (
+                hash TEXT PRIMARY KEY,
+                html TEXT NOT NULL
+            );
+            """
+        )
+        self.fts = self._create_fts(conn)
+
+    def _connect(self):
+        if os.getpid() != self._pid:  # Forked worker: never reuse the parent's connections
+            self._local = threading.local()
+            self._pid = os.getpid()
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")  # Readers never block the writer
+            conn.execute("PRAGMA synchronous=NORMAL")  # Durable at checkpoints under WAL
+            self._local.conn = conn
+        return conn
+
+    def _create_fts(self, conn):
+        """External-content FTS5 table plus sync triggers (False if FTS5 is missing)"""
+        try:
+            conn.executescript(
+                """
+                CREATE VIRTUAL TABLE IF NOT EXISTS reports_fts USING fts5(
+                    topic, summary, sources,
+                    content='reports', content_rowid='rowid',
+                    tokenize='porter unicode61'
+                );
+                CREATE TRIGGER IF NOT EXISTS reports_ai AFTER INSERT ON reports BEGIN
+                    INSERT INTO reports_fts (rowid, topic, summary, sources)
+                    VALUES (new.rowid, new.topic, new.summary, new.sources);
+                END;
+                CREATE TRIGGER IF NOT EXISTS reports_ad AFTER DELETE ON reports BEGIN
+                    INSERT INTO reports_fts (reports_fts, rowid, topic, summary, sources)
+                    VALUES ('delete', old.rowid, old.topic, old.summary, old.sources);
+                END;
+                """
+            )
+            return True
+        except sqlite3.OperationalError as e:
+            print("FTS5 unavailable, report search falls back to LIKE:", e)
+            return False
+
+    # -------------------------------------------------------------------------
+    # Writes
+    # -------------------------------------------------------------------------
+    def add(self, query, response, timings=None):
+        """
+        Record one research result atomically
+
+        Parameters:
+        - query (str): Original user question
+        - response (ResearchResponse): Parsed agent output
+        - timings (dict): Optional per-stage timing breakdown
+
+        Returns:
+        - dict: Stored record (id, filename, created_at, ...)
+        """
+        report_id = uuid.uuid4().hex[:12]
+        record = {
+            "id": report_id,
+            "query": query,
+            "topic": response.topic,
+            "summary": response.summary,
+            "sources": list(response.sources),
+            "tools_used": list(response.tools_used),
+            "timings": timings,
+            "filename": f"research_{slugify(response.topic)}_{report_id}.md",
+            "created_at": time.time(),
+        }
+        # Single statement: the row and its FTS entry commit together
+        self._connect().execute(
+            f"INSERT INTO reports ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+            (
+                record["id"],
+                query,
+                record["topic"],
+                record["summary"],
+                json.dumps(record["sources"]),
+                json.dumps(record["tools_used"]),
+                json.dumps(timings) if timings is not None else None,
+                record["filename"],
+                record["created_at"],
+            ),
+        )
+        return record
+
+    def put_html(self, content_hash, html):
+        """Persist rendered HTML for a summary (keyed by its content hash)"""
+        self._connect().execute(
+            "INSERT OR IGNORE INTO rendered_html (hash, html) VALUES (?, ?)",
+            (content_hash, html),
+        )
+
+    # -------------------------------------------------------------------------
+    # Lookups
+    # -------------------------------------------------------------------------
+    def get(self, report_id):
+        """Report by id (None if unknown)"""
+        return self._one("WHERE id = ?", (report_id,))
+
+    def get_by_filename(self, filename):
+        """Report by export filename (None if unknown)"""
+        return self._one("WHERE filename = ?", (filename,))
+
+    def get_html(self, content_hash):
+        """Previously rendered HTML for a summary hash (None if not rendered)"""
+        row = self._connect().execute(
+            "SELECT html FROM rendered_html WHERE hash = ?", (content_hash,)
+        ).fetchone()
+        return row[0] if row else None
+
+    def latest_for_topic(self, topic):
+        """Most recent report on a topic (case-insensitive)"""
+        return self._one(
+            "WHERE topic = ? COLLATE NOCASE ORDER BY created_at DESC LIMIT 1", (topic,)
+        )
+
+    def search(self, text, limit=20, offset=0):
+        """
+        Full-text search over topic, summary and sources
+
+        Parameters:
+        - text (str): Free-text query (last word matches as a prefix)
+        - limit (int): Page size
+        - offset (int): Results to skip (pagination)
+
+        Returns:
+        - list: Report listings with a summary snippet, best (BM25) first
+        """
+        if self.fts:
+            expression = fts_query(text)
+            if expression is None:
+                return []
+            # Rank only the newest `candidates` matches: BM25 scoring every
+            # match of a very common term would grow with the archive
+            rows = self._connect().execute(
+                f"SELECT {self._qualified(self.LISTING)}, r.summary FROM ("
+                "  SELECT rowid, bm25(reports_fts, 10.0, 1.0, 0.5) AS score FROM reports_fts"
+                "  WHERE reports_fts MATCH ? ORDER BY rowid DESC LIMIT ?"
+                ") AS m JOIN reports r ON r.rowid = m.rowid "
+                "ORDER BY m.score LIMIT ? OFFSET ?",
+                (expression, self.candidates, limit, offset),
+            ).fetchall()
+        else:
+            pattern = f"%{text}%"
+            rows = self._connect().execute(
+                f"SELECT {self.LISTING}, summary FROM reports "
+                "WHERE topic LIKE ? OR summary LIKE ? OR sources LIKE ? "
+                "ORDER BY created_at DESC LIMIT ? OFFSET ?",
+                (pattern, pattern, pattern, limit, offset),
+            ).fetchall()
+        terms = re.findall(r"\w+", text.lower())
+        return [self._listing(row[:-1] + (snippet(row[-1], terms),)) for row in rows]
+
+    def search_page(self, text, limit=20, offset=0):
+        """
+        One page of search() with its pagination state
+
+        Only the newest `candidates` matches are ranked, so pages never
+        reach past that window; older matches need a narrower query.
+
+        Returns:
+        - (list, int, bool): Report listings, the offset of the next page
+          (None on the last page) and whether matches outside the ranked
+          window were left out
+        """
+        window = self.candidates if self.fts else None
+        page = limit if window is None else max(0, min(limit, window - offset))
+        rows = self.search(text, limit=page + 1, offset=offset) if page else []
+        next_offset = offset + page if len(rows) > page else None
+        truncated = False
+        if window is not None and next_offset is None and offset + len(rows) >= window:
+            truncated = self._matches_beyond(text, window)
+        return rows[:page], next_offset, truncated
+
+    def _matches_beyond(self, text, window):
+        # Bounded count: reads at most window + 1 index entries
+        expression = fts_query(text)
+        if expression is None:
+            return False
+        (count,) = self._connect().execute(
+            "SELECT COUNT(*) FROM (SELECT rowid FROM reports_fts WHERE reports_fts MATCH ? LIMIT ?)",
+            (expression, window + 1),
+        ).fetchone()
+        return count > window
+
+    def history(self, limit=20, cursor=None):
+        """
+        Newest-first listing with keyset pagination
+
+        Parameters:
+        - limit (int): Page size
+        - cursor (int): next_cursor from the previous page (None: newest)
+
+        Returns:
+        - (list, int): Report listings and the cursor of the next page
+          (None on the last page)
+        """
+        clause, params = "", ()
+        if cursor is not None:
+            clause, params = "WHERE rowid < ?", (cursor,)
+        rows = self._connect().execute(
+            f"SELECT {self.LISTING}, substr(summary, 1, 160) FROM reports {clause} "
+            "ORDER BY rowid DESC LIMIT ?",
+            params + (limit + 1,),  # One extra row tells whether a next page exists
+        ).fetchall()
+        next_cursor = rows[limit - 1][0] if len(rows) > limit else None
+        return [self._listing(row) for row in rows[:limit]], next_cursor
+
+    def count(self):
+        (total,) = self._connect().execute("SELECT COUNT(*) FROM reports").fetchone()
+        return total
+
+    @staticmethod
+    def _qualified(columns):
+        return ", ".join(f"r.{column.strip()}" for column in columns.split(","))
+
+    def _one(self, clause, params):
+        row = self._connect().execute(
+            f"SELECT {self.COLUMNS} FROM reports {clause}", params
+        ).fetchone()
+        return self._record(row) if row else None
+
+    @staticmethod
+    def _record(row):
+        return {
+            "id": row[0],
+            "query": row[1],
+            "topic": row[2],
+            "summary": row[3],
+            "sources": json.loads(row[4]),
+            "tools_used": json.loads(row[5]),
+            "timings": json.loads(row[6]) if row[6] else None,
+            "filename": row[7],
+            "created_at": row[8],
+        }
+
+    @staticmethod
+    def _listing(row):
+        return {
+            "id": row[1],
+            "query": row[2],
+            "topic": row[3],
+            "sources": json.loads(row[4]),
+            "filename": row[5],
+            "created_at": row[6],
+            "snippet": row[7],
+        }
+
+    # -------------------------------------------------------------------------
+    # Index Maintenance
+    # -------------------------------------------------------------------------
+    def import_markdown(self, directory):
+        """
+        Record markdown reports that exist only as files in `directory`
+
+        Picks up reports written before the store existed (or copied in
+        from another deployment). Files already known by name are skipped,
+        so running it again is harmless.
+
+        Returns:
+        - int: Number of reports imported
+        """
+        imported = 0
+        conn = self._connect()
+        for name in sorted(os.listdir(directory)) if os.path.isdir(directory) else []:
+            if not name.endswith(".md") or name.startswith("."):
+                continue
+            path = os.path.join(directory, name)
+            with open(path, encoding="utf-8", errors="replace") as f:
+                topic, summary = parse_markdown(f.read(), name)
+            cursor = conn.execute(
+                f"INSERT OR IGNORE INTO reports ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    uuid.uuid5(uuid.NAMESPACE_URL, name).hex[:12],  # Stable across re-imports
+                    topic,
+                    topic,
+                    summary,
+                    json.dumps(sorted(set(URL_PATTERN.findall(summary)))),
+                    json.dumps([]),
+                    None,
+                    name,
+                    os.path.getmtime(path),
+                ),
+            )
+            imported += cursor.rowcount
+        return imported
+
+    def rebuild_index(self):
+        """Recreate the full-text index from the reports table"""
+        if self.fts:
+            self._connect().execute("INSERT INTO reports_fts (reports_fts) VALUES ('rebuild')")
+
+    # -------------------------------------------------------------------------
+    # File Export
+    # -------------------------------------------------------------------------
+    def export(self, filename, directory):
+        """
+        Write a stored report to directory/filename if it is not there yet
+
+        The file is written to a temporary name and renamed into place,
+        so concurrent downloads never observe a partial file.
+
+        Returns:
+        - str: Path of the exported file, or None for unknown filenames
+        """
+        path = os.path.join(directory, filename)
+        if os.path.isfile(path):
+            return path  # Reports are immutable once stored
+        record = self.get_by_filename(filename)
+        if record is None:
+            return None
+        os.makedirs(directory, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(dir=directory, prefix=".export-", suffix=".md")
+        try:
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(render_markdown(record))
+            os.replace(temp_path, path)
+        except BaseException:
+            os.unlink(temp_path)
+            raise
+        return path
+
+
+# -----------------------------------------------------------------------------
+# Shared Instance
+# -----------------------------------------------------------------------------
+_lock = threading.Lock()
+_store = {}
+
+
+def get_report_store():
+    """
+    Process-wide report store, opened on first use
+
+    Environment:
+    - REPORT_STORE_DB: SQLite file path (default: data/reports.sqlite3)
+    - REPORT_SEARCH_CANDIDATES: Newest matches ranked per search (500)
+    """
+    store = _store.get("default")
+    if store is None:
+        with _lock:
+            store = _store.get("default")
+            if store is None:
+                path = os.environ.get("REPORT_STORE_DB", os.path.join("data", "reports.sqlite3"))
+                store = _store["default"] = ReportStore(
+                    path, candidates=int(os.environ.get("REPORT_SEARCH_CANDIDATES", "500"))
+                )
+    return store
+
+
+# -----------------------------------------------------------------------------
+# Command Line
+# -----------------------------------------------------------------------------
+if __name__ == "__main__":
+    import argparse  # Maintenance options
+
+    arguments = argparse.ArgumentParser(description="Report store maintenance")
+    arguments.add_argument("--import-dir", default="outputs",
+                           help="Import markdown reports from this directory (default: outputs)")
+    arguments.add_argument("--rebuild", action="store_true", help="Rebuild the full-text index")
+    options = arguments.parse_args()
+
+    store = get_report_store()
+    count = store.import_markdown(options.import_dir)
+    print(f"Imported {count} report(s) from {options.import_dir}")
+    if options.rebuild:
+        store.rebuild_index()
+        print("Full-text index rebuilt")
+    print(f"{store.count()} report(s) in {store.path}")
+
+
+"""
+Storage Notes:
+- Reports are append-only rows; the exported markdown is derived data and
+  can be deleted at any time (it is re-created on the next download)
+- WAL mode allows one writer and many concurrent readers per database;
+  every worker process may open the same file
+- Filenames embed the report id, so repeated topics keep every version
+- Rendered HTML lives in rendered_html keyed by the summary's SHA-256;
+  identical summaries share one row
+- The FTS index is updated incrementally by triggers; rebuild it (and
+  import legacy outputs/*.md files) with:
+    python -m utils.report_store --import-dir outputs --rebuild
+"""
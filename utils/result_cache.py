@@ -0,0 +1,201 @@
+"""
+Semantic Result Cache for Research Responses
+
+Short-circuits the agent pipeline for repeated questions. Lookups first
+match on a normalised form of the query ("History of X?" and "history of
+x" share a key) and can optionally fall back to embedding similarity using
+a local NumPy cosine-similarity index over previously cached queries.
+"""
+
+import os  # Environment configuration
+import re  # Query tokenisation
+import threading  # Guards the embedding index
+
+from utils.cache import TTLCache  # TTL + LRU storage
+
+try:
+    import numpy as np  # Vector index for semantic matching (optional)
+except ImportError:  # pragma: no cover - only needed for semantic matching
+    np = None
+
+def normalize_query(query):
+    """
+    Canonical cache key for a research query
+
+    Collapses case, punctuation and whitespace only. Word order is kept
+    ("dog bites man" is not "man bites dog"); looser matches are left to
+    the embedding index and its similarity threshold.
+    """
+    words = re.findall(r"[a-z0-9]+", query.lower())
+    return " ".join(words) or query.strip().lower()
+
+
+def response_size(response):
+    """Approximate in-memory footprint of a cached response in bytes"""
+    if hasattr(response, "model_dump_json"):
+        return len(response.model_dump_json().encode("utf-8"))
+    return len(str(response).encode("utf-8"))
+
+
+class EmbeddingIndex:
+    """
+    Brute-force cosine similarity search over unit-normalised vectors
+
+    Adequate for the few thousand entries a result cache holds; the
+    matrix is rebuilt lazily after inserts and removals.
+    """
+
+    def __init__(self):
+        if np is None:
+            raise ImportError("numpy is required for semantic cache matching")
+        self._vectors = {}  # key -> unit vector
+        self._keys = []
+        self._matrix = None
+        self._lock = threading.Lock()
+
+    def add(self, key, vector):
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        if not norm:
+            return
+        with self._lock:
+            self._vectors[key] = vector / norm
+            self._matrix = None  # Rebuild on next search
+
+    def remove(self, key):
+        with self._lock:
+            if self._vectors.pop(key, None) is not None:
+                self._matrix = None
+
+    def search(self, vector):
+        """Return (key, cosine similarity) of the closest entry, or (None, 0.0)"""
+        vector = np.asarray(vector, dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        with self._lock:
+            if not self._vectors or not norm:
+                return None, 0.0
+            if self._matrix is None:
+                self._keys = list(self._vectors)
+                self._matrix = np.stack([self._vectors[key] for key in self._keys])
+            scores = self._matrix @ (vector / norm)
+            best = int(np.argmax(scores))
+            return self._keys[best], float(scores[best])
+
+
+class ResultCache:
+    """
+    Research response cache with exact and semantic lookup
+
+    Parameters:
+    - max_entries / ttl / max_bytes: Passed to the underlying TTLCache
+    - embed (callable): Optional text -> vector function enabling
+      similarity matches
+    - similarity (float): Minimum cosine similarity for a semantic hit
+    """
+
+    def __init__(self, max_entries=512, ttl=3600, max_bytes=16 * 1024 * 1024,
+                 embed=None, similarity=0.92):
+        self.embed = embed
+        self.similarity = similarity
+        self.index = EmbeddingIndex() if embed is not None else None
+        self._cache = TTLCache(
+            max_entries=max_entries,
+            ttl=ttl,
+            max_bytes=max_bytes,
+            sizeof=response_size,
+            on_evict=self.index.remove if self.index is not None else None,
+        )
+        self._vectors = TTLCache(max_entries=256, ttl=300)  # Reuse get() embeddings in put()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, query):
+        """Return a cached response for the query or None"""
+        key = normalize_query(query)
+        response = self._cache.get(key)
+        if response is None and self.index is not None:
+            vector = self._embed(key, query)
+            if vector is not None:
+                match, score = self.index.search(vector)
+                if match is not None and score >= self.similarity:
+                    response = self._cache.get(match)
+                    if response is not None:
+                        with self._lock:
+                            self.semantic_hits += 1
+        with self._lock:
+            if response is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return response
+
+    def put(self, query, response):
+        """Store a parsed response under the query's normalised key"""
+        key = normalize_query(query)
+        self._cache.set(key, response)
+        if self.index is not None:
+            vector = self._embed(key, query)
+            if vector is not None:
+                self.index.add(key, vector)
+
+    def stats(self):
+        """Hit/miss counters plus size information"""
+        stats = self._cache.stats()
+        with self._lock:
+            stats.update(
+                hits=self.hits, semantic_hits=self.semantic_hits, misses=self.misses
+            )
+        return stats
+
+    def _embed(self, key, query):
+        vector = self._vectors.get(key)
+        if vector is None:
+            try:
+                vector = self.embed(query)
+            except Exception as e:
+                print("Embedding lookup failed:", e)  # Degrade to exact matching
+                return None
+            self._vectors.set(key, vector)
+        return vector
+
+
+def create_result_cache():
+    """
+    Build the process-wide result cache from the environment
+
+    Environment:
+    - RESEARCH_CACHE_ENABLED: "0" disables caching entirely
+    - RESEARCH_CACHE_TTL / RESEARCH_CACHE_MAX_ENTRIES / RESEARCH_CACHE_MAX_BYTES
+    - RESEARCH_CACHE_SEMANTIC: "1" enables embedding similarity matches
+    - RESEARCH_CACHE_SIMILARITY: Cosine threshold (default 0.92)
+    - RESEARCH_CACHE_EMBEDDING_MODEL: OpenAI embedding model name
+    """
+    if os.environ.get("RESEARCH_CACHE_ENABLED", "1") == "0":
+        return None
+
+    embed = None
+    if os.environ.get("RESEARCH_CACHE_SEMANTIC", "0") == "1":
+        from langchain_openai import OpenAIEmbeddings  # Only needed when enabled
+
+        embed = OpenAIEmbeddings(
+            model=os.environ.get("RESEARCH_CACHE_EMBEDDING_MODEL", "text-embedding-3-small")
+        ).embed_query
+
+    return ResultCache(
+        max_entries=int(os.environ.get("RESEARCH_CACHE_MAX_ENTRIES", "512")),
+        ttl=float(os.environ.get("RESEARCH_CACHE_TTL", "3600")),
+        max_bytes=int(os.environ.get("RESEARCH_CACHE_MAX_BYTES", str(16 * 1024 * 1024))),
+        embed=embed,
+        similarity=float(os.environ.get("RESEARCH_CACHE_SIMILARITY", "0.92")),
+    )
+
+
+"""
+Cache Behaviour Notes:
+- Keys are per process; each worker warms its own cache
+- Semantic matches compare the incoming query against the queries that
+  produced cached entries, never against the cached summaries
+- Entries whose serialized response exceeds the byte budget are skipped
+"""
@@ -0,0 +1,311 @@
+"""
+Evidence Retrieval - Parallel Sources, Deduplication and Ranking
+
+Replaces "one search, one unranked blob" with a retrieval stage:
+
+1. Every configured source (DuckDuckGo, Wikipedia, or any callable
+   query -> documents) is queried in parallel, each behind its own
+   cache / coalescing / rate limiter (utils.search.CachedSearch)
+2. Documents are split into passages and near-duplicates are dropped
+   with shingling + MinHash (utils.dedup)
+3. Passages are ranked against the query with a local BM25
+   (utils.ranking) and packed into one evidence pack within a token
+   budget, each passage labelled with its source and URL
+
+The agent gets all of this through a single tool call, so it needs
+fewer iterations and sees less redundant text.
+"""
+
+import asyncio  # Async tool entry point
+import os  # Environment configuration
+import threading  # Shared fetch pool
+import time  # Per-source latency
+from concurrent.futures import ThreadPoolExecutor, wait  # Parallel fan-out
+
+from utils.dedup import dedupe  # Near-duplicate passages
+from utils.metrics import RETRIEVAL_ERRORS, RETRIEVAL_PASSAGES, RETRIEVAL_SECONDS
+from utils.ranking import BM25, split_passages  # Passage relevance
+from utils.tokens import estimate_tokens, truncate_tokens  # Pack budget
+
+WIKIPEDIA_API = "https://{lang}.wikipedia.org/w/api.php"
+
+
+# -----------------------------------------------------------------------------
+# Sources (query -> list of {"title", "url", "text"} documents)
+# -----------------------------------------------------------------------------
+class DuckDuckGoSource:
+    """Web search results as documents (title, link and snippet)"""
+
+    name = "duckduckgo"
+
+    def __init__(self, max_results=6):
+        from utils.search import DuckDuckGoBackend
+
+        self.backend = DuckDuckGoBackend(max_results=max_results)
+
+    def __call__(self, query):
+        return [
+            {"title": r.get("title", ""), "url": r.get("href", ""), "text": r.get("body", "")}
+            for r in self.backend.results(query)
+        ]
+
+
+class WikipediaSource:
+    """
+    Wikipedia article intros through the shared "wikipedia" httpx pool
+
+    One API round trip: a full-text search generator with plain-text
+    intro extracts and canonical URLs for the top `max_pages` articles.
+    """
+
+    name = "wikipedia"
+
+    def __init__(self, max_pages=3, max_chars=4000, lang="en"):
+        self.max_pages = max_pages
+        self.max_chars = max_chars
+        self.url = WIKIPEDIA_API.format(lang=lang)
+
+    def __call__(self, query):
+        from utils.http_clients import get_http_client
+
+        response = get_http_client("wikipedia").get(
+            self.url,
+            params={
+                "action": "query",
+                "format": "json",
+                "formatversion": "2",
+                "generator": "search",
+                "gsrsearch": query,
+                "gsrlimit": self.max_pages,
+                "prop": "extracts|info",
+                "inprop": "url",
+                "exintro": "1",
+                "explaintext": "1",
+                "exlimit": self.max_pages,
+            },
+            headers={"User-Agent": "ResearchAgent/1.0"},
+        )
+        response.raise_for_status()
+        pages = response.json().get("query", {}).get("pages", [])
+        pages.sort(key=lambda page: page.get("index", 0))  # Search rank order
+        return [
+            {
+                "title": page.get("title", ""),
+                "url": page.get("fullurl", ""),
+                "text": page.get("extract", "")[: self.max_chars],
+            }
+            for page in pages
+            if page.get("extract")
+        ]
+
+
+class StubSource:
+    """Deterministic offline source for tests and benchmarks"""
+
+    def __init__(self, name, documents=None, latency=0.0):
+        self.name = name
+        self.documents = documents
+        self.latency = latency
+
+    def __call__(self, query):
+        if self.latency:
+            time.sleep(self.latency)
+        if self.documents is not None:
+            return list(self.documents)
+        return [{
+            "title": f"{self.name}: {query}",
+            "url": f"https://example.com/{self.name}",
+            "text": f"Stub {self.name} evidence about {query}. It has two sentences.",
+        }]
+
+
+# -----------------------------------------------------------------------------
+# Retriever
+# -----------------------------------------------------------------------------
+_pool_lock = threading.Lock()
+_pool = {}
+
+
+def _fetch_pool():
+    # One pool per process, created on first use (never inherited by forks)
+    key = os.getpid()
+    if key not in _pool:
+        with _pool_lock:
+            if key not in _pool:
+                _pool.clear()
+                _pool[key] = ThreadPoolExecutor(
+                    max_workers=int(os.environ.get("RETRIEVAL_WORKERS", "8")),
+                    thread_name_prefix="retrieval",
+                )
+    return _pool[key]
+
+
+class Retriever:
+    """
+    Parallel multi-source retrieval producing a ranked evidence pack
+
+    Parameters:
+    - sources (dict): name -> callable(query) -> documents (typically a
+      CachedSearch.run, for caching, coalescing and rate limiting)
+    - budget (int): Token budget of the evidence pack
+    - passage_tokens (int): Target passage size
+    - threshold (float): MinHash similarity treated as duplicate
+    - timeout (float): Seconds to wait for the slowest source
+    """
+
+    def __init__(self, sources, budget=400, passage_tokens=80, threshold=0.6, timeout=10.0):
+        self.sources = sources
+        self.budget = budget
+        self.passage_tokens = passage_tokens
+        self.threshold = threshold
+        self.timeout = timeout
+
+    def fetch(self, query):
+        """
+        Query every source in parallel
+
+        Returns:
+        - list: Documents tagged with their source, in source order; failed
+          or late sources contribute nothing (late results still warm the
+          source's cache for the next call)
+        """
+        futures = {
+            name: _fetch_pool().submit(self._timed, name, source, query)
+            for name, source in self.sources.items()
+        }
+        done, _ = wait(futures.values(), timeout=self.timeout)
+        documents = []
+        for name, future in futures.items():
+            if future not in done:
+                RETRIEVAL_ERRORS.inc(source=name, reason="timeout")
+                print(f"Retrieval source {name} timed out")  # Server-side logging
+                continue
+            try:
+                results = future.result()
+            except Exception as e:
+                RETRIEVAL_ERRORS.inc(source=name, reason="error")
+                print(f"Retrieval source {name} failed:", e)  # Server-side logging
+                continue
+            documents.extend(dict(doc, source=name) for doc in results)
+        return documents
+
+    @staticmethod
+    def _timed(name, source, query):
+        started = time.perf_counter()
+        try:
+            return source(query)
+        finally:
+            RETRIEVAL_SECONDS.observe(time.perf_counter() - started, source=name)
+
+    def passages(self, documents):
+        """Split documents into passages of about passage_tokens tokens"""
+        passages = []
+        for doc in documents:
+            current = []
+            for sentence in split_passages(doc.get("text", "")):
+                current.append(sentence)
+                if estimate_tokens(" ".join(current)) >= self.passage_tokens:
+                    passages.append(dict(doc, text=" ".join(current)))
+                    current = []
+            if current:
+                passages.append(dict(doc, text=" ".join(current)))
+        return passages
+
+    def select(self, query, passages):
+        """
+        Deduplicate, rank and pack passages within the budget
+
+        Returns:
+        - list: Selected passages, most relevant first
+        """
+        unique = [passages[i] for i in dedupe([p["text"] for p in passages], self.threshold)]
+        scores = BM25([f"{p['title']} {p['text']}" for p in unique]).scores(query)
+        order = sorted(range(len(unique)), key=lambda i: (-scores[i], i))
+        if any(scores):
+            order = [i for i in order if scores[i] > 0]  # Drop passages sharing no query term
+
+        selected = []
+        used = 0
+        for index in order:
+            passage = unique[index]
+            cost = estimate_tokens(passage["text"]) + estimate_tokens(passage["url"]) + 8
+            if used + cost > self.budget:
+                continue
+            selected.append(passage)
+            used += cost
+
+        RETRIEVAL_PASSAGES.inc(len(passages), stage="fetched")
+        RETRIEVAL_PASSAGES.inc(len(unique), stage="unique")
+        RETRIEVAL_PASSAGES.inc(len(selected), stage="selected")
+        return selected
+
+    def run(self, query):
+        """
+        Evidence pack for a query (the agent tool entry point)
+
+        Returns:
+        - str: Numbered passages with source name, title and URL
+        """
+        selected = self.select(query, self.passages(self.fetch(query)))
+        if not selected:
+            return f"No evidence found for: {query}"
+        lines = [f"Evidence for: {query}"]
+        for number, passage in enumerate(selected, 1):
+            lines.append(f"[{number}] {passage['title']} ({passage['source']}) {passage['url']}")
+            lines.append(truncate_tokens(passage["text"], self.passage_tokens * 2))
+        return "\n".join(lines)
+
+    async def arun(self, query):
+        """Asyncio entry point (sources are blocking clients)"""
+        return await asyncio.to_thread(self.run, query)
+
+
+SOURCES = {"duckduckgo": DuckDuckGoSource, "wikipedia": WikipediaSource}
+
+
+def create_retriever(sources=None):
+    """
+    Build the evidence retriever from the environment
+
+    Environment:
+    - RETRIEVAL_SOURCES: Comma-separated sources (default "duckduckgo,wikipedia";
+      "stub" for offline runs)
+    - RETRIEVAL_TOKENS: Evidence pack budget in tokens (default 400)
+    - RETRIEVAL_PASSAGE_TOKENS: Passage size (default 80)
+    - RETRIEVAL_DEDUP_THRESHOLD: MinHash similarity for duplicates (0.6)
+    - RETRIEVAL_TIMEOUT: Seconds to wait for sources (default 10)
+    - SEARCH_*: Cache, rate and retry settings applied to every source
+    - FETCH_CACHE*: Shared on-disk cache of raw source results
+    """
+    from utils.search import create_cached_search
+
+    if sources is None:
+        names = [n.strip() for n in os.environ.get(
+            "RETRIEVAL_SOURCES", "duckduckgo,wikipedia").split(",") if n.strip()]
+        sources = {}
+        for name in names:
+            if name == "stub":
+                sources[name] = StubSource(name)
+            elif name in SOURCES:
+                sources[name] = SOURCES[name]()
+            else:
+                raise ValueError(f"Unknown retrieval source: {name}")
+        sources = {name: create_cached_search(source, source=name).run for name, source in sources.items()}
+    return Retriever(
+        sources,
+        budget=int(os.environ.get("RETRIEVAL_TOKENS", "400")),
+        passage_tokens=int(os.environ.get("RETRIEVAL_PASSAGE_TOKENS", "80")),
+        threshold=float(os.environ.get("RETRIEVAL_DEDUP_THRESHOLD", "0.6")),
+        timeout=float(os.environ.get("RETRIEVAL_TIMEOUT", "10")),
+    )
+
+
+"""
+Adding a Source:
+- Any callable query -> [{"title", "url", "text"}, ...] works; register
+  it in SOURCES (or pass sources= to create_retriever)
+- Put blocking network clients behind CachedSearch so repeated queries
+  are served from memory and the provider's rate limits are respected
+- Keep RETRIEVAL_TOKENS at or below COMPACTION_TOOL_TOKENS (both default
+  to 400) so the scratchpad compactor passes evidence packs through verbatim
+"""
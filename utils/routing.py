@@ -0,0 +1,317 @@
+"""
+Model Routing - Cheap Tier First, Escalate on Demand
+
+Queries are classified before the agent runs and sent to one of several
+model tiers:
+
+1. fast - small model, evidence tool only, few iterations and tool calls
+   (definitions, single-fact lookups)
+2. strong - larger model with every tool and the full run budget
+   (comparisons, analysis, multi-part questions, follow-ups)
+
+Classification is a local heuristic by default (no model call), or a
+one-word answer from the fast tier's model (ROUTING_CLASSIFIER=model).
+A run escalates to the next tier when its answer cannot be parsed, fails
+the quality checks, or was truncated by the tier's iteration/tool budget.
+
+Every tier is an OpenAI-compatible endpoint (model, base URL, API key),
+so a local stand-in server can replace the real provider in tests.
+"""
+
+import os  # Environment configuration
+import re  # Query features
+import threading  # Shared router
+import time  # Per-tier latency
+
+from utils.metrics import (  # Routing decisions, latency and cost per tier
+    ROUTING_DECISIONS,
+    ROUTING_ESCALATIONS,
+    TIER_COST,
+    TIER_SECONDS,
+)
+
+# USD per million (input, output) tokens; override with ROUTING_<TIER>_PRICE
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+}
+
+DEFAULT_TIERS = {
+    "fast": {"model": "gpt-4o-mini", "max_iterations": 3, "max_tool_calls": 3,
+             "tools": "research_evidence"},
+    "strong": {"model": "gpt-4o"},
+}
+
+# Signals of questions that need several sources or reasoning across them
+COMPLEX_MARKERS = (
+    "compare", "comparison", "versus", " vs", "difference between", "why ",
+    "how does", "how do", "analy", "impact", "implication", "trade-off", "tradeoff",
+    "pros and cons", "evaluate", "assess", "explain", "history of", "future of",
+    "strategy", "relationship between", "literature", "in depth",
+)
+SIMPLE_PREFIXES = (
+    "what is", "what's", "what are", "who is", "who was", "when did", "when was",
+    "where is", "define", "definition of", "how many", "how old", "capital of",
+)
+ESCALATION_MIN_SECONDS = 10  # Deadline left for an escalated attempt to be worth it
+
+
+class Tier:
+    """
+    One model configuration
+
+    Parameters:
+    - name (str): Tier label (metrics, timings)
+    - model (str): Model name sent to the endpoint
+    - base_url (str): OpenAI-compatible endpoint (None: api.openai.com)
+    - api_key (str): Endpoint key (None: OPENAI_API_KEY)
+    - max_iterations / max_tool_calls (int): Run budget overrides (None:
+      the AGENT_* defaults)
+    - tools (tuple): Tool names offered to the agent (None: all tools)
+    - price (tuple): USD per million (input, output) tokens
+    """
+
+    def __init__(self, name, model, base_url=None, api_key=None, max_iterations=None,
+                 max_tool_calls=None, tools=None, price=None):
+        self.name = name
+        self.model = model
+        self.base_url = base_url
+        self.api_key = api_key
+        self.max_iterations = max_iterations
+        self.max_tool_calls = max_tool_calls
+        self.tools = tuple(tools) if tools else None
+        self.price = price or MODEL_PRICES.get(model, (0.0, 0.0))
+
+    def cost(self, tokens_in, tokens_out):
+        return (tokens_in * self.price[0] + tokens_out * self.price[1]) / 1_000_000
+
+
+def classify(query, follow_up=False):
+    """
+    Heuristic query complexity
+
+    Returns:
+    - (str, int): "simple" or "complex", and the score behind it
+    """
+    text = " ".join(query.lower().split())
+    words = len(text.split())
+    score = 0
+    if words > 20:
+        score += 2
+    elif words > 10:
+        score += 1
+    if any(marker in f" {text}" for marker in COMPLEX_MARKERS):
+        score += 2
+    if text.count("?") > 1 or ";" in text or len(re.findall(r"\band\b", text)) >= 2:
+        score += 1  # Several questions in one
+    if follow_up:
+        score += 1  # Needs the conversation as well as new evidence
+    if words <= 10 and text.startswith(SIMPLE_PREFIXES):
+        score -= 2
+    return ("complex" if score >= 2 else "simple"), score
+
+
+class Router:
+    """
+    Picks a tier per query and decides on escalation
+
+    Parameters:
+    - tiers (list): Tiers from cheapest to strongest
+    - classifier (str): "heuristic" or "model"
+    - min_summary_chars (int): Shorter answers fail the quality check
+    """
+
+    def __init__(self, tiers, classifier="heuristic", min_summary_chars=200):
+        self.tiers = list(tiers)
+        self.classifier = classifier
+        self.min_summary_chars = min_summary_chars
+
+    @property
+    def enabled(self):
+        return len(self.tiers) > 1
+
+    def route(self, query, follow_up=False):
+        """First tier for a query (recorded in model_routing_decisions_total)"""
+        if not self.enabled:
+            return self.tiers[0]
+        label, method = classify(query, follow_up)[0], "heuristic"
+        if self.classifier == "model":
+            label, method = self._model_label(query, label)
+        tier = self.tiers[0] if label == "simple" else self.tiers[-1]
+        ROUTING_DECISIONS.inc(tier=tier.name, label=label, method=method)
+        return tier
+
+    def _model_label(self, query, fallback):
+        from utils.agent_setup import get_llm
+
+        try:
+            answer = get_llm(self.tiers[0]).invoke(
+                "Classify the research question. Reply with exactly one word: "
+                "simple (one fact or definition) or complex (needs several "
+                f"sources or analysis).\n\nQuestion: {query}"
+            ).content.strip().lower()
+        except Exception as e:
+            print("Routing classifier failed:", e)  # Server-side logging
+            return fallback, "heuristic"
+        return ("simple" if answer.startswith("simple") else "complex"), "model"
+
+    def apply(self, tier, budget, timings):
+        """
+        Start an attempt: the run budget gets the tier's limits
+
+        Returns:
+        - tuple: Start time and token counters, for record()
+        """
+        budget.restart(tier.max_iterations, tier.max_tool_calls)
+        return time.perf_counter(), (timings.llm_tokens_in, timings.llm_tokens_out)
+
+    def problem(self, response, budget):
+        """
+        Why an answer should be retried on a stronger tier (None: accept it)
+
+        Returns:
+        - str: "truncated", "short_summary" or "no_sources", or None
+        """
+        if budget.reason in ("iterations", "tool_budget"):
+            return "truncated"
+        if len(response.summary) < self.min_summary_chars:
+            return "short_summary"
+        if not response.sources:
+            return "no_sources"
+        return None
+
+    def escalate(self, tier, cause, budget):
+        """
+        Next tier after a failed attempt, or None to keep the result
+
+        Escalation needs a stronger tier and enough of the deadline left.
+        """
+        index = self.tiers.index(tier)
+        if cause is None or index + 1 >= len(self.tiers):
+            return None
+        remaining = budget.remaining()
+        if budget.reason == "deadline" or (remaining is not None and remaining < ESCALATION_MIN_SECONDS):
+            return None
+        following = self.tiers[index + 1]
+        ROUTING_ESCALATIONS.inc(source=tier.name, target=following.name, cause=cause)
+        return following
+
+    def record(self, tier, attempt, timings, outcome):
+        """Latency, token cost and outcome of one attempt on a tier"""
+        started, tokens = attempt
+        elapsed = time.perf_counter() - started
+        tokens_in = timings.llm_tokens_in - tokens[0]
+        tokens_out = timings.llm_tokens_out - tokens[1]
+        cost = tier.cost(tokens_in, tokens_out)
+        TIER_SECONDS.observe(elapsed, tier=tier.name)
+        TIER_COST.inc(cost, tier=tier.name)
+        timings.add_attempt({
+            "tier": tier.name,
+            "model": tier.model,
+            "seconds": round(elapsed, 4),
+            "tokens_in": tokens_in,
+            "tokens_out": tokens_out,
+            "cost_usd": round(cost, 6),
+            "outcome": outcome,
+        })
+
+
+def _price(value):
+    if not value:
+        return None
+    price_in, price_out = value.split(",")
+    return float(price_in), float(price_out)
+
+
+def _optional_int(value):
+    return int(value) if value not in (None, "") else None
+
+
+def load_tiers():
+    """
+    Tiers from the environment, cheapest first
+
+    Environment:
+    - ROUTING_TIERS: Comma-separated tier names (default "fast,strong")
+    - ROUTING_<TIER>_MODEL / _BASE_URL / _API_KEY: Endpoint of the tier
+    - ROUTING_<TIER>_MAX_ITERATIONS / _MAX_TOOL_CALLS: Run budget
+    - ROUTING_<TIER>_TOOLS: Comma-separated tool names (default: all)
+    - ROUTING_<TIER>_PRICE: "input,output" USD per million tokens
+    """
+    tiers = []
+    names = os.environ.get("ROUTING_TIERS", "fast,strong")
+    for name in [n.strip() for n in names.split(",") if n.strip()]:
+        defaults = DEFAULT_TIERS.get(name, {})
+
+        def env(key, default=None):
+            return os.environ.get(f"ROUTING_{name.upper()}_{key}", default)
+
+        tools = env("TOOLS", defaults.get("tools"))
+        tiers.append(Tier(
+            name,
+            model=env("MODEL", defaults.get("model", "gpt-4o-mini")),
+            base_url=env("BASE_URL"),
+            api_key=env("API_KEY"),
+            max_iterations=_optional_int(env("MAX_ITERATIONS", defaults.get("max_iterations"))),
+            max_tool_calls=_optional_int(env("MAX_TOOL_CALLS", defaults.get("max_tool_calls"))),
+            tools=[t.strip() for t in tools.split(",") if t.strip()] if tools else None,
+            price=_price(env("PRICE")),
+        ))
+    return tiers
+
+
+DEFAULT_TIER = Tier("default", "gpt-4o-mini")  # Routing off: the shared executor
+
+
+def create_router():
+    """
+    Build the router from the environment
+
+    Environment:
+    - ROUTING: "off" (default: one gpt-4o-mini executor for every query)
+      or "on" (opt-in: the strong tier runs gpt-4o unless configured)
+    - ROUTING_CLASSIFIER: "heuristic" (default) or "model"
+    - ROUTING_MIN_SUMMARY_CHARS: Quality check threshold (default 200)
+    - ROUTING_TIERS and ROUTING_<TIER>_*: See load_tiers()
+    """
+    if os.environ.get("ROUTING", "off").lower() != "on":
+        return Router([DEFAULT_TIER])
+    return Router(
+        load_tiers() or [DEFAULT_TIER],
+        classifier=os.environ.get("ROUTING_CLASSIFIER", "heuristic").lower(),
+        min_summary_chars=int(os.environ.get("ROUTING_MIN_SUMMARY_CHARS", "200")),
+    )
+
+
+_lock = threading.Lock()
+_router = {}
+
+
+def get_router():
+    """
+    Process-wide router, built on first use
+
+    An injected executor (set_agent_executor: benchmarks, tests) serves
+    every query, so routing is bypassed while one is set.
+    """
+    from utils.agent_setup import executor_pinned
+
+    if executor_pinned():
+        return Router([DEFAULT_TIER])
+    if "default" not in _router:
+        with _lock:
+            if "default" not in _router:
+                _router["default"] = create_router()
+    return _router["default"]
+
+
+"""
+Routing Notes:
+- model_routing_decisions_total{tier, label, method}: first tier per query
+- model_routing_escalations_total{source, target, cause}: retries on a
+  stronger tier (parse_failed / truncated / short_summary / no_sources)
+- model_tier_seconds{tier} and model_tier_cost_usd_total{tier}: latency
+  and estimated spend per attempt (provider-reported tokens x price)
+- The per-request breakdown is returned as timings.routing
+- Escalated attempts share the request's deadline and cancellation
+"""
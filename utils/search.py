@@ -0,0 +1,291 @@
+"""
+Memoized, Rate-Aware Web Search
+
+Wraps a search backend (DuckDuckGo by default) with:
+1. TTL + LRU result cache - repeated searches never leave the process
+2. Single-flight coalescing - identical in-flight queries share one call
+3. Token bucket limiter with retry/backoff - stays under provider limits
+4. Optional shared on-disk second level (utils.disk_cache) - results
+   survive restarts and are shared by all worker processes
+
+Backends are plain callables (query -> str), so a local stub can stand
+in for DuckDuckGo in tests and benchmarks.
+"""
+
+import asyncio  # Async tool entry point
+import os  # Environment configuration
+import random  # Backoff jitter
+import threading  # Single-flight bookkeeping
+import time  # Backoff and stub latency
+
+from utils.cache import TTLCache  # TTL + LRU storage
+from utils.rate_limit import TokenBucket  # Outbound request pacing
+
+
+def normalize_search_query(query):
+    """Cache key for a search string (case and whitespace insensitive)"""
+    return " ".join(str(query).lower().split())
+
+
+class _InFlight:
+    """Result slot shared by the leader and followers of one query"""
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class CachedSearch:
+    """
+    Search client with caching, request coalescing and rate limiting
+
+    Parameters:
+    - backend (callable): query -> result text
+    - ttl (float): Seconds a cached result stays valid
+    - max_entries (int): LRU size of the result cache
+    - rate (float): Sustained outbound searches per second
+    - burst (int): Maximum outbound burst
+    - max_retries (int): Retries after a failed backend call
+    - backoff (float): Base delay for exponential backoff in seconds
+    - source (str): Name of the results in the on-disk cache
+    - disk (callable): Returns the shared DiskCache (or None); consulted
+      after an in-process miss, before calling the backend
+    """
+
+    def __init__(self, backend, ttl=900, max_entries=2048, rate=1.0, burst=5,
+                 max_retries=3, backoff=1.0, source="search", disk=None):
+        self.backend = backend
+        self.source = source
+        self.disk = disk
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.cache = TTLCache(max_entries=max_entries, ttl=ttl)
+        self.limiter = TokenBucket(rate=rate, capacity=burst)
+        self._inflight = {}  # key -> _InFlight
+        self._lock = threading.Lock()
+        self.backend_calls = 0
+        self.coalesced = 0
+        self.retries = 0
+        self.disk_hits = 0
+
+    def run(self, query):
+        """
+        Search with the same signature as DuckDuckGoSearchRun.run
+
+        Parameters:
+        - query (str): Search string
+
+        Returns:
+        - str: Search result text (possibly served from cache)
+        """
+        key = normalize_search_query(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return cached
+
+        with self._lock:
+            slot = self._inflight.get(key)
+            leader = slot is None
+            if leader:
+                slot = self._inflight[key] = _InFlight()
+            else:
+                self.coalesced += 1
+
+        if not leader:
+            slot.done.wait()  # Share the leader's outbound call
+            if slot.error is not None:
+                raise slot.error
+            return slot.result
+
+        try:
+            slot.result = self._load(key, query)
+            self.cache.set(key, slot.result)
+            return slot.result
+        except Exception as e:
+            slot.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._inflight[key]
+            slot.done.set()
+
+    async def arun(self, query):
+        """
+        Asyncio entry point for async agent runs
+
+        Runs the blocking lookup in a worker thread (the DuckDuckGo client
+        has no native async API), so cache, coalescing and rate limiting
+        behave exactly as in run().
+        """
+        return await asyncio.to_thread(self.run, query)
+
+    def _load(self, key, query):
+        """On-disk cache lookup, falling back to the backend (leader only)"""
+        disk = self.disk() if self.disk else None
+        if disk is None:
+            return self._fetch(query)
+        try:
+            cached = disk.get(self.source, key)
+        except Exception as e:  # A broken cache file must not fail the search
+            print("Fetch cache read failed:", e)  # Server-side logging
+            cached = None
+        if cached is not None:
+            with self._lock:
+                self.disk_hits += 1
+            return cached
+        result = self._fetch(query)
+        try:
+            disk.set(self.source, key, result)
+        except Exception as e:
+            print("Fetch cache write failed:", e)  # Server-side logging
+        return result
+
+    def _fetch(self, query):
+        """Rate-limited backend call with exponential backoff"""
+        attempt = 0
+        while True:
+            self.limiter.acquire()
+            try:
+                with self._lock:
+                    self.backend_calls += 1
+                return self.backend(query)
+            except Exception as e:
+                if attempt >= self.max_retries:
+                    raise
+                delay = self.backoff * (2 ** attempt) * (1 + random.random())  # Jittered
+                print(f"Search failed ({e}), retrying in {delay:.1f}s")  # Server-side logging
+                with self._lock:
+                    self.retries += 1
+                attempt += 1
+                time.sleep(delay)
+
+    def stats(self):
+        """Cache counters plus outbound call/coalescing/retry counts"""
+        stats = self.cache.stats()
+        with self._lock:
+            stats.update(
+                backend_calls=self.backend_calls,
+                coalesced=self.coalesced,
+                retries=self.retries,
+                disk_hits=self.disk_hits,
+            )
+        return stats
+
+
+# -----------------------------------------------------------------------------
+# Backends
+# -----------------------------------------------------------------------------
+class StubSearchBackend:
+    """
+    Deterministic offline backend for tests and benchmarks
+
+    Parameters:
+    - latency (float): Simulated round-trip time in seconds
+    - size (int): Approximate length of each result in characters
+    """
+
+    def __init__(self, latency=0.0, size=500):
+        self.latency = latency
+        self.size = size
+        self.calls = 0
+
+    def __call__(self, query):
+        self.calls += 1
+        if self.latency:
+            time.sleep(self.latency)
+        text = f"Stub result for '{query}'. https://example.com/{normalize_search_query(query).replace(' ', '-')} "
+        return (text * (self.size // len(text) + 1))[: self.size]
+
+
+class DuckDuckGoBackend:
+    """
+    DuckDuckGo text search with one keep-alive session per thread
+
+    DuckDuckGoSearchRun opens a new DDGS client (and TLS connection) for
+    every query; reusing the session avoids the repeated handshakes.
+    Output matches DuckDuckGoSearchAPIWrapper.run.
+    """
+
+    def __init__(self, max_results=4):
+        self.max_results = max_results
+        self._local = threading.local()
+
+    def _session(self):
+        session = getattr(self._local, "session", None)
+        if session is None:
+            from duckduckgo_search import DDGS
+            from utils.http_clients import backend_config
+
+            timeout = backend_config("search")["read_timeout"]
+            session = self._local.session = DDGS(timeout=max(1, int(timeout)))
+        return session
+
+    def results(self, query):
+        """Structured results: list of {"title", "href", "body"} dicts"""
+        from utils.http_clients import get_pool_stats
+
+        stats = get_pool_stats("search")
+        stats.started()
+        try:
+            results = self._session().text(query, max_results=self.max_results)
+        except Exception:
+            stats.finished(failed=True)
+            self._local.session = None  # Reconnect on the next attempt
+            raise
+        stats.finished()
+        return results or []
+
+    def __call__(self, query):
+        results = self.results(query)
+        if not results:
+            return "No good DuckDuckGo Search Result was found"
+        return " ".join(r["body"] for r in results)
+
+
+def create_search_backend():
+    """
+    Select the raw search backend from the environment
+
+    Environment:
+    - SEARCH_BACKEND: "duckduckgo" (default) or "stub"
+    - SEARCH_STUB_LATENCY / SEARCH_STUB_SIZE: Stub behaviour
+    """
+    name = os.environ.get("SEARCH_BACKEND", "duckduckgo").lower()
+    if name == "stub":
+        return StubSearchBackend(
+            latency=float(os.environ.get("SEARCH_STUB_LATENCY", "0")),
+            size=int(os.environ.get("SEARCH_STUB_SIZE", "500")),
+        )
+    if name == "duckduckgo":
+        return DuckDuckGoBackend()
+    raise ValueError(f"Unknown SEARCH_BACKEND: {name}")
+
+
+def create_cached_search(backend=None, source="search"):
+    """
+    Build the shared search client from the environment
+
+    Parameters:
+    - backend (callable): Raw backend (default: create_search_backend())
+    - source (str): Name used for TTLs and keys in the on-disk cache
+
+    Environment:
+    - SEARCH_CACHE_TTL / SEARCH_CACHE_MAX_ENTRIES: Result cache sizing
+    - SEARCH_RATE / SEARCH_BURST: Outbound searches per second / burst
+    - SEARCH_MAX_RETRIES / SEARCH_BACKOFF: Retry policy
+    - FETCH_CACHE*: Shared on-disk second level (see utils.disk_cache)
+    """
+    from utils.disk_cache import get_disk_cache
+
+    return CachedSearch(
+        backend or create_search_backend(),
+        ttl=float(os.environ.get("SEARCH_CACHE_TTL", "900")),
+        max_entries=int(os.environ.get("SEARCH_CACHE_MAX_ENTRIES", "2048")),
+        rate=float(os.environ.get("SEARCH_RATE", "1.0")),
+        burst=int(os.environ.get("SEARCH_BURST", "5")),
+        max_retries=int(os.environ.get("SEARCH_MAX_RETRIES", "3")),
+        backoff=float(os.environ.get("SEARCH_BACKOFF", "1.0")),
+        source=source,
+        disk=get_disk_cache,
+    )
@@ -0,0 +1,26 @@
+"""
+Summary Statistics Helpers
+
+Small, dependency-free helpers for latency reporting (batch summaries,
+benchmarks and metrics).
+"""
+
+
+def percentile(values, pct):
+    """
+    Linear-interpolated percentile of a sequence
+
+    Parameters:
+    - values (iterable): Numeric samples
+    - pct (float): Percentile in the range 0-100
+
+    Returns:
+    - float: The percentile value, or 0.0 for an empty sequence
+    """
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    rank = (len(ordered) - 1) * pct / 100.0
+    low = int(rank)
+    high = min(low + 1, len(ordered) - 1)
+    return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
@@ -0,0 +1,191 @@
+"""
+Server-Sent Events Streaming for Research Runs
+
+Bridges LangChain callbacks to an SSE response: the agent runs in a
+background thread while tool and token events are pushed through a
+queue and written to the client as soon as they happen.
+
+Event Types:
+- tool_start / tool_end: Tool invocations (search, save, ...)
+- token: Incremental LLM output delta (in tool-calling mode, the summary
+  text of the streamed ResearchResponse arguments)
+- result: Final parsed research response
+- error: Pipeline failure (stream ends afterwards)
+"""
+
+import json  # SSE payload encoding
+import queue  # Thread-safe event hand-off
+import re  # Answer text inside streamed tool arguments
+import threading  # Background agent execution
+
+from langchain_core.callbacks import BaseCallbackHandler  # LangChain event hooks
+
+from utils.budget import RunBudget, RunCancelled  # Deadlines and cancellation
+from utils.pipeline import run_research  # Shared research execution path
+from utils.structured_output import FINAL_ANSWER_TOOL  # Tool-mode final answers
+
+HEARTBEAT_SECONDS = 15  # Keep-alive comment interval (also detects disconnects)
+MAX_TOOL_OUTPUT_CHARS = 500  # Truncate tool output previews sent to the browser
+_SUMMARY_START = re.compile(r'"summary"\s*:\s*"')
+_ESCAPES = {'"': '"', "\\": "\\", "/": "/", "b": "\b", "f": "\f", "n": "\n", "r": "\r", "t": "\t"}
+
+
+def partial_summary(arguments):
+    """
+    Decoded summary text in a ResearchResponse argument prefix
+
+    Tool arguments arrive as JSON fragments; the summary string is
+    decoded as far as it has been received (an escape split across
+    fragments waits for the next one).
+    """
+    match = _SUMMARY_START.search(arguments)
+    if match is None:
+        return ""
+    text = []
+    index = match.end()
+    while index < len(arguments):
+        char = arguments[index]
+        if char == '"':
+            break  # End of the summary value
+        if char != "\\":
+            text.append(char)
+            index += 1
+            continue
+        escape = arguments[index + 1: index + 2]
+        if not escape or (escape == "u" and len(arguments) < index + 6):
+            break  # Incomplete escape: wait for more
+        if escape == "u":
+            text.append(chr(int(arguments[index + 2: index + 6], 16)))
+            index += 6
+        else:
+            text.append(_ESCAPES.get(escape, escape))
+            index += 2
+    return "".join(text)
+
+
+class StreamingCallbackHandler(BaseCallbackHandler):
+    """
+    Collects agent events into a queue for the SSE writer
+
+    Raising from a callback aborts the agent run, which is how a
+    cancelled stream stops spending tokens and tool calls.
+    """
+
+    raise_error = True  # Let RunCancelled propagate out of the agent
+
+    def __init__(self):
+        self.events = queue.Queue()
+        self.cancelled = threading.Event()
+        self._tool_names = {}  # run_id -> tool name
+        self._answers = {}  # LLM run_id -> [tool call index, arguments, streamed chars]
+
+    def cancel(self):
+        """Request cooperative cancellation of the running agent"""
+        self.cancelled.set()
+
+    def _check_cancelled(self):
+        if self.cancelled.is_set():
+            raise RunCancelled("Client disconnected")
+
+    def on_llm_new_token(self, token, chunk=None, run_id=None, **kwargs):
+        self._check_cancelled()
+        if token:
+            self.events.put(("token", {"delta": token}))
+        # Tool-calling mode: the answer arrives as ResearchResponse arguments
+        message = getattr(chunk, "message", None)
+        for call in getattr(message, "tool_call_chunks", None) or []:
+            self._answer_chunk(run_id, call)
+
+    def _answer_chunk(self, run_id, call):
+        answer = self._answers.get(run_id)
+        if answer is None:
+            if call.get("name") != FINAL_ANSWER_TOOL:
+                return
+            answer = self._answers[run_id] = [call.get("index"), "", 0]
+        elif call.get("index") != answer[0]:
+            return  # Another tool call in the same response
+        answer[1] += call.get("args") or ""
+        text = partial_summary(answer[1])
+        if len(text) > answer[2]:
+            self.events.put(("token", {"delta": text[answer[2]:]}))
+            answer[2] = len(text)
+
+    def on_llm_end(self, response, run_id=None, **kwargs):
+        self._answers.pop(run_id, None)
+
+    def on_tool_start(self, serialized, input_str, run_id=None, **kwargs):
+        self._check_cancelled()
+        name = (serialized or {}).get("name") or kwargs.get("name", "tool")
+        self._tool_names[run_id] = name
+        self.events.put(("tool_start", {"tool": name, "input": input_str}))
+
+    def on_tool_end(self, output, run_id=None, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        preview = str(output)[:MAX_TOOL_OUTPUT_CHARS]
+        self.events.put(("tool_end", {"tool": name, "output": preview}))
+
+    def on_tool_error(self, error, run_id=None, **kwargs):
+        name = self._tool_names.pop(run_id, kwargs.get("name", "tool"))
+        self.events.put(("tool_end", {"tool": name, "error": str(error)}))
+
+
+def format_sse(event, data):
+    """Encode one Server-Sent Event frame"""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+def stream_research(query, session_id=None):
+    """
+    Run the research pipeline and yield SSE frames as it progresses
+
+    Parameters:
+    - query (str): User research question
+    - session_id (str): Optional conversation memory key
+
+    Yields:
+    - str: Encoded SSE frames, ending with a "result" or "error" event
+
+    Closing the generator (client disconnect) cancels the agent run.
+    """
+    handler = StreamingCallbackHandler()
+    # Disconnects also stop the run between agent steps, not only at
+    # token and tool callbacks
+    budget = RunBudget.from_env(cancelled=handler.cancelled, cancel_reason="client_disconnected")
+    done = object()  # Sentinel marking the end of the run
+
+    def worker():
+        try:
+            result = run_research(query, callbacks=[handler], session_id=session_id, budget=budget)
+            handler.events.put(("result", result))
+        except RunCancelled:
+            pass  # Nobody is listening any more
+        except Exception as e:
+            print("Error in /research/stream:", e)  # Server-side logging
+            handler.events.put(("error", {"error": str(e)}))
+        finally:
+            handler.events.put(done)
+
+    threading.Thread(target=worker, name="research-stream", daemon=True).start()
+
+    try:
+        while True:
+            try:
+                item = handler.events.get(timeout=HEARTBEAT_SECONDS)
+            except queue.Empty:
+                yield ": keep-alive\n\n"  # SSE comment; write fails if client left
+                continue
+            if item is done:
+                break
+            yield format_sse(*item)
+    finally:
+        handler.cancel()  # No-op after completion, stops the agent on disconnect
+
+
+"""
+Client Notes:
+- EventSource cannot send Authorization headers, so the bundled frontend
+  reads the stream with fetch() and parses frames itself
+- Proxies must not buffer the response (X-Accel-Buffering: no is set)
+- Cancellation is cooperative: the run stops at the next token or tool
+  boundary after the client disconnects
+"""
@@ -0,0 +1,288 @@
+"""
+Structured Output - Schema-Enforced Answers with Local Repair
+
+The agent finishes by calling a ResearchResponse tool instead of writing
+JSON into free text, so the provider's tool-calling mode produces the
+arguments. When an answer still fails validation, the run is salvaged
+without repeating the agent loop:
+
+1. Strict parse with the PydanticOutputParser
+2. Local repair: lenient JSON extraction (code fences, surrounding prose,
+   trailing commas, Python literals, truncated output) and field coercion
+3. One formatting-only re-ask: the model converts its own answer to the
+   schema, with no tools and no research
+
+Only when all three fail is the run wasted; every outcome is counted in
+structured_output_total{outcome}.
+"""
+
+import ast  # Python-literal fallback for single-quoted dicts
+import json  # Answer payloads
+import re  # Fence stripping and list splitting
+
+from langchain_core.agents import AgentFinish  # Final answer step
+from pydantic import ValidationError  # Coercion failures
+
+from utils.metrics import STRUCTURED_OUTPUTS  # Wasted run accounting
+from utils.tokens import truncate_tokens  # Re-ask prompt size
+
+FINAL_ANSWER_TOOL = "ResearchResponse"  # Tool name the agent finishes with
+REASK_INPUT_TOKENS = 3000  # Answer text shown to the formatting re-ask
+
+# Field names models commonly substitute for the schema's own
+FIELD_ALIASES = {
+    "title": "topic",
+    "subject": "topic",
+    "answer": "summary",
+    "content": "summary",
+    "findings": "summary",
+    "urls": "sources",
+    "references": "sources",
+    "citations": "sources",
+    "tools": "tools_used",
+}
+
+
+# -----------------------------------------------------------------------------
+# Agent Output Parsing
+# -----------------------------------------------------------------------------
+_classes = {}
+
+
+def _research_output_parser():
+    # Built on first use: langchain.agents (and langchain_community behind
+    # it) would otherwise be imported with every web worker
+    if "parser" not in _classes:
+        from langchain.agents.output_parsers.tools import ToolsAgentOutputParser
+
+        class ResearchOutputParser(ToolsAgentOutputParser):
+            """
+            Tool-calling agent parser that treats a ResearchResponse call as the end
+
+            The tool's arguments become the run's output (as JSON), so callers
+            keep receiving {"output": "<json>"} exactly as with a text answer.
+            A plain-text reply still finishes the run and goes through repair.
+            """
+
+            def parse_result(self, result, *, partial=False):
+                parsed = super().parse_result(result, partial=partial)
+                if isinstance(parsed, AgentFinish):
+                    return parsed
+                for action in parsed:
+                    if action.tool == FINAL_ANSWER_TOOL:
+                        arguments = action.tool_input if isinstance(action.tool_input, dict) else {}
+                        return AgentFinish(
+                            return_values={"output": json.dumps(arguments)}, log=action.log
+                        )
+                return parsed
+
+        _classes["parser"] = ResearchOutputParser
+    return _classes["parser"]
+
+
+def __getattr__(name):
+    # Lazy module attribute (utils.structured_output.ResearchOutputParser)
+    if name == "ResearchOutputParser":
+        return _research_output_parser()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+# -----------------------------------------------------------------------------
+# Local Repair
+# -----------------------------------------------------------------------------
+def _balanced_object(text):
+    """
+    First JSON object in text, closing any brackets left open
+
+    Returns:
+    - str: Object source, or None when the text has no "{"
+    """
+    start = text.find("{")
+    if start < 0:
+        return None
+    stack = []
+    in_string = False
+    escaped = False
+    for index in range(start, len(text)):
+        char = text[index]
+        if in_string:
+            if escaped:
+                escaped = False
+            elif char == "\\":
+                escaped = True
+            elif char == '"':
+                in_string = False
+        elif char == '"':
+            in_string = True
+        elif char in "{[":
+            stack.append("}" if char == "{" else "]")
+        elif char in "}]":
+            if stack:
+                stack.pop()
+            if not stack:
+                return text[start: index + 1]
+    # Truncated answer (output token limit): close what is still open
+    tail = '"' if in_string else ""
+    return text[start:].rstrip().rstrip(",") + tail + "".join(reversed(stack))
+
+
+def extract_json(text):
+    """
+    Leniently parse the JSON object inside a model answer
+
+    Returns:
+    - dict, or None when nothing object-like can be recovered
+    """
+    text = re.sub(r"```(?:json)?", "", text)
+    text = text.replace("“", '"').replace("”", '"')
+    candidate = _balanced_object(text)
+    if candidate is None:
+        return None
+    cleaned = re.sub(r",\s*([}\]])", r"\1", candidate)  # Trailing commas
+    for source in (candidate, cleaned):
+        try:
+            data = json.loads(source, strict=False)  # strict=False: raw newlines in strings
+        except ValueError:
+            continue
+        return data if isinstance(data, dict) else None
+    try:
+        data = ast.literal_eval(cleaned)  # {'topic': ..., 'ok': True}
+    except (ValueError, SyntaxError):
+        return None
+    return data if isinstance(data, dict) else None
+
+
+def _as_list(value):
+    if value is None:
+        return []
+    if isinstance(value, str):
+        return [item for item in re.split(r"[\n,;]+|\s+(?=https?://)", value) if item.strip()]
+    if isinstance(value, dict):
+        value = [value]
+    items = []
+    for item in value:
+        if isinstance(item, dict):  # [{"url": ..., "title": ...}]
+            item = item.get("url") or item.get("name") or item.get("title") or ""
+        items.append(str(item).strip())
+    return [item for item in items if item]
+
+
+def coerce_fields(data):
+    """
+    Map a near-miss answer dict onto ResearchResponse fields
+
+    Unwraps {"ResearchResponse": {...}} / {"properties": {...}} envelopes,
+    renames common aliases and converts strings/lists between shapes.
+    """
+    while len(data) == 1 and isinstance(next(iter(data.values())), dict):
+        data = next(iter(data.values()))
+    fields = {}
+    for key, value in data.items():
+        key = FIELD_ALIASES.get(key.lower(), key.lower())
+        fields.setdefault(key, value)
+    for key in ("topic", "summary"):
+        value = fields.get(key)
+        if isinstance(value, list):
+            fields[key] = "\n".join(str(item) for item in value)
+        elif value is not None and not isinstance(value, str):
+            fields[key] = str(value)
+    for key in ("sources", "tools_used"):
+        fields[key] = _as_list(fields.get(key))
+    return fields
+
+
+def repair_response(text, response_model):
+    """
+    Best-effort local repair of an answer that failed strict parsing
+
+    Returns:
+    - response_model instance, or None when the answer cannot be salvaged
+    """
+    data = extract_json(text)
+    if data is None:
+        return None
+    try:
+        return response_model(**coerce_fields(data))
+    except (ValidationError, TypeError):
+        return None
+
+
+# -----------------------------------------------------------------------------
+# Formatting Re-Ask
+# -----------------------------------------------------------------------------
+def reask_format(llm, text, error, response_model):
+    """
+    One formatting-only model call: convert an answer to the schema
+
+    The model gets its own answer and the validation error, no tools and
+    no instructions to research, so this costs one short call instead of
+    another agent loop.
+    """
+    structured = llm.with_structured_output(response_model)
+    return structured.invoke(
+        [
+            (
+                "system",
+                "Convert the research answer below into the requested schema. "
+                "Keep its content; do not add new facts or sources.",
+            ),
+            (
+                "human",
+                f"Answer:\n{truncate_tokens(text, REASK_INPUT_TOKENS)}\n\n"
+                f"It could not be used because: {truncate_tokens(str(error), 100)}",
+            ),
+        ]
+    )
+
+
+def parse_research_output(text, parser, get_llm=None):
+    """
+    ResearchResponse for an agent's final output, salvaging near misses
+
+    Parameters:
+    - text (str): Agent output (tool arguments as JSON, or free text)
+    - parser (PydanticOutputParser): Strict parser
+    - get_llm (callable): Returns the chat model for the re-ask; called
+      only when strict parsing and local repair both fail (None: no re-ask)
+
+    Returns:
+    - ResearchResponse
+
+    Raises:
+    - OutputParserException: Nothing usable could be recovered (wasted run)
+    """
+    text = text if isinstance(text, str) else json.dumps(text)
+    try:
+        response = parser.parse(text)
+        STRUCTURED_OUTPUTS.inc(outcome="valid")
+        return response
+    except Exception as e:
+        error = e
+
+    response_model = parser.pydantic_object
+    response = repair_response(text, response_model)
+    if response is not None:
+        STRUCTURED_OUTPUTS.inc(outcome="repaired")
+        return response
+
+    if get_llm is not None:
+        try:
+            response = reask_format(get_llm(), text, error, response_model)
+        except Exception as e:
+            print("Formatting re-ask failed:", e)  # Server-side logging
+            response = None
+        if isinstance(response, response_model):
+            STRUCTURED_OUTPUTS.inc(outcome="reasked")
+            return response
+
+    STRUCTURED_OUTPUTS.inc(outcome="wasted")
+    raise error
+
+
+"""
+Outcome Labels (structured_output_total):
+- valid: Strict parse succeeded (normally the ResearchResponse tool call)
+- repaired: Fixed locally, no extra model call
+- reasked: Fixed by the formatting-only re-ask (one short model call)
+- wasted: Agent run discarded; wasted-run rate = wasted / all outcomes
+"""
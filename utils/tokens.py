@@ -0,0 +1,20 @@
+"""
+Token Estimates
+
+Cheap, dependency-free token arithmetic for prompt budgeting. OpenAI
+tokenizers average roughly four characters per token on English text,
+which is accurate enough for budgets and before/after accounting.
+"""
+
+
+def estimate_tokens(text):
+    """Approximate token count (~4 characters per token for English text)"""
+    return (len(text) + 3) // 4
+
+
+def truncate_tokens(text, budget):
+    """Cut text to roughly `budget` tokens, marking the cut"""
+    limit = budget * 4
+    if len(text) <= limit:
+        return text
+    return text[: max(limit - 3, 0)].rstrip() + "..."